@@ -1,14 +1,43 @@
+import functools
+import os
+import threading
+import uuid
+from contextlib import contextmanager, nullcontext
 import streamlit as st
-import google.generativeai as genai
-import pandas as pd
-import json
-import re
-from config import GEMINI_API_KEY, APP_TITLE, APP_ICON
-try:
-    # Optional: nicer containers/styles if available
-    from streamlit_extras.stylable_container import stylable_container
-except Exception:  # pragma: no cover
-    stylable_container = None
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+from config import (
+    GEMINI_API_KEY, MODEL_BACKEND, APP_TITLE, APP_ICON,
+    SUMMARY_CHUNK_TOKENS, SUMMARY_MAX_WORKERS,
+    QUIZ_SHARD_SIZE, QUIZ_MAX_WORKERS, QUIZ_MAX_QUESTIONS_PARALLEL,
+    METRICS_PORT, ADMIN_PANEL, STORE_PAGE_SIZE, RENDER_PAGE_SIZE,
+)
+from summarize import build_summary_prompt
+from quiz import QUIZ_TYPES, build_quiz_prompt, generate_sharded
+from parsing import iter_items, parse_items
+from study import (
+    SUMMARY_LENGTHS, JSON_GENERATION_CONFIG,
+    build_explain_prompt, build_flashcards_prompt,
+    DEFAULT_NUM_CARDS, DEFAULT_NUM_QUESTIONS, DEFAULT_QUIZ_TYPE,
+    build_grounded_source, generate_study_pack, create_llm, create_metrics, create_rate_limiter,
+    create_response_cache, create_retrieval_index, create_semantic_cache, create_study_store,
+)
+from export import EXPORT_FORMATS, export_deck, export_decks_zip, export_file, export_filename
+from preprocess import TOKEN_BUDGETS, prepare
+from render import flashcard_html, page_count, page_slice, question_html
+from retrieval import extract_text
+from store import GRADES, deck_digest
+from warmer import create_warmer
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
+
+# Static CSS/HTML is read and prepared once per process, not on every rerun
+@st.cache_resource
+def load_static(name):
+    with open(os.path.join(STATIC_DIR, name), encoding="utf-8") as f:
+        content = f.read()
+    if name.endswith(".css"):
+        return f"<style>\n{content}</style>"
+    return content.replace("{icon}", APP_ICON).replace("{title}", APP_TITLE)
 
 # Page configuration
 st.set_page_config(
@@ -18,153 +47,255 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# Custom CSS for modern UI
-st.markdown("""
-<style>
-    .main-header {
-        text-align: center;
-        padding: 2rem 0;
-        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-        color: white;
-        border-radius: 10px;
-        margin-bottom: 2rem;
-    }
-    
-    .feature-card {
-        background: white;
-        padding: 2rem;
-        border-radius: 15px;
-        box-shadow: 0 4px 6px rgba(0, 0, 0, 0.1);
-        margin: 1rem 0;
-        border: 1px solid #e0e0e0;
-    }
-    
-    .result-card {
-        background: #f8f9fa;
-        padding: 1.5rem;
-        border-radius: 10px;
-        border-left: 4px solid #667eea;
-        margin: 1rem 0;
-    }
-    
-    .quiz-question {
-        background: white;
-        padding: 1rem;
-        border-radius: 8px;
-        margin: 0.5rem 0;
-        border: 1px solid #ddd;
-    }
-    
-    .flashcard {
-        width: 100%;
-        height: 200px;
-        perspective: 1000px;
-        margin: 1rem 0;
-    }
-    
-    .flashcard-inner {
-        position: relative;
-        width: 100%;
-        height: 100%;
-        text-align: center;
-        transition: transform 0.6s;
-        transform-style: preserve-3d;
-        cursor: pointer;
-    }
-    
-    .flashcard-inner.flipped {
-        transform: rotateY(180deg);
-    }
-    
-    .flashcard-front, .flashcard-back {
-        position: absolute;
-        width: 100%;
-        height: 100%;
-        backface-visibility: hidden;
-        border-radius: 10px;
-        display: flex;
-        align-items: center;
-        justify-content: center;
-        padding: 1rem;
-        box-shadow: 0 4px 8px rgba(0,0,0,0.1);
-    }
-    
-    .flashcard-front {
-        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-        color: white;
-    }
-    
-    .flashcard-back {
-        background: linear-gradient(135deg, #f093fb 0%, #f5576c 100%);
-        color: white;
-        transform: rotateY(180deg);
-    }
-    
-    .sidebar .sidebar-content {
-        background: linear-gradient(180deg, #667eea 0%, #764ba2 100%);
-    }
-    
-    .stButton > button {
-        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-        color: white;
-        border: none;
-        border-radius: 25px;
-        padding: 0.5rem 2rem;
-        font-weight: bold;
-        transition: all 0.3s ease;
-    }
-    
-    .stButton > button:hover {
-        transform: translateY(-2px);
-        box-shadow: 0 4px 8px rgba(0,0,0,0.2);
-    }
-    
-    @media (max-width: 768px) {
-        .feature-card {
-            padding: 1rem;
-            margin: 0.5rem 0;
-        }
-        
-        .flashcard {
-            height: 150px;
-        }
-    }
-</style>
-""", unsafe_allow_html=True)
+# Custom CSS for modern UI (read from disk once per process)
+st.markdown(load_static("style.css"), unsafe_allow_html=True)
+
+# The configured model and its client are built once per process and shared by every
+# session and rerun, so the underlying connection is reused as well
+@st.cache_resource
+def get_llm():
+    return create_llm(
+        cache=get_response_cache(), limiter=create_rate_limiter(), metrics=get_metrics(),
+        semantic=create_semantic_cache(),
+    )
 
 # Initialize Gemini
 def initialize_gemini():
-    if not GEMINI_API_KEY:
+    if MODEL_BACKEND == "gemini" and not GEMINI_API_KEY:
         st.error("⚠️ Please set your GEMINI_API_KEY in the .env file")
         st.stop()
-    
-    genai.configure(api_key=GEMINI_API_KEY)
-    return genai.GenerativeModel("gemini-2.0-flash")
+    return get_llm()
+
+# One retrieval index per process; each student only searches the documents they uploaded
+@st.cache_resource
+def get_retrieval_index():
+    return create_retrieval_index()
+
+# Saved decks and review schedules, shared by every session and worker process
+@st.cache_resource
+def get_study_store():
+    return create_study_store()
+
+# Metrics shared by every session in this process, optionally served on METRICS_PORT
+@st.cache_resource
+def get_metrics():
+    metrics = create_metrics()
+    if metrics is not None and METRICS_PORT:
+        metrics.serve(METRICS_PORT)
+    return metrics
+
+# Timing spans are no-ops when metrics are disabled
+def span(feature, stage):
+    if metrics is None:
+        return nullcontext()
+    return metrics.span(feature, stage)
+
+def observer(feature, stage):
+    if metrics is None:
+        return None
+    return lambda seconds: metrics.observe(feature, stage, seconds)
+
+# One background warmer per process: warms the configured popular topics at startup and
+# prefetches the quiz and flashcards for topics students have just had explained
+@st.cache_resource
+def get_warmer():
+    return create_warmer(get_llm(), get_retrieval_index())
+
+# Response cache shared by every session in this process (and, through SQLite, by other workers)
+@st.cache_resource
+def get_response_cache():
+    return create_response_cache()
 
 # Initialize the model
-model = initialize_gemini()
+llm = initialize_gemini()
+metrics = get_metrics()
+warmer = get_warmer()
+json_config = JSON_GENERATION_CONFIG
+
+# While a request waits for the shared rate limiter, show the user's place in the queue.
+# Sharded quizzes, summary sections and study packs wait on pool threads; each of
+# them gets this script run's context so it can update the message, which shows
+# the position closest to the front.
+@contextmanager
+def queue_status():
+    placeholder = st.empty()
+    ctx = get_script_run_ctx()
+    lock = threading.Lock()
+    positions = {}
+    def on_wait(position):
+        thread = threading.current_thread()
+        if get_script_run_ctx(suppress_warning=True) is None:
+            add_script_run_ctx(thread, ctx)
+        with lock:
+            if position:
+                positions[thread.ident] = position
+            else:
+                positions.pop(thread.ident, None)
+            if positions:
+                placeholder.info(
+                    f"⏳ Lots of students are studying right now. You are #{min(positions.values())} in the queue..."
+                )
+            else:
+                placeholder.empty()
+    try:
+        yield on_wait
+    finally:
+        placeholder.empty()
+
+# Render a streamed answer into the page, keeping the spinner only until the first chunk arrives
+def stream_markdown(chunks, waiting_message):
+    placeholder = st.empty()
+    chunks = iter(chunks)
+    with st.spinner(waiting_message):
+        text = next(chunks, "")
+    placeholder.markdown(text)
+    for chunk in chunks:
+        text += chunk
+        placeholder.markdown(text + " ▌")
+    placeholder.markdown(text)
+    return text
+
+# Tell the user how much preprocessing trimmed from their input before it was sent
+def show_savings(prepared):
+    saved = prepared.original_tokens - prepared.tokens
+    if saved > 0:
+        reason = "markup, repeated lines and over-budget text" if prepared.trimmed else "markup and repeated lines"
+        st.caption(
+            f"✂️ Removed ~{saved:,} of {prepared.original_tokens:,} tokens ({saved / prepared.original_tokens:.0%}) "
+            f"of {reason} before sending."
+        )
+
+# Quiz rendering shared by the single-request and parallel generation modes.
+# Each question is one pre-rendered HTML string, memoized by content.
+def render_question(i, q):
+    with span("quiz", "render"):
+        st.markdown(question_html(i, q), unsafe_allow_html=True)
+
+# Flashcard viewer. Flipping a card only reruns the viewer fragment, not the whole script.
+fragment = getattr(st, "fragment", None) or getattr(st, "experimental_fragment")
+
+# Only the visible page is rendered; changing page reruns just the enclosing fragment
+def paginator(key, total, page_size=RENDER_PAGE_SIZE):
+    pages = page_count(total, page_size)
+    if pages == 1:
+        return 0
+    return st.number_input(f"Page (of {pages}):", 1, pages, 1, key=key) - 1
+
+@fragment
+def flashcard_viewer(flashcards):
+    with span("flashcards", "render"):
+        offset, visible = page_slice(flashcards, paginator("flashcards_page", len(flashcards)), RENDER_PAGE_SIZE)
+        cols = st.columns(2)
+        for i, card in enumerate(visible, offset):
+            with cols[i % 2]:
+                flipped = st.toggle(f"Flip Card {i+1}", key=f"flip_{i}")
+                st.markdown(flashcard_html(card, flipped), unsafe_allow_html=True)
+
+@fragment
+def quiz_viewer(questions):
+    offset, visible = page_slice(questions, paginator("quiz_page", len(questions)), RENDER_PAGE_SIZE)
+    for i, q in enumerate(visible, offset + 1):
+        render_question(i, q)
+
+# Exports of generated quizzes and flashcards are built only when a download is clicked and
+# memoized per deck digest and format; the underscore-prefixed items are not hashed by Streamlit
+@st.cache_data(max_entries=32)
+def memoized_export(kind, deck_key, fmt, source, _items):
+    return export_file(kind, _items, fmt, source)
+
+def items_export(kind, items, source):
+    return lambda fmt: memoized_export(kind, deck_digest(kind, items), fmt, source, items)
+
+# Exports are written only when a download is clicked, straight from the items into a
+# spooled temporary file
+def download_export(kind, title, key, export):
+    col1, col2 = st.columns([1, 2])
+    fmt = col1.selectbox(
+        "Format:",
+        list(EXPORT_FORMATS),
+        format_func=lambda f: EXPORT_FORMATS[f][0],
+        key=f"{key}_format",
+        label_visibility="collapsed"
+    )
+    label, _, mime = EXPORT_FORMATS[fmt]
+    col2.download_button(
+        label=f"📥 Download as {label}",
+        data=functools.partial(export, fmt),
+        file_name=export_filename(kind, fmt, title),
+        mime=mime,
+        key=f"{key}_download",
+        on_click="ignore"
+    )
 
 # Sidebar navigation
-st.sidebar.markdown(f"""
-<div style="text-align: center; padding: 1rem;">
-    <h2>{APP_ICON} {APP_TITLE}</h2>
-    <p style="color: #666;">Your AI-powered learning companion</p>
-</div>
-""", unsafe_allow_html=True)
+st.sidebar.markdown(load_static("sidebar.html"), unsafe_allow_html=True)
 
 # Navigation menu
 page = st.sidebar.selectbox(
     "Choose a feature:",
-    ["📘 Explain Concept", "📝 Summarize Notes", "❓ Generate Quiz", "🎴 Flashcards"]
+    ["📘 Explain Concept", "📝 Summarize Notes", "❓ Generate Quiz", "🎴 Flashcards", "📦 Study Pack", "📚 My Decks"]
 )
 
+# Generated quizzes and flashcards are saved per user so they survive the session. Students who
+# have not entered a name get no saved decks, and their uploads are kept under a key of their own
+# session, so anonymous students never see, or delete, each other's material.
+study_store = get_study_store()
+user_name = st.sidebar.text_input(
+    "👤 Your name:", key="user_name", placeholder="Enter your name to save your decks"
+).strip()
+user_key = user_name or st.session_state.setdefault("session_user", f"session:{uuid.uuid4().hex}")
+
+def save_deck(kind, source, items):
+    if study_store is None:
+        return
+    if not user_name:
+        st.caption("💡 Enter your name in the sidebar to save decks to My Decks")
+        return
+    try:
+        study_store.save_deck(user_name, kind, source, source, items)
+        st.caption("💾 Saved to My Decks")
+    except Exception as e:
+        st.warning(f"Could not save to My Decks: {str(e)}")
+
+# Study material upload, indexed under the user's key. Files are indexed once; unchanged re-uploads are
+# skipped by content hash.
+retrieval_index = get_retrieval_index()
+if retrieval_index is not None:
+    # Another worker process may have indexed new material since the last rerun
+    retrieval_index.refresh()
+    with st.sidebar.expander("📂 Study material"):
+        uploads = st.file_uploader(
+            "Upload notes (txt, md, pdf):",
+            type=["txt", "md", "pdf"],
+            accept_multiple_files=True
+        )
+        indexed_uploads = st.session_state.setdefault("indexed_uploads", set())
+        for upload in uploads or []:
+            if (user_key, upload.file_id) in indexed_uploads:
+                continue
+            try:
+                retrieval_index.add_document(
+                    upload.name, extract_text(upload.name, upload.getvalue()), owner=user_key
+                )
+                indexed_uploads.add((user_key, upload.file_id))
+            except Exception as e:
+                st.error(f"Could not index {upload.name}: {str(e)}")
+        for name, info in sorted(retrieval_index.documents_for(user_key).items()):
+            st.caption(f"📄 {name} ({info['passages']} passages)")
+
+def grounding_checkbox(key):
+    # Only the user's own uploads are searched, so there is nothing to offer before they upload any
+    if retrieval_index is None or not retrieval_index.documents_for(user_key):
+        return False
+    return st.checkbox(
+        "📚 Use uploaded study material",
+        value=True,
+        key=key,
+        help="Send only the most relevant passages from your uploaded files along with the topic."
+    )
+
 # Main content area
-st.markdown(f"""
-<div class="main-header">
-    <h1>{APP_ICON} {APP_TITLE}</h1>
-    <p>Transform your learning experience with AI-powered tools</p>
-</div>
-""", unsafe_allow_html=True)
+st.markdown(load_static("header.html"), unsafe_allow_html=True)
 
 # Explain Concept Page
 if page == "📘 Explain Concept":
@@ -180,18 +311,20 @@ if page == "📘 Explain Concept":
     
     if st.button("🚀 Generate Explanation", key="explain_btn"):
         if topic:
-            with st.spinner("🤖 AI is explaining the concept..."):
-                try:
-                    prompt = f"Explain '{topic}' in simple, easy-to-understand terms. Use analogies and examples where helpful. Keep it concise but comprehensive."
-                    response = model.generate_content(prompt)
-                    
-                    st.markdown('<div class="result-card">', unsafe_allow_html=True)
-                    st.markdown("### 💡 Explanation")
-                    st.markdown(response.text)
-                    st.markdown('</div>', unsafe_allow_html=True)
-                    
-                except Exception as e:
-                    st.error(f"Error generating explanation: {str(e)}")
+            try:
+                prompt = build_explain_prompt(topic)
+                
+                st.markdown('<div class="result-card">', unsafe_allow_html=True)
+                st.markdown("### 💡 Explanation")
+                with queue_status() as on_wait:
+                    stream_markdown(llm.stream("explain", prompt, on_wait=on_wait, topic=topic), "🤖 AI is explaining the concept...")
+                st.markdown('</div>', unsafe_allow_html=True)
+                # Students often continue with a quiz or flashcards on the same topic
+                if warmer is not None:
+                    warmer.prefetch(topic, owner=user_key)
+                
+            except Exception as e:
+                st.error(f"Error generating explanation: {str(e)}")
         else:
             st.warning("Please enter a topic to explain.")
     
@@ -211,29 +344,38 @@ elif page == "📝 Summarize Notes":
     
     summary_length = st.selectbox(
         "Summary length:",
-        ["Brief (2-3 sentences)", "Medium (1 paragraph)", "Detailed (2-3 paragraphs)"]
+        list(SUMMARY_LENGTHS)
     )
     
     if st.button("📝 Generate Summary", key="summary_btn"):
         if notes:
-            with st.spinner("🤖 AI is summarizing your notes..."):
-                try:
-                    length_instruction = {
-                        "Brief (2-3 sentences)": "in 2-3 sentences",
-                        "Medium (1 paragraph)": "in one paragraph",
-                        "Detailed (2-3 paragraphs)": "in 2-3 paragraphs"
-                    }[summary_length]
-                    
-                    prompt = f"Summarize the following text {length_instruction}. Focus on the key points and main ideas:\n\n{notes}"
-                    response = model.generate_content(prompt)
-                    
-                    st.markdown('<div class="result-card">', unsafe_allow_html=True)
-                    st.markdown("### 📋 Summary")
-                    st.markdown(response.text)
-                    st.markdown('</div>', unsafe_allow_html=True)
-                    
-                except Exception as e:
-                    st.error(f"Error generating summary: {str(e)}")
+            try:
+                length_instruction = SUMMARY_LENGTHS[summary_length]
+                prepared = prepare(notes, "summary")
+                show_savings(prepared)
+                
+                # Large notes are summarized section by section first, then reduced
+                progress = st.empty()
+                def show_progress(done, total):
+                    progress.progress(done / total, text=f"Summarizing section {done} of {total}...")
+                with queue_status() as on_wait:
+                    prompt = build_summary_prompt(
+                        llm, prepared.text, length_instruction,
+                        chunk_tokens=SUMMARY_CHUNK_TOKENS,
+                        max_workers=SUMMARY_MAX_WORKERS,
+                        on_progress=show_progress,
+                        on_wait=on_wait,
+                    )
+                progress.empty()
+                
+                st.markdown('<div class="result-card">', unsafe_allow_html=True)
+                st.markdown("### 📋 Summary")
+                with queue_status() as on_wait:
+                    stream_markdown(llm.stream("summary", prompt, on_wait=on_wait), "🤖 AI is summarizing your notes...")
+                st.markdown('</div>', unsafe_allow_html=True)
+                
+            except Exception as e:
+                st.error(f"Error generating summary: {str(e)}")
         else:
             st.warning("Please enter some notes to summarize.")
     
@@ -253,150 +395,91 @@ elif page == "❓ Generate Quiz":
     
     col1, col2 = st.columns(2)
     with col1:
-        num_questions = st.slider("Number of questions:", 3, 15, 5)
-    with col2:
-        quiz_type = st.selectbox(
-            "Quiz type:",
-            ["Mixed (MCQ + True/False)", "Multiple Choice Only", "True/False Only", "Short Answer Only"]
+        parallel_quiz = st.checkbox(
+            "⚡ Parallel generation",
+            value=True,
+            help="Generate the quiz as several smaller requests at once. Faster for long quizzes."
         )
+        max_questions = QUIZ_MAX_QUESTIONS_PARALLEL if parallel_quiz else 15
+        num_questions = st.slider("Number of questions:", 3, max_questions, 5)
+    with col2:
+        quiz_type = st.selectbox("Quiz type:", QUIZ_TYPES)
+    use_material = grounding_checkbox("quiz_grounded")
     
     if st.button("🎯 Generate Quiz", key="quiz_btn"):
         if quiz_input:
-            with st.spinner("🤖 AI is generating your quiz..."):
-                try:
-                    if quiz_type == "Mixed (MCQ + True/False)":
-                        prompt = f"""Create a quiz with {num_questions} questions based on: {quiz_input}
-                        
-                        Format: Mix of multiple choice questions (with 4 options each) and true/false questions.
-                        Return in this exact JSON format:
-                        {{
-                            "questions": [
-                                {{
-                                    "type": "mcq",
-                                    "question": "Question text?",
-                                    "options": ["A", "B", "C", "D"],
-                                    "correct": "A",
-                                    "explanation": "Brief explanation"
-                                }},
-                                {{
-                                    "type": "true_false",
-                                    "question": "Statement to evaluate",
-                                    "correct": true,
-                                    "explanation": "Brief explanation"
-                                }}
-                            ]
-                        }}"""
-                    elif quiz_type == "Multiple Choice Only":
-                        prompt = f"""Create {num_questions} multiple choice questions based on: {quiz_input}
-                        
-                        Each question should have 4 options (A, B, C, D).
-                        Return in this exact JSON format:
-                        {{
-                            "questions": [
-                                {{
-                                    "type": "mcq",
-                                    "question": "Question text?",
-                                    "options": ["A", "B", "C", "D"],
-                                    "correct": "A",
-                                    "explanation": "Brief explanation"
-                                }}
-                            ]
-                        }}"""
-                    elif quiz_type == "True/False Only":
-                        prompt = f"""Create {num_questions} true/false questions based on: {quiz_input}
-                        
-                        Return in this exact JSON format:
-                        {{
-                            "questions": [
-                                {{
-                                    "type": "true_false",
-                                    "question": "Statement to evaluate",
-                                    "correct": true,
-                                    "explanation": "Brief explanation"
-                                }}
-                            ]
-                        }}"""
-                    else:  # Short Answer Only
-                        prompt = f"""Create {num_questions} short answer questions based on: {quiz_input}
-                        
-                        Return in this exact JSON format:
-                        {{
-                            "questions": [
-                                {{
-                                    "type": "short_answer",
-                                    "question": "Question text?",
-                                    "answer": "Expected answer",
-                                    "explanation": "Brief explanation"
-                                }}
-                            ]
-                        }}"""
-                    
-                    response = model.generate_content(prompt)
-                    
-                    try:
-                        # Try to extract JSON from the response text
-                        match = re.search(r'\{[\s\S]*\}', response.text)
-                        if match:
-                            json_str = match.group(0)
-                            quiz_data = json.loads(json_str)
-                            questions = quiz_data.get("questions", [])
-                            
-                            st.markdown('<div class="result-card">', unsafe_allow_html=True)
-                            st.markdown("### 🎯 Generated Quiz")
-                            
-                            for i, q in enumerate(questions, 1):
-                                st.markdown(f'<div class="quiz-question">', unsafe_allow_html=True)
-                                st.markdown(f"**Question {i}:** {q['question']}")
-                                
-                                if q['type'] == 'mcq':
-                                    for j, option in enumerate(q['options']):
-                                        st.markdown(f"   {chr(65+j)}. {option}")
-                                    st.markdown(f"**Answer:** {q['correct']}")
-                                elif q['type'] == 'true_false':
-                                    st.markdown(f"**Answer:** {'True' if q['correct'] else 'False'}")
-                                else:  # short_answer
-                                    st.markdown(f"**Answer:** {q['answer']}")
-                                
-                                st.markdown(f"**Explanation:** {q['explanation']}")
-                                st.markdown('</div>', unsafe_allow_html=True)
-                            
-
-                            # Download button
-                            quiz_text = f"Quiz Generated from: {quiz_input}\n\n"
-                            for i, q in enumerate(questions, 1):
-                                quiz_text += f"Question {i}: {q['question']}\n"
-                                if q['type'] == 'mcq':
-                                    for j, option in enumerate(q['options']):
-                                        quiz_text += f"   {chr(65+j)}. {option}\n"
-                                    quiz_text += f"Answer: {q['correct']}\n"
-                                elif q['type'] == 'true_false':
-                                    quiz_text += f"Answer: {'True' if q['correct'] else 'False'}\n"
-                                else:
-                                    quiz_text += f"Answer: {q['answer']}\n"
-                                quiz_text += f"Explanation: {q['explanation']}\n\n"
-                            
-
-                            st.download_button(
-                                label="📥 Download Quiz as Text",
-                                data=quiz_text,
-                                file_name="quiz.txt",
-                                mime="text/plain"
-                            )
-                            
-                            st.markdown('</div>', unsafe_allow_html=True)
-                            
-                        else:
-                            st.error("Failed to find JSON in the response. Please try again.")
-                            st.text(response.text)
-                    except Exception as e:
-                        st.error(f"Failed to parse quiz response: {str(e)}")
-                        st.text(response.text)
-                        
-                except Exception as e:
-                    st.error(f"Error generating quiz: {str(e)}")
+            try:
+                prepared = prepare(
+                    build_grounded_source(retrieval_index, quiz_input, owner=user_key) if use_material else quiz_input,
+                    "quiz"
+                )
+                show_savings(prepared)
+                quiz_source = prepared.text
+                # The first page is shown while generating; the paged viewer below replaces it
+                live = st.empty()
+                live_page = live.container()
+                
+                questions = []
+                if parallel_quiz and num_questions > QUIZ_SHARD_SIZE:
+                    # Each shard is rendered as soon as it completes
+                    with queue_status() as on_wait, st.spinner("🤖 AI is generating your quiz..."):
+                        for shard_questions, error in generate_sharded(
+                            llm, quiz_source, num_questions, quiz_type,
+                            shard_size=QUIZ_SHARD_SIZE, max_workers=QUIZ_MAX_WORKERS,
+                            generation_config=json_config,
+                            on_parse_time=observer("quiz", "parse"),
+                            on_wait=on_wait,
+                        ):
+                            if error is not None:
+                                st.warning(f"Part of the quiz could not be generated: {str(error)}")
+                                continue
+                            for q in shard_questions:
+                                questions.append(q)
+                                if len(questions) <= RENDER_PAGE_SIZE:
+                                    with live_page:
+                                        render_question(len(questions), q)
+                else:
+                    # Questions are rendered one by one as they stream in
+                    skipped = 0
+                    with queue_status() as on_wait, st.spinner("🤖 AI is generating your quiz..."):
+                        chunks = llm.stream(
+                            "quiz", build_quiz_prompt(quiz_source, num_questions, quiz_type), json_config, on_wait=on_wait
+                        )
+                        for q, error in iter_items(chunks, "questions", on_parse_time=observer("quiz", "parse")):
+                            if error is not None:
+                                skipped += 1
+                                continue
+                            questions.append(q)
+                            if len(questions) <= RENDER_PAGE_SIZE:
+                                with live_page:
+                                    render_question(len(questions), q)
+                    if skipped:
+                        st.warning(f"Skipped {skipped} malformed question(s) in the response.")
+                    if not questions:
+                        st.error("Failed to find any valid questions in the response. Please try again.")
+                
+                live.empty()
+                if questions:
+                    st.session_state["quiz_data"] = questions
+                    st.session_state["quiz_source"] = quiz_input
+                    st.session_state.pop("quiz_page", None)
+                    save_deck("quiz", quiz_input, questions)
+                
+            except Exception as e:
+                st.error(f"Error generating quiz: {str(e)}")
         else:
             st.warning("Please enter a topic or text for quiz generation.")
     
+    # The last generated quiz stays on the page across reruns
+    if st.session_state.get("quiz_data"):
+        questions = st.session_state["quiz_data"]
+        st.markdown('<div class="result-card">', unsafe_allow_html=True)
+        st.markdown("### 🎯 Generated Quiz")
+        quiz_viewer(questions)
+        quiz_source = st.session_state.get("quiz_source", "")
+        download_export("quiz", quiz_source, "quiz_export", items_export("quiz", questions, quiz_source))
+        st.markdown('</div>', unsafe_allow_html=True)
+    
     st.markdown('</div>', unsafe_allow_html=True)
 
 # Flashcards Page
@@ -412,39 +495,39 @@ elif page == "🎴 Flashcards":
     )
     
     num_cards = st.slider("Number of flashcards:", 3, 20, 8)
+    use_material = grounding_checkbox("flashcards_grounded")
     
     if st.button("🎴 Generate Flashcards", key="flashcard_btn"):
         if flashcard_input:
             with st.spinner("🤖 AI is generating your flashcards..."):
                 try:
-                    prompt = f"""Create {num_cards} flashcards based on: {flashcard_input}
-                    
-                    Format: Each flashcard should have a clear front (question/keyword) and back (answer/definition).
-                    Return in this exact JSON format:
-                    {{
-                        "flashcards": [
-                            {{
-                                "front": "Question or keyword",
-                                "back": "Answer or definition"
-                            }}
-                        ]
-                    }}"""
+                    prepared = prepare(
+                        build_grounded_source(retrieval_index, flashcard_input, owner=user_key)
+                        if use_material else flashcard_input,
+                        "flashcards"
+                    )
+                    show_savings(prepared)
+                    source = prepared.text
+                    prompt = build_flashcards_prompt(source, num_cards)
                     
-                    response = model.generate_content(prompt)
+                    with queue_status() as on_wait:
+                        # Only a short, ungrounded topic is matched against similar earlier topics
+                        response_text = llm.generate(
+                            "flashcards", prompt, json_config, on_wait=on_wait, topic=None if use_material else source
+                        )
                     
-                    try:
-                        match = re.search(r'\{[\s\S]*\}', response.text)
-                        if match:
-                            json_str = match.group(0)
-                            flashcard_data = json.loads(json_str)
-                            st.session_state["flashcards_data"] = flashcard_data.get("flashcards", [])
-                            st.session_state["flashcards_source"] = flashcard_input
-                        else:
-                            st.error("Failed to find JSON in the response. Please try again.")
-                            st.text(response.text)
-                    except Exception as e:
-                        st.error(f"Failed to parse flashcard response: {str(e)}")
-                        st.text(response.text)
+                    with span("flashcards", "parse"):
+                        cards, errors = parse_items(response_text, "flashcards")
+                    if cards:
+                        st.session_state["flashcards_data"] = cards
+                        st.session_state["flashcards_source"] = flashcard_input
+                        st.session_state.pop("flashcards_page", None)
+                        save_deck("flashcards", flashcard_input, cards)
+                        if errors:
+                            st.warning(f"Skipped {len(errors)} malformed flashcard(s) in the response.")
+                    else:
+                        st.error("Failed to find any valid flashcards in the response. Please try again.")
+                        st.text(response_text)
                 except Exception as e:
                     st.error(f"Error generating flashcards: {str(e)}")
         else:
@@ -459,73 +542,202 @@ elif page == "🎴 Flashcards":
         st.markdown("### 🎴 Interactive Flashcards")
         st.write("Use the toggles to flip cards. Your cards persist when the app reruns.")
 
-        cols = st.columns(2)
-        for i, card in enumerate(flashcards):
-            col = cols[i % 2]
-            with col:
-                card_state_key = f"flip_{i}"
-                flipped = st.toggle(f"Flip Card {i+1}", key=card_state_key)
-                flip_class = "flipped" if flipped else ""
-
-                if stylable_container:
-                    with stylable_container(key=f"stylable_card_{i}", css_styles="border-radius: 14px; padding: 0; border: 0;"):
-                        st.markdown(f"""
-                        <div class=\"flashcard\">
-                            <div class=\"flashcard-inner {flip_class}\">
-                                <div class=\"flashcard-front\">
-                                    <h3>{card['front']}</h3>
-                                </div>
-                                <div class=\"flashcard-back\">
-                                    <h3>{card['back']}</h3>
-                                </div>
-                            </div>
-                        </div>
-                        """, unsafe_allow_html=True)
-                else:
-                    st.markdown(f"""
-                    <div class=\"flashcard\">
-                        <div class=\"flashcard-inner {flip_class}\">
-                            <div class=\"flashcard-front\">
-                                <h3>{card['front']}</h3>
-                            </div>
-                            <div class=\"flashcard-back\">
-                                <h3>{card['back']}</h3>
-                            </div>
-                        </div>
-                    </div>
-                    """, unsafe_allow_html=True)
-
-        # Downloads
-        flashcard_text = f"Flashcards Generated from: {flashcard_input_source}\n\n"
-        for i, card in enumerate(flashcards, 1):
-            flashcard_text += f"Card {i}:\n"
-            flashcard_text += f"Front: {card['front']}\n"
-            flashcard_text += f"Back: {card['back']}\n\n"
+        flashcard_viewer(flashcards)
 
-        st.download_button(
-            label="📥 Download Flashcards as Text",
-            data=flashcard_text,
-            file_name="flashcards.txt",
-            mime="text/plain"
-        )
-
-        df = pd.DataFrame(flashcards)
-        csv = df.to_csv(index=False)
-        st.download_button(
-            label="📊 Download Flashcards as CSV",
-            data=csv,
-            file_name="flashcards.csv",
-            mime="text/csv"
+        download_export(
+            "flashcards", flashcard_input_source, "flashcards_export",
+            items_export("flashcards", flashcards, flashcard_input_source)
         )
 
         st.markdown('</div>', unsafe_allow_html=True)
 
     st.markdown('</div>', unsafe_allow_html=True)
 
+# Study Pack Page
+elif page == "📦 Study Pack":
+    st.markdown('<div class="feature-card">', unsafe_allow_html=True)
+    st.header("📦 Study Pack")
+    st.write("Get an explanation, a summary, a quiz and flashcards for one topic, all generated at once.")
+
+    pack_input = st.text_area(
+        "Enter topic or paste text for your study pack:",
+        placeholder="Enter a topic or paste your study material...",
+        height=150
+    )
+    use_material = grounding_checkbox("pack_grounded")
+
+    PACK_SECTIONS = {
+        "explain": "### 💡 Explanation",
+        "summary": "### 📋 Summary",
+        "quiz": "### 🎯 Quiz",
+        "flashcards": "### 🎴 Flashcards",
+    }
+
+    def render_pack_section(feature, result):
+        if feature in ("explain", "summary"):
+            st.markdown(result)
+        elif feature == "quiz":
+            quiz_viewer(result)
+        else:
+            flashcard_viewer(result)
+
+    if st.button("📦 Generate Study Pack", key="pack_btn"):
+        if pack_input:
+            source = build_grounded_source(retrieval_index, pack_input, owner=user_key) if use_material else pack_input
+            sections = {}
+            for feature, heading in PACK_SECTIONS.items():
+                sections[feature] = st.container()
+                sections[feature].markdown(heading)
+            placeholders = {feature: section.empty() for feature, section in sections.items()}
+            for placeholder in placeholders.values():
+                placeholder.info("⏳ Generating...")
+
+            # Each section is filled in as soon as its generation finishes
+            pack = {}
+            for key in ("quiz_page", "flashcards_page"):
+                st.session_state.pop(key, None)
+            with span("study_pack", "total"), queue_status() as on_wait:
+                for feature, result, error, elapsed in generate_study_pack(
+                    llm, pack_input, source,
+                    num_questions=DEFAULT_NUM_QUESTIONS, quiz_type=DEFAULT_QUIZ_TYPE, num_cards=DEFAULT_NUM_CARDS,
+                    on_wait=on_wait,
+                ):
+                    placeholders[feature].empty()
+                    with sections[feature]:
+                        if error is not None:
+                            st.error(f"Error generating {feature}: {str(error)}")
+                            continue
+                        if feature == "flashcards":
+                            result = result.items
+                        if not result:
+                            st.error(f"No valid {feature} were generated. Please try again.")
+                            continue
+                        pack[feature] = result
+                        render_pack_section(feature, result)
+                        if feature in ("quiz", "flashcards"):
+                            save_deck(feature, pack_input, result)
+                        st.caption(f"⏱️ {elapsed:.1f}s")
+                        # Each job cleans the material to its own token budget; the explanation only sends the topic
+                        if feature in TOKEN_BUDGETS:
+                            show_savings(prepare(source, feature))
+            st.session_state["study_pack"] = pack
+        else:
+            st.warning("Please enter a topic or text for your study pack.")
+    elif st.session_state.get("study_pack"):
+        # The last pack stays on the page across reruns (e.g. when flipping cards)
+        pack = st.session_state["study_pack"]
+        for feature, heading in PACK_SECTIONS.items():
+            if feature in pack:
+                st.markdown(heading)
+                render_pack_section(feature, pack[feature])
+
+    st.markdown('</div>', unsafe_allow_html=True)
+
+# My Decks Page
+elif page == "📚 My Decks":
+    st.markdown('<div class="feature-card">', unsafe_allow_html=True)
+    st.header("📚 My Decks")
+
+    if study_store is None:
+        st.info("Saving decks is disabled (STORE_ENABLED=0).")
+    elif not user_name:
+        st.info("👤 Enter your name in the sidebar to save decks and review them here.")
+    else:
+        # Spaced-repetition review of every card due today, one card at a time
+        due = study_store.due_count(user_name)
+        st.subheader(f"🔁 Review ({due} due today)")
+        due_cards = study_store.due_cards(user_name, limit=1) if due else []
+        if due_cards:
+            card = due_cards[0]
+
+            def grade(card_id, quality):
+                study_store.review(card_id, quality)
+                st.session_state["review_reveal"] = False
+
+            st.markdown(f"**{card['front']}**")
+            if st.session_state.get("review_reveal"):
+                st.markdown(card["back"])
+                for col, (label, quality) in zip(st.columns(len(GRADES)), GRADES.items()):
+                    col.button(label, key=f"grade_{label}", on_click=grade, args=(card["id"], quality))
+            elif st.button("👀 Show answer", key="reveal_btn"):
+                st.session_state["review_reveal"] = True
+                st.rerun()
+        else:
+            st.success("Nothing due. Come back tomorrow!")
+
+        # Saved decks, loaded one page at a time
+        decks = study_store.list_decks(user_name)
+        st.subheader("🗂️ Saved decks")
+        if not decks:
+            st.write("Generated quizzes and flashcards are saved here automatically.")
+        else:
+            deck = st.selectbox(
+                "Deck:",
+                decks,
+                key="deck_select",
+                format_func=lambda d: f"{'🎴' if d['kind'] == 'flashcards' else '❓'} {d['title'][:60]} ({d['item_count']})"
+            )
+            pages = page_count(deck["item_count"], STORE_PAGE_SIZE)
+            page_number = st.number_input("Page:", 1, pages, 1, key=f"deck_page_{deck['id']}") if pages > 1 else 1
+            items = study_store.load_page(deck["id"], deck["kind"], page_number - 1, STORE_PAGE_SIZE)
+            offset = (page_number - 1) * STORE_PAGE_SIZE
+            if deck["kind"] == "flashcards":
+                for i, card in enumerate(items, offset + 1):
+                    with st.expander(f"{i}. {card['front']}"):
+                        st.write(card["back"])
+            else:
+                for i, q in enumerate(items, offset + 1):
+                    render_question(i, q)
+            download_export(deck["kind"], deck["title"], "deck_export", functools.partial(export_deck, study_store, deck))
+            st.download_button(
+                label="📦 Download all decks (zip of JSONL)",
+                data=functools.partial(export_decks_zip, study_store, user_name),
+                file_name="study_buddy_decks.zip",
+                mime="application/zip",
+                on_click="ignore"
+            )
+            if st.button("🗑️ Delete deck", key="delete_deck_btn"):
+                study_store.delete_deck(user_name, deck["id"])
+                st.rerun()
+
+    st.markdown('</div>', unsafe_allow_html=True)
+
+# Response cache statistics
+if llm.cache is not None:
+    cache_stats = llm.cache.stats()
+    st.sidebar.caption(
+        f"⚡ Response cache: {cache_stats['hits']} hits / {cache_stats['misses']} misses "
+        f"({cache_stats['hit_rate']:.0%} hit rate, {cache_stats['entries']} entries)"
+    )
+if llm.semantic is not None:
+    semantic_stats = llm.semantic.stats()
+    st.sidebar.caption(
+        f"🧠 Similar-topic cache: {semantic_stats['hits']} hits / {semantic_stats['misses']} misses "
+        f"({semantic_stats['entries']} topics)"
+    )
+
+if warmer is not None:
+    warmer_stats = warmer.stats()
+    if warmer_stats["warmed"] or warmer_stats["pending"]:
+        st.sidebar.caption(
+            f"🔥 Warmer: {warmer_stats['warmed']} generated ahead, {warmer_stats['skipped']} already cached, "
+            f"{warmer_stats['pending']} queued"
+        )
+
+# Admin panel with rolling per-feature aggregates
+if ADMIN_PANEL and metrics is not None:
+    with st.sidebar.expander("📈 Metrics (rolling window)"):
+        rows = metrics.rolling()
+        if rows:
+            st.dataframe(rows, hide_index=True)
+        else:
+            st.caption("No requests recorded yet.")
+        st.download_button(
+            label="Prometheus metrics",
+            data=metrics.prometheus_text(),
+            file_name="metrics.prom",
+            mime="text/plain"
+        )
+
 # Footer
-st.markdown("""
-<div style="text-align: center; padding: 2rem; color: #666; margin-top: 3rem;">
-    <p>🤖 Powered by Google Gemini AI | Built with Streamlit</p>
-    <p>Made with ❤️ for students everywhere</p>
-</div>
-""", unsafe_allow_html=True)
+st.markdown(load_static("footer.html"), unsafe_allow_html=True)
@@ -0,0 +1,187 @@
+"""Model backends selectable through MODEL_BACKEND in config.py.
+
+"gemini" talks to the real Gemini API. "fake" is a deterministic local
+stand-in with the same generate_content interface, used for load testing
+and benchmarks: it returns canned explanations, summaries, quizzes and
+flashcards with configurable latency, token rate and error injection.
+"""
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+
+from config import (
+    GEMINI_API_KEY, GEMINI_MODEL, MODEL_BACKEND,
+    FAKE_LATENCY_SECONDS, FAKE_TOKENS_PER_SECOND, FAKE_ERROR_RATE, FAKE_SEED,
+)
+
+BACKENDS = ["gemini", "fake"]
+
+
+class FakeAPIError(Exception):
+    """Injected failure that looks like a Gemini quota error (HTTP 429)."""
+
+    code = 429
+
+
+class FakeUsage:
+    def __init__(self, prompt_tokens, response_tokens):
+        self.prompt_token_count = prompt_tokens
+        self.candidates_token_count = response_tokens
+        self.total_token_count = prompt_tokens + response_tokens
+
+
+class FakeResponse:
+    def __init__(self, text, usage_metadata=None, chunks=None):
+        self.text = text
+        self.usage_metadata = usage_metadata
+        self._chunks = chunks
+
+    def __iter__(self):
+        return iter(self._chunks if self._chunks is not None else [self])
+
+
+def _count_tokens(text):
+    return max(1, len(text) // 4)
+
+
+def _topic(prompt):
+    match = re.search(r"Explain '(.+?)' in simple", prompt) or re.search(r"based on: (.+)", prompt)
+    if match:
+        return match.group(1).strip()[:80]
+    return "the material"
+
+
+def _count(pattern, prompt, default):
+    match = re.search(pattern, prompt)
+    return int(match.group(1)) if match else default
+
+
+def _fake_questions(rng, topic, count, prompt):
+    if "true/false questions based on" in prompt:
+        types = ["true_false"]
+    elif "multiple choice questions based on" in prompt:
+        types = ["mcq"]
+    elif "short answer questions based on" in prompt:
+        types = ["short_answer"]
+    else:
+        types = ["mcq", "true_false"]
+    questions = []
+    for i in range(count):
+        qtype = types[i % len(types)]
+        number = rng.randint(1, 10_000)
+        if qtype == "mcq":
+            questions.append({
+                "type": "mcq",
+                "question": f"Which statement about {topic} is correct (#{number})?",
+                "options": [f"Statement {c} about {topic}" for c in "ABCD"],
+                "correct": rng.choice("ABCD"),
+                "explanation": f"This follows from the core idea of {topic}.",
+            })
+        elif qtype == "true_false":
+            questions.append({
+                "type": "true_false",
+                "question": f"{topic} always involves factor {number}.",
+                "correct": rng.random() < 0.5,
+                "explanation": f"Factor {number} is discussed when studying {topic}.",
+            })
+        else:
+            questions.append({
+                "type": "short_answer",
+                "question": f"Describe aspect {number} of {topic}.",
+                "answer": f"Aspect {number} of {topic} is its defining property.",
+                "explanation": f"Aspect {number} is central to {topic}.",
+            })
+    return {"questions": questions}
+
+
+def _fake_text(rng, prompt):
+    topic = _topic(prompt)
+    if '"flashcards"' in prompt:
+        count = _count(r"Create (\d+) flashcards", prompt, 8)
+        cards = [
+            {"front": f"{topic}: key term {i + 1}", "back": f"Definition {rng.randint(1, 10_000)} of term {i + 1}."}
+            for i in range(count)
+        ]
+        return json.dumps({"flashcards": cards}, indent=2)
+    if '"questions"' in prompt:
+        count = _count(r"(\d+) (?:multiple choice |true/false |short answer )?questions", prompt, 5)
+        return json.dumps(_fake_questions(rng, topic, count, prompt), indent=2)
+    sentences = [
+        f"{topic} can be understood by breaking it into a few simple ideas.",
+        f"Think of it like a recipe: each ingredient of {topic} plays its own part.",
+        "A common example makes this concrete and easy to remember.",
+        "The key takeaway is how these parts work together.",
+    ]
+    paragraphs = 3 if "2-3 paragraphs" in prompt or prompt.startswith("Explain") else 1
+    return "\n\n".join(" ".join(rng.sample(sentences, len(sentences))) for _ in range(paragraphs))
+
+
+class FakeModel:
+    """Deterministic stand-in for genai.GenerativeModel.
+
+    The same prompt always produces the same answer. latency is the time to
+    first token, tokens_per_second paces the rest of the response, and
+    error_rate is the probability that a call fails with FakeAPIError.
+    """
+
+    def __init__(self, latency=0.5, tokens_per_second=200.0, error_rate=0.0, seed=0):
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self.error_rate = error_rate
+        self.seed = seed
+        self._errors = random.Random(seed)
+        self._errors_lock = threading.Lock()
+
+    def _rng(self, prompt):
+        digest = hashlib.sha256(f"{self.seed}:{prompt}".encode("utf-8")).digest()
+        return random.Random(int.from_bytes(digest[:8], "big"))
+
+    def _maybe_fail(self):
+        with self._errors_lock:
+            failed = self._errors.random() < self.error_rate
+        if failed:
+            raise FakeAPIError("429 Resource has been exhausted (injected by the fake backend)")
+
+    def _stream(self, text, usage):
+        pieces = re.findall(r"\S+\s*", text) or [text]
+        delay = 1.0 / self.tokens_per_second if self.tokens_per_second else 0
+        for i in range(0, len(pieces), 8):
+            piece = "".join(pieces[i:i + 8])
+            if delay:
+                time.sleep(delay * _count_tokens(piece))
+            yield FakeResponse(piece, usage)
+
+    def generate_content(self, prompt, generation_config=None, stream=False, **kwargs):
+        time.sleep(self.latency)
+        self._maybe_fail()
+        text = _fake_text(self._rng(prompt), prompt)
+        usage = FakeUsage(_count_tokens(prompt), _count_tokens(text))
+        if stream:
+            return FakeResponse(text, usage, chunks=self._stream(text, usage))
+        if self.tokens_per_second:
+            time.sleep(usage.candidates_token_count / self.tokens_per_second)
+        return FakeResponse(text, usage)
+
+
+def create_model(backend=None):
+    """Return (model, model_name) for the configured backend."""
+    backend = backend or MODEL_BACKEND
+    if backend == "fake":
+        model = FakeModel(
+            latency=FAKE_LATENCY_SECONDS,
+            tokens_per_second=FAKE_TOKENS_PER_SECOND,
+            error_rate=FAKE_ERROR_RATE,
+            seed=FAKE_SEED,
+        )
+        return model, "fake-gemini"
+    if backend == "gemini":
+        import google.generativeai as genai
+
+        if not GEMINI_API_KEY:
+            raise RuntimeError("GEMINI_API_KEY is not set")
+        genai.configure(api_key=GEMINI_API_KEY)
+        return genai.GenerativeModel(GEMINI_MODEL), GEMINI_MODEL
+    raise ValueError(f"Unknown MODEL_BACKEND {backend!r}; expected one of {', '.join(BACKENDS)}")
@@ -0,0 +1,172 @@
+"""Headless batch generation of study material for whole syllabi.
+
+Reads topics from a CSV (with a "topic" column) or JSONL file (objects with
+a "topic" key, or bare strings) and generates the requested features for
+each one concurrently. Every result is appended to the output JSONL file as
+soon as it completes, and that file doubles as the checkpoint: rerunning
+the same command after a crash skips everything already written.
+
+Optional per-row fields: num_questions, quiz_type, num_cards, summary_length
+and notes (required for the "summary" feature).
+
+Usage:
+    python batch.py topics.csv -o results.jsonl --features explain,quiz,flashcards --workers 8
+"""
+import argparse
+import csv
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import study
+from ratelimit import BATCH
+
+_INT_FIELDS = ("num_questions", "num_cards")
+
+
+def read_topics(path):
+    rows = []
+    if path.lower().endswith(".csv"):
+        with open(path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                rows.append({k.strip(): v.strip() for k, v in row.items() if k and v and v.strip()})
+    else:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                row = json.loads(line)
+                rows.append({"topic": row} if isinstance(row, str) else row)
+    for row in rows:
+        if not row.get("topic"):
+            raise ValueError(f"Row without a topic in {path}: {row}")
+        for field in _INT_FIELDS:
+            if field in row:
+                row[field] = int(row[field])
+    return rows
+
+
+def job_id(feature, row):
+    payload = json.dumps({"feature": feature, **row}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def load_completed(output_path):
+    """Return the ids already written successfully, repairing a half-written last line."""
+    if not os.path.exists(output_path):
+        return set()
+    with open(output_path, "rb+") as f:
+        data = f.read()
+        if data and not data.endswith(b"\n"):
+            # The process died mid-write; drop the partial record
+            f.truncate(data.rfind(b"\n") + 1)
+            data = data[:data.rfind(b"\n") + 1]
+    completed = set()
+    for line in data.decode("utf-8").splitlines():
+        if not line.strip():
+            continue
+        record = json.loads(line)
+        if "error" not in record:
+            completed.add(record["id"])
+    return completed
+
+
+def run_job(llm, feature, row):
+    topic = row["topic"]
+    if feature == "explain":
+        return study.explain(llm, topic)
+    if feature == "summary":
+        if not row.get("notes"):
+            raise ValueError("the summary feature needs a 'notes' field")
+        return study.summarize_notes(llm, row["notes"], row.get("summary_length", study.DEFAULT_SUMMARY_LENGTH))
+    if feature == "quiz":
+        return study.generate_quiz(
+            llm, topic,
+            num_questions=row.get("num_questions", study.DEFAULT_NUM_QUESTIONS),
+            quiz_type=row.get("quiz_type", study.DEFAULT_QUIZ_TYPE),
+        )
+    if feature == "flashcards":
+        cards, errors = study.generate_flashcards(llm, topic, num_cards=row.get("num_cards", study.DEFAULT_NUM_CARDS))
+        if not cards:
+            raise ValueError(f"No valid flashcards in the response ({len(errors)} malformed)")
+        return cards
+    raise ValueError(f"Unknown feature {feature!r}")
+
+
+def _timed(llm, feature, row):
+    start = time.perf_counter()
+    result = run_job(llm, feature, row)
+    return result, time.perf_counter() - start
+
+
+def run_batch(llm, rows, features, output_path, workers=4):
+    """Generate every (row, feature) pair not already in output_path; return (done, failed, skipped)."""
+    completed = load_completed(output_path)
+    jobs = [(job_id(feature, row), feature, row) for row in rows for feature in features]
+    todo = [job for job in jobs if job[0] not in completed]
+    skipped = len(jobs) - len(todo)
+    pending_jobs = iter(todo)
+    done = failed = 0
+
+    with open(output_path, "a", encoding="utf-8") as out, ThreadPoolExecutor(max_workers=workers) as pool:
+        in_flight = {}
+
+        def submit_next():
+            job = next(pending_jobs, None)
+            if job is not None:
+                in_flight[pool.submit(_timed, llm, job[1], job[2])] = job
+
+        # Keep a bounded number of jobs queued so huge syllabi don't sit in memory as futures
+        for _ in range(workers * 2):
+            submit_next()
+        while in_flight:
+            finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in finished:
+                job_key, feature, row = in_flight.pop(future)
+                record = {"id": job_key, "topic": row["topic"], "feature": feature}
+                try:
+                    record["result"], elapsed = future.result()
+                    record["elapsed"] = round(elapsed, 3)
+                    done += 1
+                except Exception as e:
+                    record["error"] = str(e)
+                    failed += 1
+                out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                out.flush()
+                print(f"[{done + failed}] {feature}: {row['topic']}" + (" (failed)" if "error" in record else ""),
+                      file=sys.stderr)
+                submit_next()
+    return done, failed, skipped
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pre-generate study material for a list of topics.")
+    parser.add_argument("topics", help="CSV or JSONL file of topics")
+    parser.add_argument("-o", "--output", default="results.jsonl", help="JSONL output and checkpoint file")
+    parser.add_argument("--features", default="explain,quiz,flashcards",
+                        help=f"comma-separated subset of: {', '.join(study.FEATURES)}")
+    parser.add_argument("--workers", type=int, default=4, help="number of concurrent generations")
+    args = parser.parse_args(argv)
+
+    features = [f.strip() for f in args.features.split(",") if f.strip()]
+    unknown = [f for f in features if f not in study.FEATURES]
+    if unknown:
+        parser.error(f"unknown feature(s): {', '.join(unknown)}")
+
+    rows = read_topics(args.topics)
+    # Batch work yields to interactive requests in the shared rate limiter queue
+    llm = study.create_llm(
+        cache=study.create_response_cache(), limiter=study.create_rate_limiter(), priority=BATCH,
+        semantic=study.create_semantic_cache(),
+    )
+    done, failed, skipped = run_batch(llm, rows, features, args.output, workers=args.workers)
+    print(f"Generated {done}, failed {failed}, skipped {skipped} already completed.", file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
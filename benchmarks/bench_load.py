@@ -0,0 +1,226 @@
+"""End-to-end load benchmark of all four pages against the fake model backend.
+
+Each simulated user is an independent Streamlit session (AppTest) in its
+own process; all of them share the SQLite-backed response cache, rate
+limiter and in-flight registry in a temporary data directory. Every user
+visits each page, enters a topic and presses the generate button; on the
+flashcard page it also flips a card. Users start together after warm-up.
+
+Reports p50/p95/p99 latency per page interaction, reruns per second and
+traced Python memory per session. Results are deterministic for a given
+seed and settings; save them with --output and pass them back with
+--baseline to fail when p95 latency or memory regress beyond --tolerance.
+
+Usage:
+    python benchmarks/bench_load.py --users 10 --output bench.json
+    python benchmarks/bench_load.py --users 10 --baseline bench.json --tolerance 0.25
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_PATH = os.path.join(ROOT, "app.py")
+
+PAGES = ["📘 Explain Concept", "📝 Summarize Notes", "❓ Generate Quiz", "🎴 Flashcards"]
+BUTTON_KEYS = {
+    "📘 Explain Concept": "explain_btn",
+    "📝 Summarize Notes": "summary_btn",
+    "❓ Generate Quiz": "quiz_btn",
+    "🎴 Flashcards": "flashcard_btn",
+}
+TOPICS = [
+    "Photosynthesis", "Newton's laws of motion", "The French Revolution", "Cell division",
+    "Supply and demand", "The water cycle", "Plate tectonics", "Machine learning",
+    "World War II", "The periodic table", "DNA replication", "Climate change",
+]
+
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def configure_environment(args, data_dir):
+    """Point the app at the fake backend and a throwaway data directory before it is imported."""
+    os.environ["MODEL_BACKEND"] = "fake"
+    os.environ["FAKE_LATENCY_SECONDS"] = str(args.latency)
+    os.environ["FAKE_TOKENS_PER_SECOND"] = str(args.token_rate)
+    os.environ["FAKE_ERROR_RATE"] = str(args.error_rate)
+    os.environ["FAKE_SEED"] = str(args.seed)
+    os.environ["STUDY_BUDDY_DATA_DIR"] = data_dir
+    os.environ["CACHE_ENABLED"] = "1" if args.cache else "0"
+    os.environ["SEMANTIC_CACHE_ENABLED"] = os.environ["CACHE_ENABLED"]
+    os.environ["RATE_LIMIT_PER_MINUTE"] = str(args.rate_limit)
+    os.environ["RATE_LIMIT_BURST"] = str(max(1, args.users * len(PAGES)))
+    os.environ["RETRY_BASE_DELAY"] = "0.05"
+
+
+_start_barrier = None
+
+
+def _init_user_process(barrier):
+    global _start_barrier
+    _start_barrier = barrier
+
+
+def _run(app, reruns):
+    start = time.perf_counter()
+    app.run()
+    reruns[0] += 1
+    return time.perf_counter() - start
+
+
+def simulate_user(index, rounds):
+    """One user session: visit every page, generate, and flip a flashcard.
+
+    Runs in its own process because AppTest is not safe to drive from several
+    threads at once; the processes still share the SQLite-backed cache, rate
+    limiter and in-flight registry, as workers of a real deployment do.
+    """
+    from streamlit.testing.v1 import AppTest
+
+    latencies = {page: [] for page in PAGES}
+    reruns = [0]
+    errors = []
+    tracemalloc.start()
+    baseline_memory, _ = tracemalloc.get_traced_memory()
+    app = AppTest.from_file(APP_PATH, default_timeout=120)
+    _run(app, reruns)
+    # Start the measured part together with the other simulated users
+    _start_barrier.wait()
+    started = time.time()
+    try:
+        for round_index in range(rounds):
+            topic = TOPICS[(index + round_index) % len(TOPICS)]
+            for page in PAGES:
+                app.sidebar.selectbox[0].select(page)
+                _run(app, reruns)
+                text = topic if page != "📝 Summarize Notes" else f"{topic}. " * 200
+                app.text_area[0].input(text)
+                _run(app, reruns)
+                app.button(key=BUTTON_KEYS[page]).click()
+                latencies[page].append(_run(app, reruns))
+                if app.exception:
+                    errors.append(f"{page}: {app.exception[0].message}")
+                errors.extend(f"{page}: {e.value}" for e in app.error)
+                if page == "🎴 Flashcards" and app.toggle:
+                    app.toggle[0].set_value(True)
+                    latencies.setdefault("flip card", []).append(_run(app, reruns))
+    except Exception as e:  # surface failures in the report rather than killing the run
+        errors.append(repr(e))
+    finished = time.time()
+    session_memory, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "latencies": latencies,
+        "reruns": reruns[0],
+        "errors": errors,
+        "started": started,
+        "finished": finished,
+        "memory_bytes": session_memory - baseline_memory,
+    }
+
+
+def run_benchmark(args):
+    context = multiprocessing.get_context("spawn")
+    barrier = context.Barrier(args.users)
+    with ProcessPoolExecutor(
+        max_workers=args.users, mp_context=context,
+        initializer=_init_user_process, initargs=(barrier,),
+    ) as pool:
+        users = list(pool.map(simulate_user, range(args.users), [args.rounds] * args.users))
+
+    elapsed = max(user["finished"] for user in users) - min(user["started"] for user in users)
+    latencies = {}
+    for user in users:
+        for page, samples in user["latencies"].items():
+            latencies.setdefault(page, []).extend(samples)
+    reruns = sum(user["reruns"] for user in users)
+    return {
+        "settings": {
+            "users": args.users, "rounds": args.rounds, "latency": args.latency,
+            "token_rate": args.token_rate, "error_rate": args.error_rate,
+            "cache": args.cache, "seed": args.seed,
+        },
+        "pages": {
+            page: {
+                "count": len(samples),
+                "p50_ms": round(percentile(samples, 50) * 1000, 1),
+                "p95_ms": round(percentile(samples, 95) * 1000, 1),
+                "p99_ms": round(percentile(samples, 99) * 1000, 1),
+            }
+            for page, samples in latencies.items()
+        },
+        "wall_seconds": round(elapsed, 3),
+        "reruns": reruns,
+        "reruns_per_second": round(reruns / elapsed, 2) if elapsed else 0.0,
+        "memory_per_session_kb": round(
+            sum(user["memory_bytes"] for user in users) / 1024 / len(users), 1
+        ),
+        "errors": [error for user in users for error in user["errors"]],
+    }
+
+
+def compare(results, baseline, tolerance):
+    """Return human-readable regressions of results against a saved baseline."""
+    regressions = []
+    for page, stats in baseline.get("pages", {}).items():
+        current = results["pages"].get(page)
+        if current and current["p95_ms"] > stats["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{page}: p95 {current['p95_ms']} ms vs baseline {stats['p95_ms']} ms")
+    limit = baseline.get("memory_per_session_kb", 0) * (1 + tolerance)
+    if limit and results["memory_per_session_kb"] > limit:
+        regressions.append(
+            f"memory/session {results['memory_per_session_kb']} KB vs baseline {baseline['memory_per_session_kb']} KB"
+        )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load benchmark of the Study Buddy pages using the fake backend.")
+    parser.add_argument("--users", type=int, default=5, help="concurrent simulated users")
+    parser.add_argument("--rounds", type=int, default=1, help="times each user goes through all pages")
+    parser.add_argument("--latency", type=float, default=0.3, help="fake time to first token, seconds")
+    parser.add_argument("--token-rate", type=float, default=400.0, help="fake output tokens per second")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="probability of an injected 429")
+    parser.add_argument("--rate-limit", type=float, default=6000.0, help="client-side requests per minute")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--cache", action="store_true", help="keep the response and semantic caches enabled")
+    parser.add_argument("--output", help="write results as JSON to this file")
+    parser.add_argument("--baseline", help="JSON results to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative regression")
+    args = parser.parse_args()
+
+    data_dir = tempfile.mkdtemp(prefix="study-buddy-bench-")
+    try:
+        configure_environment(args, data_dir)
+        results = run_benchmark(args)
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+    print(json.dumps(results, indent=2, ensure_ascii=False))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION: {regression}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""Offline hit-rate benchmark for the semantic cache.
+
+Each line of the topic list is a group of phrasings of the same topic,
+separated by " | ". For every threshold a fresh cache is seeded with the
+first phrasing of each group, and the remaining phrasings are then looked
+up. The benchmark reports:
+  - hit rate: paraphrases served from their own group's answer
+  - wrong hits: lookups served from a different group's answer
+  - LSH recall: of the lookups whose exact nearest neighbour is above the
+    threshold, the share that the LSH candidates found
+No model is called.
+
+Usage:
+    python benchmarks/bench_semantic.py
+    python benchmarks/bench_semantic.py --topics topics.txt --thresholds 0.7,0.8,0.9,0.95
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Deliberately includes near-misses (World War I / II, mitosis / meiosis) as separate groups
+DEFAULT_TOPICS = """
+photosynthesis | explain photosynthesis | Photosynthesis explained simply | what is photosynthesis?
+cellular respiration | explain cellular respiration | how does cellular respiration work
+mitosis | what is mitosis | mitosis explained
+meiosis | explain meiosis | Meiosis overview
+World War I | explain World War I | World War I overview
+World War II | World War II explained | tell me about World War II
+the French Revolution | French revolution overview | explain the French Revolution
+Newton's laws of motion | newton laws of motion | explain Newton's laws
+machine learning | what is machine learning? | Machine Learning explained simply
+neural networks | neural network basics | how do neural networks work
+supply and demand | explain supply and demand | supply & demand basics
+the water cycle | water cycle explained | how does the water cycle work
+DNA replication | explain DNA replication | DNA replication overview
+the Pythagorean theorem | pythagorean theorem explained | what is the Pythagorean theorem
+black holes | what are black holes | black hole explained simply
+plate tectonics | explain plate tectonics | plate tectonics basics
+the immune system | how does the immune system work | immune system overview
+inflation | what is inflation | inflation explained
+quantum entanglement | quantum entanglement explained | explain quantum entanglement simply
+the Krebs cycle | krebs cycle explained | explain the Krebs cycle
+"""
+
+
+def read_groups(path=None):
+    text = DEFAULT_TOPICS
+    if path:
+        with open(path, encoding="utf-8") as f:
+            text = f.read()
+    return [[t.strip() for t in line.split("|") if t.strip()] for line in text.splitlines() if line.strip()]
+
+
+def measure(groups, threshold):
+    from semantic_cache import SemanticCache, embed
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = SemanticCache(os.path.join(tmp, "semantic.sqlite3"), threshold=threshold)
+        for group_index, group in enumerate(groups):
+            cache.set("bench", group[0], str(group_index))
+        seeds = [embed(group[0]) for group in groups]
+
+        hits = wrong = recalled = findable = lookups = 0
+        elapsed = 0.0
+        for group_index, group in enumerate(groups):
+            for phrasing in group[1:]:
+                lookups += 1
+                start = time.perf_counter()
+                match = cache.lookup("bench", phrasing)
+                elapsed += time.perf_counter() - start
+                if match is not None:
+                    if match[2] == str(group_index):
+                        hits += 1
+                    else:
+                        wrong += 1
+                # Compare against brute-force search to see what LSH bucketing missed
+                vector = embed(phrasing)
+                nearest = max(range(len(seeds)), key=lambda i: float(seeds[i] @ vector))
+                if float(seeds[nearest] @ vector) >= threshold:
+                    findable += 1
+                    recalled += match is not None and match[1] == groups[nearest][0]
+        return {
+            "threshold": threshold,
+            "lookups": lookups,
+            "hit_rate": round(hits / lookups, 3) if lookups else 0.0,
+            "wrong_hit_rate": round(wrong / lookups, 3) if lookups else 0.0,
+            "lsh_recall": round(recalled / findable, 3) if findable else 1.0,
+            "mean_lookup_ms": round(elapsed / max(1, lookups) * 1000, 3),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--topics", help="file with one ' | '-separated group of phrasings per line")
+    parser.add_argument("--thresholds", default="0.6,0.7,0.8,0.85,0.9,0.95,1.0")
+    parser.add_argument("--json", action="store_true", help="print machine-readable results")
+    args = parser.parse_args()
+    sys.path.insert(0, ROOT)
+
+    groups = read_groups(args.topics)
+    results = [measure(groups, float(t)) for t in args.thresholds.split(",")]
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{len(groups)} topics, {results[0]['lookups']} paraphrase lookups")
+    print("threshold  hit rate  wrong hits  LSH recall  lookup ms")
+    for r in results:
+        print(f"{r['threshold']:>9.2f}  {r['hit_rate']:>8.1%}  {r['wrong_hit_rate']:>10.1%}  "
+              f"{r['lsh_recall']:>10.1%}  {r['mean_lookup_ms']:>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
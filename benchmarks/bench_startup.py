@@ -0,0 +1,95 @@
+"""Startup and rerun timing benchmark for the Streamlit app.
+
+Measures the cold start of app.py in a fresh interpreter (imports, client
+construction, first render) and the cost of warm reruns of each page in a
+single process, which is what users pay on every widget interaction.
+No button is pressed, so the Gemini API is never called.
+
+Usage:
+    python benchmarks/bench_startup.py --cold-runs 3 --reruns 20
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_PATH = os.path.join(ROOT, "app.py")
+
+_COLD_START_SNIPPET = """
+import time
+start = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file({app!r}, default_timeout=60).run()
+assert not at.exception, at.exception
+print(time.perf_counter() - start)
+"""
+
+
+def _summary(samples):
+    ordered = sorted(samples)
+    return {
+        "runs": len(ordered),
+        "mean_ms": round(statistics.mean(ordered) * 1000, 2),
+        "p50_ms": round(ordered[len(ordered) // 2] * 1000, 2),
+        "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 2),
+    }
+
+
+def measure_cold_start(runs):
+    samples = []
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, "-c", _COLD_START_SNIPPET.format(app=APP_PATH)],
+            cwd=ROOT, env=os.environ.copy(), capture_output=True, text=True, check=True,
+        ).stdout
+        samples.append(float(output.strip().splitlines()[-1]))
+    return _summary(samples)
+
+
+def measure_reruns(reruns):
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(APP_PATH, default_timeout=60).run()
+    results = {}
+    for page in at.sidebar.selectbox[0].options:
+        at.sidebar.selectbox[0].select(page).run()
+        samples = []
+        for _ in range(reruns):
+            start = time.perf_counter()
+            at.run()
+            samples.append(time.perf_counter() - start)
+        assert not at.exception, at.exception
+        results[page] = _summary(samples)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cold-runs", type=int, default=3, help="fresh-interpreter starts to time")
+    parser.add_argument("--reruns", type=int, default=20, help="warm reruns to time per page")
+    parser.add_argument("--json", action="store_true", help="print machine-readable results")
+    args = parser.parse_args()
+
+    # Client construction needs a key, but no request is ever sent
+    os.environ.setdefault("GEMINI_API_KEY", "benchmark-placeholder")
+    sys.path.insert(0, ROOT)
+
+    results = {
+        "cold_start": measure_cold_start(args.cold_runs),
+        "reruns": measure_reruns(args.reruns),
+    }
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    cold = results["cold_start"]
+    print(f"cold start: mean {cold['mean_ms']} ms, p50 {cold['p50_ms']} ms over {cold['runs']} runs")
+    for page, stats in results["reruns"].items():
+        print(f"rerun {page}: mean {stats['mean_ms']} ms, p50 {stats['p50_ms']} ms, p95 {stats['p95_ms']} ms")
+
+
+if __name__ == "__main__":
+    main()
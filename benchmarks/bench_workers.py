@@ -0,0 +1,305 @@
+"""Throughput scaling of 1..N Streamlit workers started by serve.py.
+
+For each worker count the benchmark starts `serve.py --workers W` against
+the fake model backend and a throwaway data directory, exactly as a school
+would run it. A fixed number of clients is then spread over the workers,
+as a sticky load balancer would spread students: each client opens its own
+Streamlit session over the app's websocket (/_stcore/stream), the way a
+browser does, and presses the generate button on the quiz or flashcard
+page. The measured latency is from sending the click to the end of the
+script run (script_finished), so it includes the app's real rerun cost:
+running app.py, generating through the shared SQLite response cache, rate
+limiter and in-flight registry, rendering, and sending the page's elements
+back. Topics follow a Zipf distribution, so popular topics are served from
+the cache entry written by whichever worker generated them first.
+
+For each worker count the benchmark reports clicks per second, p50/p95
+latency and the speed-up over one worker. It also checks the shared state:
+- model calls must not grow with the number of workers, since no topic may
+  be generated twice
+- every click must render its quiz or flashcards without an error, and the
+  render timings of all workers must show up in the shared metrics database
+
+The clients run in this process on one asyncio event loop, so on a machine
+with few cores they compete with the workers for CPU; compare speed-ups on
+a machine with at least as many cores as workers.
+
+Usage:
+    python benchmarks/bench_workers.py --workers 1,2,4 --clients 16 --requests 400
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import signal
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+import websockets
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SERVE_PATH = os.path.join(ROOT, "serve.py")
+
+NAVIGATION_LABEL = "Choose a feature:"
+PAGES = {
+    "quiz": ("❓ Generate Quiz", "quiz_btn", "quiz-question"),
+    "flashcards": ("🎴 Flashcards", "flashcard_btn", "flashcard"),
+}
+TOPICS = [
+    "Photosynthesis", "Newton's laws of motion", "The French Revolution", "Cell division",
+    "Supply and demand", "The water cycle", "Plate tectonics", "Machine learning",
+    "World War II", "The periodic table", "DNA replication", "Climate change",
+    "The Krebs cycle", "Black holes", "Plate boundaries", "Inflation",
+    "The immune system", "Quantum entanglement", "The Pythagorean theorem", "Neural networks",
+]
+
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100.0))]
+
+
+def plan_requests(args):
+    """Return one deterministic list of (feature, topic) requests per client."""
+    rng = random.Random(args.seed)
+    weights = [1.0 / (rank + 1) ** args.zipf for rank in range(len(TOPICS))]
+    requests = [
+        (rng.choice(list(PAGES)), rng.choices(TOPICS, weights)[0]) for _ in range(args.requests)
+    ]
+    return [requests[i::args.clients] for i in range(args.clients)]
+
+
+def worker_environment(args, data_dir):
+    """Point serve.py's workers at the fake backend and a throwaway data directory."""
+    return dict(
+        os.environ,
+        MODEL_BACKEND="fake",
+        FAKE_LATENCY_SECONDS=str(args.latency),
+        FAKE_TOKENS_PER_SECOND="100000",
+        FAKE_SEED=str(args.seed),
+        STUDY_BUDDY_DATA_DIR=data_dir,
+        RATE_LIMIT_PER_MINUTE="600000",
+        RATE_LIMIT_BURST=str(args.requests),
+        MAX_CONCURRENT_REQUESTS=str(args.clients),
+        METRICS_SHARED="1",
+        METRICS_PORT="0",
+        SEMANTIC_CACHE_ENABLED="0",
+        WARMER_ENABLED="0",
+        PREFETCH_ENABLED="0",
+        STREAMLIT_SERVER_FILE_WATCHER_TYPE="none",
+        STREAMLIT_BROWSER_GATHER_USAGE_STATS="false",
+    )
+
+
+def wait_until_healthy(ports, timeout):
+    deadline = time.monotonic() + timeout
+    for port in ports:
+        while True:
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/_stcore/health", timeout=1) as response:
+                    if response.read() == b"ok":
+                        break
+            except OSError:
+                pass
+            if time.monotonic() > deadline:
+                raise SystemExit(f"worker on port {port} did not start within {timeout:g}s")
+            time.sleep(0.2)
+
+
+class Session:
+    """One browser tab: a Streamlit session driven over the app's websocket."""
+
+    def __init__(self, websocket):
+        self.websocket = websocket
+        self.widgets = {}  # (element type, key or label) -> widget id
+
+    @classmethod
+    async def connect(cls, port):
+        websocket = await websockets.connect(
+            f"ws://127.0.0.1:{port}/_stcore/stream", subprotocols=["streamlit"], max_size=None
+        )
+        session = cls(websocket)
+        await session.rerun()
+        return session
+
+    async def rerun(self, widget_states=()):
+        """Run the script with the given (widget id, field, value) states; return the run's elements."""
+        msg = BackMsg()
+        msg.rerun_script.query_string = ""
+        for widget_id, field, value in widget_states:
+            state = msg.rerun_script.widget_states.widgets.add()
+            state.id = widget_id
+            setattr(state, field, value)
+        await self.websocket.send(msg.SerializeToString())
+        elements = []
+        while True:
+            forward = ForwardMsg()
+            forward.ParseFromString(await self.websocket.recv())
+            kind = forward.WhichOneof("type")
+            if kind == "delta" and forward.delta.WhichOneof("type") == "new_element":
+                element = forward.delta.new_element
+                element_type = element.WhichOneof("type")
+                proto = getattr(element, element_type)
+                widget_id = getattr(proto, "id", "")
+                if widget_id:
+                    # Widget ids end in the widget's key, or "None" without one
+                    key = widget_id.rsplit("-", 1)[-1]
+                    self.widgets[element_type, proto.label if key == "None" else key] = widget_id
+                elements.append((element_type, proto))
+            elif kind == "script_finished":
+                return elements
+
+    def widget(self, element_type, key_or_label=None):
+        if key_or_label is None:
+            matches = [wid for (kind, _), wid in self.widgets.items() if kind == element_type]
+            return matches[-1]
+        return self.widgets[element_type, key_or_label]
+
+    async def open_page(self, page):
+        await self.rerun([(self.widget("selectbox", NAVIGATION_LABEL), "string_value", page)])
+
+    async def close(self):
+        await self.websocket.close()
+
+
+async def run_client(port, plan):
+    """Press the generate button once per planned request; return (latencies, failures)."""
+    session = await Session.connect(port)
+    latencies, failures = [], []
+    text_areas = {}
+    try:
+        for feature, topic in plan:
+            page, button_key, rendered_marker = PAGES[feature]
+            if page not in text_areas:
+                await session.open_page(page)
+                text_areas[page] = session.widget("text_area")
+            start = time.perf_counter()
+            elements = await session.rerun([
+                (session.widget("selectbox", NAVIGATION_LABEL), "string_value", page),
+                (text_areas[page], "string_value", topic),
+                (session.widget("button", button_key), "trigger_value", True),
+            ])
+            latencies.append(time.perf_counter() - start)
+            errors = [
+                f"{proto.type}: {proto.message}" if element_type == "exception" else proto.body
+                for element_type, proto in elements
+                if element_type == "exception" or (element_type == "alert" and proto.format == proto.ERROR)
+            ]
+            rendered = any(
+                element_type == "markdown" and rendered_marker in proto.body for element_type, proto in elements
+            )
+            if errors or not rendered:
+                failures.append(f"{feature} for {topic!r}: {errors[0] if errors else 'nothing rendered'}")
+    finally:
+        await session.close()
+    return latencies, failures
+
+
+async def run_clients(ports, plans):
+    # Clients stick to one worker each, like sessions behind an ip_hash load balancer
+    results = await asyncio.gather(*(run_client(ports[i % len(ports)], plan) for i, plan in enumerate(plans)))
+    return [t for latencies, _ in results for t in latencies], [f for _, failures in results for f in failures]
+
+
+def shared_totals(data_dir):
+    """Read model calls and render counts, as recorded by every worker, from the shared metrics database."""
+    conn = sqlite3.connect(os.path.join(data_dir, "metrics.sqlite3"))
+    try:
+        calls = conn.execute("SELECT COALESCE(SUM(value), 0) FROM counters WHERE name = 'model_calls'").fetchone()[0]
+        renders = conn.execute(
+            "SELECT COALESCE(SUM(seconds_count), 0) FROM stage_totals WHERE stage = 'render'"
+        ).fetchone()[0]
+    finally:
+        conn.close()
+    return int(calls), int(renders)
+
+
+def measure(args, workers):
+    plans = plan_requests(args)
+    data_dir = tempfile.mkdtemp(prefix="study-buddy-workers-")
+    ports = [args.base_port + i for i in range(workers)]
+    server = subprocess.Popen(
+        [sys.executable, SERVE_PATH, "--workers", str(workers), "--base-port", str(args.base_port)],
+        env=worker_environment(args, data_dir), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        wait_until_healthy(ports, args.startup_timeout)
+        started = time.perf_counter()
+        latencies, failures = asyncio.run(run_clients(ports, plans))
+        elapsed = time.perf_counter() - started
+        model_calls, renders = shared_totals(data_dir)
+    finally:
+        server.send_signal(signal.SIGTERM)
+        try:
+            server.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            server.kill()
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+    return {
+        "workers": workers,
+        "requests": len(latencies),
+        "failures": failures,
+        "wall_seconds": round(elapsed, 3),
+        "requests_per_second": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+        "model_calls": model_calls,
+        "renders_recorded": renders,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Throughput of 1..N serve.py workers sharing one data directory.")
+    parser.add_argument("--workers", default="1,2,4", help="comma-separated worker counts to compare")
+    parser.add_argument("--clients", type=int, default=16, help="concurrent browser sessions, spread over the workers")
+    parser.add_argument("--requests", type=int, default=400, help="total quiz/flashcard button clicks per run")
+    parser.add_argument("--latency", type=float, default=0.2, help="fake model time to first token, seconds")
+    parser.add_argument("--zipf", type=float, default=1.1, help="skew of topic popularity")
+    parser.add_argument("--base-port", type=int, default=8601, help="port of the first worker")
+    parser.add_argument("--startup-timeout", type=float, default=60.0, help="seconds to wait for the workers")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="print machine-readable results")
+    args = parser.parse_args()
+
+    results = [measure(args, int(w)) for w in args.workers.split(",")]
+    base = results[0]["requests_per_second"] or 1.0
+    for r in results:
+        r["speedup"] = round(r["requests_per_second"] / base, 2)
+    problems = [
+        f"{r['workers']} workers: {r['model_calls']} model calls vs {results[0]['model_calls']} with "
+        f"{results[0]['workers']}" for r in results if r["model_calls"] > results[0]["model_calls"]
+    ] + [
+        f"{r['workers']} workers: {len(r['failures'])} clicks failed, e.g. {r['failures'][0]}"
+        for r in results if r["failures"]
+    ] + [
+        f"{r['workers']} workers: {r['renders_recorded']} renders in shared metrics for {r['requests']} clicks"
+        for r in results if r["renders_recorded"] < r["requests"]
+    ]
+
+    if args.json:
+        print(json.dumps({"results": results, "problems": problems}, indent=2))
+    else:
+        print(f"{args.clients} clients, {args.requests} clicks, {os.cpu_count()} CPUs")
+        print("workers  req/s  speed-up  p50 ms  p95 ms  model calls")
+        for r in results:
+            print(f"{r['workers']:>7}  {r['requests_per_second']:>5}  {r['speedup']:>8.2f}  "
+                  f"{r['p50_ms']:>6}  {r['p95_ms']:>6}  {r['model_calls']:>11}")
+    for problem in problems:
+        print(f"SHARED STATE: {problem}", file=sys.stderr)
+    if problems:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+import hashlib
+import json
+import threading
+import time
+
+from db import connect
+
+
+def normalize_prompt(prompt):
+    # Prompts that differ only in whitespace get the same answer
+    return " ".join(prompt.split())
+
+
+def make_key(model_name, feature, prompt, params=None):
+    """Content address for a response: same model, feature, prompt and params -> same key."""
+    payload = json.dumps(
+        {"model": model_name, "feature": feature, "prompt": normalize_prompt(prompt), "params": params or {}},
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """Persistent response cache with TTL and size-bounded LRU eviction.
+
+    Entries live in a SQLite database, so every Streamlit session and every
+    worker process pointing at the same path shares the cache and its
+    hit/miss counters.
+    """
+
+    def __init__(self, path, ttl_seconds=7 * 24 * 3600, max_entries=5000):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = connect(path)
+        with self._lock:
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS entries (
+                    key TEXT PRIMARY KEY,
+                    feature TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_entries_accessed ON entries (accessed_at);
+                CREATE TABLE IF NOT EXISTS stats (
+                    name TEXT PRIMARY KEY,
+                    value INTEGER NOT NULL DEFAULT 0
+                );
+            """)
+
+    def _bump(self, name):
+        self._conn.execute(
+            "INSERT INTO stats (name, value) VALUES (?, 1) "
+            "ON CONFLICT(name) DO UPDATE SET value = value + 1",
+            (name,),
+        )
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created_at FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self._bump("misses")
+                return None
+            value, created_at = row
+            if self.ttl_seconds and now - created_at > self.ttl_seconds:
+                self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                self._bump("misses")
+                self._bump("expired")
+                return None
+            self._conn.execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (now, key))
+            self._bump("hits")
+            return value
+
+    def peek(self, key):
+        """Like get(), but without touching LRU order or hit/miss counters."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created_at FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None or (self.ttl_seconds and time.time() - row[1] > self.ttl_seconds):
+            return None
+        return row[0]
+
+    def set(self, key, value, feature=""):
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO entries (key, feature, value, created_at, accessed_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (key, feature, value, now, now),
+                )
+                if self.ttl_seconds:
+                    self._conn.execute(
+                        "DELETE FROM entries WHERE created_at < ?", (now - self.ttl_seconds,)
+                    )
+                if self.max_entries:
+                    evicted = self._conn.execute(
+                        "DELETE FROM entries WHERE key IN ("
+                        "SELECT key FROM entries ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                        (self.max_entries,),
+                    ).rowcount
+                    if evicted > 0:
+                        self._conn.execute(
+                            "INSERT INTO stats (name, value) VALUES ('evictions', ?) "
+                            "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+                            (evicted,),
+                        )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM entries")
+            self._conn.execute("DELETE FROM stats")
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self._conn.execute("SELECT name, value FROM stats").fetchall())
+            entries = self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+        hits = counters.get("hits", 0)
+        misses = counters.get("misses", 0)
+        total = hits + misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "evictions": counters.get("evictions", 0),
+            "expired": counters.get("expired", 0),
+            "entries": entries,
+            "hit_rate": hits / total if total else 0.0,
+        }
@@ -6,7 +6,109 @@ load_dotenv()
 
 # Gemini API configuration
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.0-flash")
+
+# Model backend: "gemini" for the real API, "fake" for the local deterministic stand-in
+MODEL_BACKEND = os.getenv("MODEL_BACKEND", "gemini")
+FAKE_LATENCY_SECONDS = float(os.getenv("FAKE_LATENCY_SECONDS", "0.5"))
+FAKE_TOKENS_PER_SECOND = float(os.getenv("FAKE_TOKENS_PER_SECOND", "200"))
+FAKE_ERROR_RATE = float(os.getenv("FAKE_ERROR_RATE", "0"))
+FAKE_SEED = int(os.getenv("FAKE_SEED", "0"))
 
 # App configuration
 APP_TITLE = "AI-Powered Study Buddy"
 APP_ICON = "📚"
+
+# Local data directory shared by every Streamlit session and worker process
+DATA_DIR = os.getenv("STUDY_BUDDY_DATA_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".study_buddy"))
+
+# Response cache configuration
+CACHE_ENABLED = os.getenv("CACHE_ENABLED", "1") != "0"
+CACHE_PATH = os.getenv("CACHE_PATH", os.path.join(DATA_DIR, "response_cache.sqlite3"))
+CACHE_TTL_SECONDS = int(os.getenv("CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "5000"))
+
+# Stream Explain Concept and Summarize Notes answers into the page as they are generated
+STREAMING_ENABLED = os.getenv("STREAMING_ENABLED", "1") != "0"
+
+# Map-reduce summarization of large notes
+SUMMARY_CHUNK_TOKENS = int(os.getenv("SUMMARY_CHUNK_TOKENS", "3000"))
+SUMMARY_MAX_WORKERS = int(os.getenv("SUMMARY_MAX_WORKERS", "4"))
+
+# Parallel sharded quiz generation
+QUIZ_SHARD_SIZE = int(os.getenv("QUIZ_SHARD_SIZE", "3"))
+QUIZ_MAX_WORKERS = int(os.getenv("QUIZ_MAX_WORKERS", "4"))
+QUIZ_MAX_QUESTIONS_PARALLEL = int(os.getenv("QUIZ_MAX_QUESTIONS_PARALLEL", "45"))
+
+# Request application/json responses for quizzes and flashcards
+JSON_RESPONSE_MIME = os.getenv("JSON_RESPONSE_MIME", "1") != "0"
+
+# Client-side rate limiting shared by all sessions and worker processes
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "1") != "0"
+RATE_LIMIT_PATH = os.getenv("RATE_LIMIT_PATH", os.path.join(DATA_DIR, "rate_limit.sqlite3"))
+RATE_LIMIT_PER_MINUTE = float(os.getenv("RATE_LIMIT_PER_MINUTE", "60"))
+RATE_LIMIT_BURST = int(os.getenv("RATE_LIMIT_BURST", "10"))
+MAX_CONCURRENT_REQUESTS = int(os.getenv("MAX_CONCURRENT_REQUESTS", "8"))
+QUEUE_TIMEOUT_SECONDS = float(os.getenv("QUEUE_TIMEOUT_SECONDS", "120"))
+RETRY_ATTEMPTS = int(os.getenv("RETRY_ATTEMPTS", "4"))
+RETRY_BASE_DELAY = float(os.getenv("RETRY_BASE_DELAY", "1.0"))
+RETRY_MAX_DELAY = float(os.getenv("RETRY_MAX_DELAY", "30.0"))
+
+# Coalesce identical in-flight requests (in-process, and optionally across worker processes)
+SINGLE_FLIGHT_ENABLED = os.getenv("SINGLE_FLIGHT_ENABLED", "1") != "0"
+CROSS_PROCESS_SINGLE_FLIGHT = os.getenv("CROSS_PROCESS_SINGLE_FLIGHT", "1") != "0"
+INFLIGHT_PATH = os.getenv("INFLIGHT_PATH", os.path.join(DATA_DIR, "inflight.sqlite3"))
+
+# Instrumentation: rolling metrics window, Prometheus exposition and cost estimates
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") != "0"
+METRICS_WINDOW_SECONDS = int(os.getenv("METRICS_WINDOW_SECONDS", "900"))
+METRICS_PATH = os.getenv("METRICS_PATH", os.path.join(DATA_DIR, "metrics.prom"))
+# Record metrics in SQLite so every worker process reports the same totals ("0" keeps them in process memory)
+METRICS_SHARED = os.getenv("METRICS_SHARED", "1") != "0"
+METRICS_DB_PATH = os.getenv("METRICS_DB_PATH", os.path.join(DATA_DIR, "metrics.sqlite3"))
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))  # 0 disables the HTTP endpoint
+GEMINI_INPUT_PRICE_PER_MTOK = float(os.getenv("GEMINI_INPUT_PRICE_PER_MTOK", "0.10"))
+GEMINI_OUTPUT_PRICE_PER_MTOK = float(os.getenv("GEMINI_OUTPUT_PRICE_PER_MTOK", "0.40"))
+ADMIN_PANEL = os.getenv("ADMIN_PANEL", "0") == "1"
+
+# Local retrieval index over uploaded study material (top-k passages go into quiz/flashcard prompts)
+RETRIEVAL_ENABLED = os.getenv("RETRIEVAL_ENABLED", "1") != "0"
+RETRIEVAL_PATH = os.getenv("RETRIEVAL_PATH", os.path.join(DATA_DIR, "index"))
+RETRIEVAL_TOP_K = int(os.getenv("RETRIEVAL_TOP_K", "5"))
+RETRIEVAL_PASSAGE_TOKENS = int(os.getenv("RETRIEVAL_PASSAGE_TOKENS", "200"))
+
+# Saved decks and quizzes with spaced-repetition review
+STORE_ENABLED = os.getenv("STORE_ENABLED", "1") != "0"
+STORE_PATH = os.getenv("STORE_PATH", os.path.join(DATA_DIR, "study.sqlite3"))
+STORE_PAGE_SIZE = int(os.getenv("STORE_PAGE_SIZE", "20"))
+
+# Quiz questions and flashcards shown per page
+RENDER_PAGE_SIZE = int(os.getenv("RENDER_PAGE_SIZE", "10"))
+
+# Semantic cache: serve a similar earlier topic's answer (cosine similarity of topic n-gram vectors)
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "1") != "0"
+SEMANTIC_CACHE_PATH = os.getenv("SEMANTIC_CACHE_PATH", os.path.join(DATA_DIR, "semantic_cache.sqlite3"))
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.9"))
+SEMANTIC_CACHE_FEATURES = os.getenv("SEMANTIC_CACHE_FEATURES", "explain,flashcards").split(",")
+# Longer input (pasted notes, or a topic with retrieved passages) only uses the exact-key response cache
+SEMANTIC_CACHE_MAX_TOPIC_WORDS = int(os.getenv("SEMANTIC_CACHE_MAX_TOPIC_WORDS", "12"))
+
+# Preprocessing of pasted material: markup stripping, duplicate-line removal and per-feature token budgets
+PREPROCESS_ENABLED = os.getenv("PREPROCESS_ENABLED", "1") != "0"
+SUMMARY_TOKEN_BUDGET = int(os.getenv("SUMMARY_TOKEN_BUDGET", "100000"))
+QUIZ_TOKEN_BUDGET = int(os.getenv("QUIZ_TOKEN_BUDGET", "8000"))
+FLASHCARDS_TOKEN_BUDGET = int(os.getenv("FLASHCARDS_TOKEN_BUDGET", "8000"))
+
+# Multi-worker mode: serve.py starts WORKERS Streamlit processes on consecutive ports from WORKER_BASE_PORT
+WORKERS = int(os.getenv("WORKERS", "1"))
+WORKER_BASE_PORT = int(os.getenv("WORKER_BASE_PORT", "8501"))
+
+# Background warmer: precompute popular topics at BATCH priority, and prefetch follow-ups for opened topics
+WARMER_ENABLED = os.getenv("WARMER_ENABLED", "1") != "0"
+WARM_TOPICS = [t for t in os.getenv("WARM_TOPICS", "").split(",") if t.strip()]
+WARM_TOPICS_PATH = os.getenv("WARM_TOPICS_PATH", "")  # one topic per line, or CSV/JSONL as for batch.py
+WARM_FEATURES = os.getenv("WARM_FEATURES", "explain,quiz,flashcards").split(",")
+WARM_INTERVAL_SECONDS = float(os.getenv("WARM_INTERVAL_SECONDS", "0"))  # 0 warms once at startup
+WARM_MAX_WORKERS = int(os.getenv("WARM_MAX_WORKERS", "2"))
+PREFETCH_ENABLED = os.getenv("PREFETCH_ENABLED", "1") != "0"
+PREFETCH_FEATURES = os.getenv("PREFETCH_FEATURES", "quiz,flashcards").split(",")
@@ -0,0 +1,18 @@
+import os
+import sqlite3
+
+
+def connect(path, timeout=30.0):
+    """Open a SQLite connection that can be shared safely between processes.
+
+    WAL mode lets readers proceed while another worker is writing, and the
+    busy timeout makes concurrent writers wait instead of failing immediately.
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    conn = sqlite3.connect(path, timeout=timeout, isolation_level=None, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(f"PRAGMA busy_timeout={int(timeout * 1000)}")
+    return conn
@@ -0,0 +1,160 @@
+"""Quiz and flashcard exports.
+
+Every format is produced by a generator of lines which is written into a
+BytesIO, so the items never need to be held in memory together as dicts.
+Items can be any iterable, such as a page-by-page generator over a saved
+deck. The finished export itself is held in memory: st.download_button takes
+the whole file as bytes, so a large export costs its encoded size in memory.
+"""
+import csv
+import io
+import itertools
+import json
+import re
+import zipfile
+
+# format -> (label, file extension, mime type)
+EXPORT_FORMATS = {
+    "txt": ("Text", "txt", "text/plain"),
+    "md": ("Markdown", "md", "text/markdown"),
+    "csv": ("CSV", "csv", "text/csv"),
+    "jsonl": ("JSONL", "jsonl", "application/jsonl"),
+    "anki": ("Anki (TSV)", "txt", "text/tab-separated-values"),
+}
+
+
+def answer_text(q):
+    if q["type"] == "mcq":
+        return q["correct"]
+    if q["type"] == "true_false":
+        return "True" if q["correct"] else "False"
+    return q["answer"]
+
+
+def _csv_lines(header, rows):
+    # One reusable row buffer; the csv module handles quoting and embedded newlines
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in itertools.chain([header], rows):
+        writer.writerow(row)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+
+def _anki_field(text):
+    # Anki's text import treats tabs and newlines as field and note separators
+    return re.sub(r"[\t\r\n]+", " ", str(text)).strip()
+
+
+def _anki_lines(rows):
+    yield "#separator:tab\n#html:false\n"
+    for front, back in rows:
+        yield f"{_anki_field(front)}\t{_anki_field(back)}\n"
+
+
+def _question_block(q):
+    lines = [q["question"]]
+    if q["type"] == "mcq":
+        lines.extend(f"{chr(65 + j)}. {option}" for j, option in enumerate(q["options"]))
+    return lines
+
+
+def quiz_lines(questions, fmt, source=""):
+    if fmt == "txt":
+        yield f"Quiz Generated from: {source}\n\n"
+        for i, q in enumerate(questions, 1):
+            block = _question_block(q)
+            yield f"Question {i}: {block[0]}\n"
+            for option in block[1:]:
+                yield f"   {option}\n"
+            yield f"Answer: {answer_text(q)}\nExplanation: {q['explanation']}\n\n"
+    elif fmt == "md":
+        yield f"# Quiz: {source}\n\n"
+        for i, q in enumerate(questions, 1):
+            block = _question_block(q)
+            yield f"## Question {i}\n\n{block[0]}\n\n"
+            if len(block) > 1:
+                yield "".join(f"- {option}\n" for option in block[1:]) + "\n"
+            yield f"**Answer:** {answer_text(q)}\n\n**Explanation:** {q['explanation']}\n\n"
+    elif fmt == "csv":
+        yield from _csv_lines(
+            ["type", "question", "options", "answer", "explanation"],
+            (
+                [q["type"], q["question"], " | ".join(q.get("options", [])), answer_text(q), q["explanation"]]
+                for q in questions
+            ),
+        )
+    elif fmt == "jsonl":
+        for q in questions:
+            yield json.dumps(q, ensure_ascii=False) + "\n"
+    elif fmt == "anki":
+        yield from _anki_lines(
+            (" ".join(_question_block(q)), f"{answer_text(q)}. {q['explanation']}") for q in questions
+        )
+    else:
+        raise ValueError(f"Unknown export format: {fmt}")
+
+
+def flashcard_lines(cards, fmt, source=""):
+    if fmt == "txt":
+        yield f"Flashcards Generated from: {source}\n\n"
+        for i, card in enumerate(cards, 1):
+            yield f"Card {i}:\nFront: {card['front']}\nBack: {card['back']}\n\n"
+    elif fmt == "md":
+        yield f"# Flashcards: {source}\n\n"
+        for i, card in enumerate(cards, 1):
+            yield f"## Card {i}\n\n**Front:** {card['front']}\n\n**Back:** {card['back']}\n\n"
+    elif fmt == "csv":
+        yield from _csv_lines(["front", "back"], ([card["front"], card["back"]] for card in cards))
+    elif fmt == "jsonl":
+        for card in cards:
+            yield json.dumps({"front": card["front"], "back": card["back"]}, ensure_ascii=False) + "\n"
+    elif fmt == "anki":
+        yield from _anki_lines((card["front"], card["back"]) for card in cards)
+    else:
+        raise ValueError(f"Unknown export format: {fmt}")
+
+
+def export_lines(kind, items, fmt, source=""):
+    if kind == "flashcards":
+        return flashcard_lines(items, fmt, source)
+    return quiz_lines(items, fmt, source)
+
+
+def write_lines(lines, out):
+    for line in lines:
+        out.write(line.encode("utf-8"))
+
+
+def _export_bytes(write):
+    out = io.BytesIO()
+    write(out)
+    return out.getvalue()
+
+
+def export_file(kind, items, fmt, source=""):
+    """Return the export as bytes, ready for st.download_button."""
+    return _export_bytes(lambda out: write_lines(export_lines(kind, items, fmt, source), out))
+
+
+def export_filename(kind, fmt, title=""):
+    stem = re.sub(r"[^A-Za-z0-9_-]+", "_", title).strip("_")[:40] or kind
+    return f"{stem}.{EXPORT_FORMATS[fmt][1]}"
+
+
+def export_deck(store, deck, fmt):
+    """Export one saved deck, reading it from the store page by page."""
+    return export_file(deck["kind"], store.iter_items(deck["id"], deck["kind"]), fmt, deck["title"])
+
+
+def export_decks_zip(store, user, fmt="jsonl"):
+    """Return a zip (as bytes) with one file per saved deck of the user, each read page by page."""
+    def write(out):
+        with zipfile.ZipFile(out, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+            for deck in store.list_decks(user):
+                name = f"{deck['id']}-{deck['kind']}-{export_filename(deck['kind'], fmt, deck['title'])}"
+                with archive.open(name, "w") as entry:
+                    items = store.iter_items(deck["id"], deck["kind"])
+                    write_lines(export_lines(deck["kind"], items, fmt, deck["title"]), entry)
+    return _export_bytes(write)
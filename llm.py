@@ -0,0 +1,243 @@
+import copy
+import time
+from contextlib import contextmanager, nullcontext
+
+from cache import make_key
+from ratelimit import INTERACTIVE, backoff_delay, call_with_retry, is_retryable
+
+
+def _chunk_text(chunk):
+    # Streamed chunks without text parts (e.g. a trailing finish_reason chunk) raise on .text
+    try:
+        return chunk.text or ""
+    except ValueError:
+        return ""
+
+
+class LLMClient:
+    """Thin wrapper around a Gemini model that serves repeated prompts from the response cache.
+
+    Requests that do reach the model go through the shared rate limiter (when
+    one is configured) at this client's priority, and retryable API errors
+    are retried with exponential backoff. Identical requests already in
+    flight are coalesced: in-process through ``singleflight``, and across
+    worker processes through ``inflight`` claims plus the shared cache.
+    Model latency, token usage and cache hits are reported to ``metrics``.
+
+    Callers that pass ``topic`` may also be answered from ``semantic``: an
+    earlier answer to a similar topic, made with the same prompt template and
+    parameters.
+    """
+
+    def __init__(self, model, model_name, cache=None, streaming=True, limiter=None,
+                 priority=INTERACTIVE, retry_attempts=4, retry_base_delay=1.0, retry_max_delay=30.0,
+                 singleflight=None, inflight=None, metrics=None, semantic=None):
+        self.model = model
+        self.model_name = model_name
+        self.cache = cache
+        self.streaming = streaming
+        self.limiter = limiter
+        self.priority = priority
+        self.retry_attempts = retry_attempts
+        self.retry_base_delay = retry_base_delay
+        self.retry_max_delay = retry_max_delay
+        self.singleflight = singleflight
+        self.inflight = inflight
+        self.metrics = metrics
+        self.semantic = semantic
+
+    def with_priority(self, priority):
+        """Return a client sharing this one's model, cache and limiter at another priority."""
+        client = copy.copy(self)
+        client.priority = priority
+        return client
+
+    def cache_key(self, feature, prompt, generation_config=None):
+        return make_key(self.model_name, feature, prompt, generation_config)
+
+    def _slot(self, on_wait=None):
+        if self.limiter is None:
+            return nullcontext()
+        return self.limiter.slot(self.priority, on_wait)
+
+    def _call(self, prompt, generation_config=None, stream=False):
+        kwargs = {}
+        if generation_config:
+            kwargs["generation_config"] = generation_config
+        if stream:
+            kwargs["stream"] = True
+        return self.model.generate_content(prompt, **kwargs)
+
+    @contextmanager
+    def _claim(self, key):
+        """Claim key across processes; yields a cached answer if another process produced it meanwhile."""
+        if self.inflight is None or self.cache is None:
+            yield None
+            return
+        while not self.inflight.claim(key, self.priority):
+            holder = self.inflight.holder_priority(key)
+            if holder is not None and holder > self.priority:
+                # Never wait on a less urgent request (such as a prefetch); send this one as well
+                yield None
+                return
+            self.inflight.wait(key)
+            cached = self.cache.peek(key)
+            if cached is not None:
+                yield cached
+                return
+        try:
+            yield None
+        finally:
+            self.inflight.release(key)
+
+    def _count(self, name, feature):
+        if self.metrics is not None:
+            self.metrics.increment(name, feature)
+
+    def _record(self, feature, prompt, seconds, response):
+        if self.metrics is not None:
+            self.metrics.observe(feature, "gemini", seconds)
+            self.metrics.record_usage(feature, getattr(response, "usage_metadata", None), len(prompt))
+
+    def _send(self, feature, prompt, generation_config=None, on_wait=None):
+        def attempt():
+            with self._slot(on_wait):
+                start = time.perf_counter()
+                response = self._call(prompt, generation_config)
+                text = response.text
+                self._record(feature, prompt, time.perf_counter() - start, response)
+                return text
+        return call_with_retry(
+            attempt, self.retry_attempts, self.retry_base_delay, self.retry_max_delay
+        )
+
+    def _cached(self, feature, key):
+        if self.cache is None:
+            return None
+        cached = self.cache.get(key)
+        self._count("cache_hits" if cached is not None else "cache_misses", feature)
+        return cached
+
+    def _semantic_namespace(self, feature, prompt, topic, generation_config):
+        if self.semantic is None or feature not in self.semantic.features or not self.semantic.accepts(topic):
+            return None
+        # Prompts that differ only in the topic share a namespace; topics are then matched by similarity
+        return self.cache_key(feature, prompt.replace(topic, "\x00", 1), generation_config)
+
+    def _similar(self, feature, namespace, topic):
+        if namespace is None:
+            return None
+        cached = self.semantic.get(namespace, topic)
+        self._count("semantic_hits" if cached is not None else "semantic_misses", feature)
+        return cached
+
+    def _remember(self, namespace, topic, text):
+        if namespace is not None and text:
+            self.semantic.set(namespace, topic, text)
+
+    def generate(self, feature, prompt, generation_config=None, on_wait=None, topic=None):
+        key = self.cache_key(feature, prompt, generation_config)
+        cached = self._cached(feature, key)
+        if cached is not None:
+            return cached
+        namespace = self._semantic_namespace(feature, prompt, topic, generation_config)
+        cached = self._similar(feature, namespace, topic)
+        if cached is not None:
+            return cached
+        if self.singleflight is None:
+            text = self._produce(key, feature, prompt, generation_config, on_wait)
+            self._remember(namespace, topic, text)
+            return text
+        future, leader = self.singleflight.begin(key, self.priority)
+        if not leader:
+            self._count("coalesced", feature)
+            return future.result()
+        try:
+            text = self._produce(key, feature, prompt, generation_config, on_wait)
+        except BaseException as e:
+            self.singleflight.finish(key, error=e, priority=self.priority)
+            raise
+        self.singleflight.finish(key, result=text, priority=self.priority)
+        self._remember(namespace, topic, text)
+        return text
+
+    def _produce(self, key, feature, prompt, generation_config=None, on_wait=None):
+        with self._claim(key) as cached:
+            if cached is not None:
+                return cached
+            text = self._send(feature, prompt, generation_config, on_wait)
+            if self.cache is not None:
+                self.cache.set(key, text, feature=feature)
+            return text
+
+    def stream(self, feature, prompt, generation_config=None, on_wait=None, topic=None):
+        """Yield the response text chunk by chunk as Gemini produces it.
+
+        Cached answers, and answers to an identical request that was already
+        in flight, are yielded in one piece. A streamed answer is written to
+        the cache only once the stream has completed. Retryable errors are
+        retried only if nothing has been yielded yet.
+        """
+        if not self.streaming:
+            yield self.generate(feature, prompt, generation_config, on_wait, topic=topic)
+            return
+        key = self.cache_key(feature, prompt, generation_config)
+        cached = self._cached(feature, key)
+        if cached is not None:
+            yield cached
+            return
+        namespace = self._semantic_namespace(feature, prompt, topic, generation_config)
+        cached = self._similar(feature, namespace, topic)
+        if cached is not None:
+            yield cached
+            return
+        if self.singleflight is not None:
+            future, leader = self.singleflight.begin(key, self.priority)
+            if not leader:
+                self._count("coalesced", feature)
+                yield future.result()
+                return
+        try:
+            with self._claim(key) as cached:
+                if cached is not None:
+                    text = cached
+                    yield cached
+                else:
+                    parts = []
+                    for text_chunk in self._stream_attempts(feature, prompt, generation_config, on_wait, parts):
+                        yield text_chunk
+                    text = "".join(parts)
+                    if self.cache is not None and text:
+                        self.cache.set(key, text, feature=feature)
+                    self._remember(namespace, topic, text)
+        except BaseException as e:
+            if self.singleflight is not None:
+                if isinstance(e, GeneratorExit):
+                    # The leader's page stopped reading; followers must not inherit GeneratorExit
+                    self.singleflight.finish(key, error=RuntimeError("The request was cancelled"), priority=self.priority)
+                else:
+                    self.singleflight.finish(key, error=e, priority=self.priority)
+            raise
+        if self.singleflight is not None:
+            self.singleflight.finish(key, result=text, priority=self.priority)
+
+    def _stream_attempts(self, feature, prompt, generation_config, on_wait, parts):
+        for attempt in range(self.retry_attempts):
+            try:
+                with self._slot(on_wait):
+                    start = time.perf_counter()
+                    chunk = None
+                    for chunk in self._call(prompt, generation_config, stream=True):
+                        text = _chunk_text(chunk)
+                        if text:
+                            if not parts and self.metrics is not None:
+                                self.metrics.observe(feature, "first_token", time.perf_counter() - start)
+                            parts.append(text)
+                            yield text
+                    # The final chunk carries the usage totals for the whole stream
+                    self._record(feature, prompt, time.perf_counter() - start, chunk)
+                return
+            except Exception as e:
+                if parts or attempt == self.retry_attempts - 1 or not is_retryable(e):
+                    raise
+                time.sleep(backoff_delay(attempt, self.retry_base_delay, self.retry_max_delay))
@@ -0,0 +1,283 @@
+"""Per-call instrumentation: stage timings, token counts and estimated cost.
+
+A Metrics instance is shared by every session in a process. It keeps
+cumulative counters for the Prometheus text exposition (served over HTTP
+and/or written to a file) and a rolling window of raw observations for the
+admin sidebar panel. With a database path, both live in SQLite instead of
+process memory, so every worker process records into and reports the same
+totals.
+"""
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from db import connect
+
+# Old rows are trimmed from the shared rolling window at most this often
+_TRIM_INTERVAL_SECONDS = 60
+
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+class Metrics:
+    def __init__(self, window_seconds=900, input_price_per_mtok=0.0, output_price_per_mtok=0.0,
+                 export_path=None, export_interval=10.0, db_path=None):
+        self.window_seconds = window_seconds
+        self.input_price_per_mtok = input_price_per_mtok
+        self.output_price_per_mtok = output_price_per_mtok
+        self.export_path = export_path
+        self.export_interval = export_interval
+        self._lock = threading.Lock()
+        self._timings = deque()  # (timestamp, feature, stage, seconds)
+        self._usage = deque()  # (timestamp, feature, prompt_tokens, response_tokens, cost)
+        self._seconds_sum = defaultdict(float)
+        self._seconds_count = defaultdict(int)
+        self._counters = defaultdict(float)
+        self._conn = None
+        self._last_trim = 0.0
+        if db_path:
+            self._conn = connect(db_path)
+            with self._lock:
+                self._conn.executescript("""
+                    CREATE TABLE IF NOT EXISTS timings (
+                        ts REAL NOT NULL,
+                        feature TEXT NOT NULL,
+                        stage TEXT NOT NULL,
+                        seconds REAL NOT NULL
+                    );
+                    CREATE INDEX IF NOT EXISTS idx_timings_ts ON timings (ts);
+                    CREATE TABLE IF NOT EXISTS usage (
+                        ts REAL NOT NULL,
+                        feature TEXT NOT NULL,
+                        prompt_tokens INTEGER NOT NULL,
+                        response_tokens INTEGER NOT NULL,
+                        cost REAL NOT NULL
+                    );
+                    CREATE INDEX IF NOT EXISTS idx_usage_ts ON usage (ts);
+                    CREATE TABLE IF NOT EXISTS stage_totals (
+                        feature TEXT NOT NULL,
+                        stage TEXT NOT NULL,
+                        seconds_sum REAL NOT NULL,
+                        seconds_count INTEGER NOT NULL,
+                        PRIMARY KEY (feature, stage)
+                    );
+                    CREATE TABLE IF NOT EXISTS counters (
+                        name TEXT NOT NULL,
+                        feature TEXT NOT NULL,
+                        value REAL NOT NULL,
+                        PRIMARY KEY (name, feature)
+                    );
+                """)
+        if export_path:
+            threading.Thread(target=self._export_loop, daemon=True).start()
+
+    def estimate_cost(self, prompt_tokens, response_tokens):
+        return (prompt_tokens * self.input_price_per_mtok + response_tokens * self.output_price_per_mtok) / 1_000_000
+
+    def _write(self, now, statements):
+        """Apply (sql, rows) statements to the shared database in one transaction."""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                for sql, rows in statements:
+                    self._conn.executemany(sql, rows)
+                if now - self._last_trim > _TRIM_INTERVAL_SECONDS:
+                    cutoff = now - self.window_seconds
+                    self._conn.execute("DELETE FROM timings WHERE ts < ?", (cutoff,))
+                    self._conn.execute("DELETE FROM usage WHERE ts < ?", (cutoff,))
+                    self._last_trim = now
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def _counter_rows(self, feature, amounts):
+        return (
+            "INSERT INTO counters (name, feature, value) VALUES (?, ?, ?) "
+            "ON CONFLICT(name, feature) DO UPDATE SET value = value + excluded.value",
+            [(name, feature, amount) for name, amount in amounts],
+        )
+
+    def observe(self, feature, stage, seconds):
+        now = time.time()
+        if self._conn is not None:
+            self._write(now, [
+                ("INSERT INTO timings (ts, feature, stage, seconds) VALUES (?, ?, ?, ?)",
+                 [(now, feature, stage, seconds)]),
+                ("INSERT INTO stage_totals (feature, stage, seconds_sum, seconds_count) VALUES (?, ?, ?, 1) "
+                 "ON CONFLICT(feature, stage) DO UPDATE SET "
+                 "seconds_sum = seconds_sum + excluded.seconds_sum, seconds_count = seconds_count + 1",
+                 [(feature, stage, seconds)]),
+            ])
+            return
+        with self._lock:
+            self._timings.append((now, feature, stage, seconds))
+            self._seconds_sum[(feature, stage)] += seconds
+            self._seconds_count[(feature, stage)] += 1
+            self._trim(now)
+
+    @contextmanager
+    def span(self, feature, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(feature, stage, time.perf_counter() - start)
+
+    def increment(self, name, feature, amount=1):
+        if self._conn is not None:
+            self._write(time.time(), [self._counter_rows(feature, [(name, amount)])])
+            return
+        with self._lock:
+            self._counters[(name, feature)] += amount
+
+    def record_usage(self, feature, usage_metadata, prompt_chars=0):
+        """Record token counts from a Gemini response's usage_metadata."""
+        prompt_tokens = getattr(usage_metadata, "prompt_token_count", 0) or 0
+        response_tokens = getattr(usage_metadata, "candidates_token_count", 0) or 0
+        cost = self.estimate_cost(prompt_tokens, response_tokens)
+        now = time.time()
+        if self._conn is not None:
+            self._write(now, [
+                ("INSERT INTO usage (ts, feature, prompt_tokens, response_tokens, cost) VALUES (?, ?, ?, ?, ?)",
+                 [(now, feature, prompt_tokens, response_tokens, cost)]),
+                self._counter_rows(feature, [
+                    ("prompt_tokens", prompt_tokens), ("response_tokens", response_tokens),
+                    ("prompt_chars", prompt_chars), ("cost_usd", cost), ("model_calls", 1),
+                ]),
+            ])
+            return
+        with self._lock:
+            self._usage.append((now, feature, prompt_tokens, response_tokens, cost))
+            self._counters[("prompt_tokens", feature)] += prompt_tokens
+            self._counters[("response_tokens", feature)] += response_tokens
+            self._counters[("prompt_chars", feature)] += prompt_chars
+            self._counters[("cost_usd", feature)] += cost
+            self._counters[("model_calls", feature)] += 1
+            self._trim(now)
+
+    def _trim(self, now):
+        cutoff = now - self.window_seconds
+        while self._timings and self._timings[0][0] < cutoff:
+            self._timings.popleft()
+        while self._usage and self._usage[0][0] < cutoff:
+            self._usage.popleft()
+
+    def _window(self):
+        """Return the (timings, usage) observations inside the rolling window."""
+        now = time.time()
+        if self._conn is not None:
+            cutoff = now - self.window_seconds
+            with self._lock:
+                timings = self._conn.execute(
+                    "SELECT ts, feature, stage, seconds FROM timings WHERE ts >= ?", (cutoff,)
+                ).fetchall()
+                usage = self._conn.execute(
+                    "SELECT ts, feature, prompt_tokens, response_tokens, cost FROM usage WHERE ts >= ?", (cutoff,)
+                ).fetchall()
+            return timings, usage
+        with self._lock:
+            self._trim(now)
+            return list(self._timings), list(self._usage)
+
+    def _totals(self):
+        """Return the cumulative (seconds_sum, seconds_count, counters) dicts."""
+        if self._conn is not None:
+            with self._lock:
+                stages = self._conn.execute(
+                    "SELECT feature, stage, seconds_sum, seconds_count FROM stage_totals"
+                ).fetchall()
+                counters = self._conn.execute("SELECT name, feature, value FROM counters").fetchall()
+            return (
+                {(feature, stage): total for feature, stage, total, _ in stages},
+                {(feature, stage): count for feature, stage, _, count in stages},
+                {(name, feature): value for name, feature, value in counters},
+            )
+        with self._lock:
+            return dict(self._seconds_sum), dict(self._seconds_count), dict(self._counters)
+
+    def rolling(self):
+        """Aggregates over the rolling window, one row per feature."""
+        timings, usage = self._window()
+        stages = defaultdict(list)
+        for _, feature, stage, seconds in timings:
+            stages[(feature, stage)].append(seconds)
+        rows = {}
+        for (feature, stage), values in sorted(stages.items()):
+            row = rows.setdefault(feature, {"feature": feature})
+            row[f"{stage} p50 ms"] = round(_percentile(values, 0.5) * 1000)
+            row[f"{stage} p95 ms"] = round(_percentile(values, 0.95) * 1000)
+        for _, feature, prompt_tokens, response_tokens, cost in usage:
+            row = rows.setdefault(feature, {"feature": feature})
+            row["calls"] = row.get("calls", 0) + 1
+            row["prompt tokens"] = row.get("prompt tokens", 0) + prompt_tokens
+            row["response tokens"] = row.get("response tokens", 0) + response_tokens
+            row["cost $"] = round(row.get("cost $", 0.0) + cost, 6)
+        return list(rows.values())
+
+    def prometheus_text(self):
+        seconds_sum, seconds_count, counters = self._totals()
+        lines = [
+            "# HELP study_buddy_stage_seconds Time spent per feature and stage.",
+            "# TYPE study_buddy_stage_seconds summary",
+        ]
+        for (feature, stage), total in sorted(seconds_sum.items()):
+            labels = f'feature="{feature}",stage="{stage}"'
+            lines.append(f"study_buddy_stage_seconds_sum{{{labels}}} {total:.6f}")
+            lines.append(f"study_buddy_stage_seconds_count{{{labels}}} {seconds_count[(feature, stage)]}")
+        by_name = defaultdict(list)
+        for (name, feature), value in counters.items():
+            by_name[name].append((feature, value))
+        for name in sorted(by_name):
+            metric = f"study_buddy_{name}_total"
+            lines.append(f"# TYPE {metric} counter")
+            for feature, value in sorted(by_name[name]):
+                lines.append(f'{metric}{{feature="{feature}"}} {value:g}')
+        return "\n".join(lines) + "\n"
+
+    def _export_loop(self):
+        while True:
+            time.sleep(self.export_interval)
+            try:
+                self.write(self.export_path)
+            except OSError:
+                pass
+
+    def write(self, path):
+        """Atomically write the Prometheus exposition to path."""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(self.prometheus_text())
+        os.replace(tmp_path, path)
+
+    def serve(self, port, host="127.0.0.1"):
+        """Serve /metrics on a daemon thread; returns the server."""
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.rstrip("/") != "/metrics":
+                    self.send_error(404)
+                    return
+                body = metrics.prometheus_text().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
@@ -0,0 +1,168 @@
+import json
+import time
+from collections import namedtuple
+
+# Ask Gemini for bare JSON so there is no surrounding prose to skip over
+JSON_RESPONSE_CONFIG = {"response_mime_type": "application/json"}
+
+ParseResult = namedtuple("ParseResult", ["items", "errors"])
+
+
+class ItemScanner:
+    """Incremental, brace-balanced scanner for objects inside a JSON array.
+
+    Text can be fed in arbitrary pieces (e.g. streamed chunks). Every object
+    that is a direct element of an array is returned as soon as its closing
+    brace arrives, so items can be used before the whole response is in.
+    Prose, code fences and anything outside an array are skipped.
+    """
+
+    def __init__(self):
+        self._stack = []
+        self._in_string = False
+        self._escaped = False
+        self._item_start = None
+        self._buffer = []
+
+    def feed(self, text):
+        """Consume more text; return the raw item strings completed by it."""
+        completed = []
+        for ch in text:
+            if self._item_start is not None:
+                self._buffer.append(ch)
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif ch == "\\":
+                    self._escaped = True
+                elif ch == '"':
+                    self._in_string = False
+                continue
+            if ch == '"' and self._stack:
+                self._in_string = True
+            elif ch in "{[":
+                if ch == "{" and self._item_start is None and self._stack and self._stack[-1] == "[":
+                    self._item_start = len(self._stack)
+                    self._buffer = [ch]
+                self._stack.append(ch)
+            elif ch in "}]":
+                expected = "{" if ch == "}" else "["
+                if not self._stack or self._stack[-1] != expected:
+                    # Unbalanced bracket in surrounding prose; start over
+                    self._reset()
+                    continue
+                self._stack.pop()
+                if self._item_start is not None and len(self._stack) == self._item_start:
+                    completed.append("".join(self._buffer))
+                    self._item_start = None
+                    self._buffer = []
+        return completed
+
+    def _reset(self):
+        self._stack = []
+        self._in_string = False
+        self._escaped = False
+        self._item_start = None
+        self._buffer = []
+
+
+def _require_text(item, field):
+    value = item.get(field)
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        value = str(value)
+    if not isinstance(value, str) or not value.strip():
+        raise ValueError(f"missing or empty '{field}'")
+    return value.strip()
+
+
+def _as_bool(value):
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, str) and value.strip().lower() in ("true", "false"):
+        return value.strip().lower() == "true"
+    raise ValueError("'correct' must be true or false")
+
+
+def validate_question(item):
+    """Check a quiz item against its type's shape and return a normalized copy."""
+    if not isinstance(item, dict):
+        raise ValueError("question is not an object")
+    qtype = item.get("type")
+    if qtype not in ("mcq", "true_false", "short_answer"):
+        # Infer the type from the fields present
+        if "options" in item:
+            qtype = "mcq"
+        elif "answer" in item:
+            qtype = "short_answer"
+        elif "correct" in item:
+            qtype = "true_false"
+        else:
+            raise ValueError(f"unknown question type {qtype!r}")
+
+    question = {
+        "type": qtype,
+        "question": _require_text(item, "question"),
+        "explanation": str(item.get("explanation") or "").strip(),
+    }
+    if qtype == "mcq":
+        options = item.get("options")
+        if not isinstance(options, list) or len(options) < 2:
+            raise ValueError("'options' must list at least two choices")
+        question["options"] = [str(option) for option in options]
+        question["correct"] = _require_text(item, "correct")
+    elif qtype == "true_false":
+        question["correct"] = _as_bool(item.get("correct"))
+    else:
+        question["answer"] = _require_text(item, "answer")
+    return question
+
+
+def validate_flashcard(item):
+    if not isinstance(item, dict):
+        raise ValueError("flashcard is not an object")
+    return {"front": _require_text(item, "front"), "back": _require_text(item, "back")}
+
+
+VALIDATORS = {
+    "questions": validate_question,
+    "flashcards": validate_flashcard,
+}
+
+
+def _load_item(raw, validator):
+    return validator(json.loads(raw))
+
+
+def iter_items(chunks, kind, on_parse_time=None):
+    """Yield (item, error) pairs as items complete in a stream of text chunks.
+
+    Exactly one of the pair is set: a validated item, or the error that made
+    an item unusable. on_parse_time, if given, receives the total seconds
+    spent scanning and validating (excluding time waiting for chunks).
+    """
+    validator = VALIDATORS[kind]
+    scanner = ItemScanner()
+    parse_seconds = 0.0
+    for chunk in chunks:
+        start = time.perf_counter()
+        results = []
+        for raw in scanner.feed(chunk):
+            try:
+                results.append((_load_item(raw, validator), None))
+            except ValueError as e:
+                results.append((None, e))
+        parse_seconds += time.perf_counter() - start
+        yield from results
+    if on_parse_time:
+        on_parse_time(parse_seconds)
+
+
+def parse_items(text, kind):
+    """Parse every valid item out of a full response, salvaging what it can."""
+    items, errors = [], []
+    for item, error in iter_items([text], kind):
+        if error is None:
+            items.append(item)
+        else:
+            errors.append(error)
+    return ParseResult(items, errors)
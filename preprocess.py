@@ -0,0 +1,176 @@
+"""Clean up pasted study material before it goes into a prompt.
+
+prepare() strips markup that carries no content, drops slide boilerplate and
+repeated lines, normalizes whitespace, and then fits the text into the
+feature's token budget. Tokens are counted locally. All steps are
+idempotent, so text that has already been prepared passes through unchanged
+and builds the same prompt (and cache key) again.
+"""
+import html
+import math
+import re
+from collections import Counter, namedtuple
+
+from config import PREPROCESS_ENABLED, SUMMARY_TOKEN_BUDGET, QUIZ_TOKEN_BUDGET, FLASHCARDS_TOKEN_BUDGET
+
+# feature -> (token budget, strategy). Quizzes and flashcards sample across the whole
+# document so questions cover all of it; summaries keep the opening and cut the rest.
+TOKEN_BUDGETS = {
+    "summary": (SUMMARY_TOKEN_BUDGET, "truncate"),
+    "quiz": (QUIZ_TOKEN_BUDGET, "sample"),
+    "flashcards": (FLASHCARDS_TOKEN_BUDGET, "sample"),
+}
+
+PreparedText = namedtuple("PreparedText", ["text", "original_tokens", "tokens", "trimmed"])
+
+_TOKEN = re.compile(r"\w+|[^\w\s]")
+_BLOCKS = re.compile(r"<(script|style)\b.*?</\1\s*>|<!--.*?-->", re.IGNORECASE | re.DOTALL)
+# Only real tags of known HTML elements, with name=value attributes, so that "a<b and c>d"
+# or "List<String>" in maths and programming notes are left alone
+_HTML_TAGS = (
+    "a abbr article aside b blockquote body br caption center code col dd del details div dl dt em figcaption "
+    "figure font footer h1 h2 h3 h4 h5 h6 head header hr html i img ins kbd label li main mark nav ol p pre "
+    "s section small span strike strong sub summary sup table tbody td tfoot th thead title tr tt u ul"
+).split()
+_TAG = re.compile(
+    r"</?(?:" + "|".join(_HTML_TAGS) + r")"
+    r"(?:\s+[\w:-]+\s*=\s*(?:\"[^\"]*\"|'[^']*'|[^\s\"'<>]+))*\s*/?>",
+    re.IGNORECASE,
+)
+_MD_IMAGE = re.compile(r"!\[([^\]]*)\]\([^)]*\)")
+_MD_LINK = re.compile(r"\[([^\]]+)\]\([^)]*\)")
+_URL = re.compile(r"https?://\S+")
+_SPACES = re.compile(r"[ \t\f\v\u00a0]+")
+_BLANK_LINES = re.compile(r"\n{3,}")
+_PARAGRAPH_SPLIT = re.compile(r"\n\s*\n")
+# Slide and page furniture: "Slide 3", "Page 2 of 10", copyright footers. A footer needs a year right
+# after the mark ("© 2024 School") or "all rights reserved", so "(c) Metamorphic rock ..." in an
+# (a)/(b)/(c) list and "Copyright protects original works" are kept.
+_COPYRIGHT = r"(?:©|\(c\)|copyright\b)(?:\s*(?:©|\(c\)))?"
+_BOILERPLATE = re.compile(
+    r"^(?:(?:slide|page)\s*\d+(?:\s*(?:of|/)\s*\d+)?"
+    r"|" + _COPYRIGHT + r"\s*(?:19|20)\d{2}\b.*"
+    r"|(?:" + _COPYRIGHT + r".*?)?all rights reserved\.?"
+    r"|confidential)$",
+    re.IGNORECASE,
+)
+# Lines holding only a number such as "12" or "3 / 20"; these are page numbers only when they form a run
+_PAGE_NUMBER = re.compile(r"^(\d+)(?:\s*(?:/|of)\s*\d+)?$", re.IGNORECASE)
+
+
+def count_tokens(text):
+    """Approximate the model's token count: one per punctuation mark, one per ~4 characters of a word."""
+    return sum(math.ceil(len(token) / 4) for token in _TOKEN.findall(text))
+
+
+def strip_markup(text):
+    text = _BLOCKS.sub(" ", text)
+    text = _TAG.sub(" ", text)
+    text = _MD_IMAGE.sub(r"\1", text)
+    text = _MD_LINK.sub(r"\1", text)
+    text = _URL.sub("", text)
+    return html.unescape(text)
+
+
+def drop_page_numbers(lines, min_run=3):
+    """Drop number-only lines that count up one by one, like page numbers: 4, 5, 6, ...
+
+    A number on its own, such as the year "1945" in a list of key dates, is
+    content and is kept. Repeats until nothing changes, so that the result
+    is stable when it is cleaned again.
+    """
+    while True:
+        matches = ((i, _PAGE_NUMBER.match(line)) for i, line in enumerate(lines))
+        numbered = [(i, int(m.group(1))) for i, m in matches if m]
+        drop = set()
+        run = numbered[:1]
+        for item in numbered[1:] + [None]:
+            if item is not None and item[1] == run[-1][1] + 1:
+                run.append(item)
+                continue
+            if len(run) >= min_run:
+                drop.update(i for i, _ in run)
+            run = [item]
+        if not drop:
+            return lines
+        lines = [line for i, line in enumerate(lines) if i not in drop]
+
+
+def collapse_lines(text, repeat_limit=3, min_duplicate_chars=20):
+    """Normalize whitespace, drop slide boilerplate and page numbers, and keep only the first copy of repeated lines.
+
+    Short lines such as "Example" are only deduplicated once they recur
+    `repeat_limit` times, like a title or footer on every slide.
+    """
+    lines = [_SPACES.sub(" ", line).strip() for line in text.replace("\r\n", "\n").replace("\r", "\n").split("\n")]
+    lines = drop_page_numbers(lines, repeat_limit)
+    counts = Counter(line.lower() for line in lines if line)
+    seen = set()
+    kept = []
+    for line in lines:
+        key = line.lower()
+        if line:
+            if _BOILERPLATE.match(line):
+                continue
+            if len(line) >= min_duplicate_chars or counts[key] >= repeat_limit:
+                if key in seen:
+                    continue
+                seen.add(key)
+        kept.append(line)
+    return _BLANK_LINES.sub("\n\n", "\n".join(kept)).strip()
+
+
+def fit_budget(text, max_tokens, strategy="truncate"):
+    """Return (text, trimmed) with text cut down to about max_tokens by whole paragraphs.
+
+    "truncate" keeps paragraphs from the start; "sample" keeps evenly spaced
+    paragraphs from the whole text, in their original order. Paragraphs too
+    big to sample from, such as slides pasted with single newlines, are split
+    into lines first.
+    """
+    total = count_tokens(text)
+    if total <= max_tokens:
+        return text, False
+    # (unit, paragraph number) pairs, so lines of one paragraph are joined back with single newlines
+    units = []
+    for number, paragraph in enumerate(p for p in _PARAGRAPH_SPLIT.split(text) if p.strip()):
+        if count_tokens(paragraph) > max_tokens / 8:
+            units.extend((line, number) for line in paragraph.split("\n") if line.strip())
+        else:
+            units.append((paragraph, number))
+    step = math.ceil(total / max_tokens) if strategy == "sample" else 1
+    kept, used = [], 0
+    for i in range(0, len(units), step):
+        unit, number = units[i]
+        tokens = count_tokens(unit)
+        if used + tokens > max_tokens:
+            if not kept:
+                # A single unit over budget is cut by characters until it fits
+                piece = unit[:max_tokens * 4]
+                while count_tokens(piece) > max_tokens:
+                    piece = piece[:int(len(piece) * 0.9)]
+                kept.append((piece, number))
+            if strategy == "truncate":
+                break
+            continue
+        kept.append((unit, number))
+        used += tokens
+    parts = []
+    for j, (unit, number) in enumerate(kept):
+        if j:
+            parts.append("\n" if number == kept[j - 1][1] else "\n\n")
+        parts.append(unit)
+    return "".join(parts), True
+
+
+def prepare(text, feature):
+    """Clean `text` for `feature` and report how many tokens that saved."""
+    original_tokens = count_tokens(text)
+    if not PREPROCESS_ENABLED:
+        return PreparedText(text, original_tokens, original_tokens, False)
+    cleaned = collapse_lines(strip_markup(text)) or text.strip()
+    trimmed = False
+    if feature in TOKEN_BUDGETS:
+        max_tokens, strategy = TOKEN_BUDGETS[feature]
+        cleaned, trimmed = fit_budget(cleaned, max_tokens, strategy)
+    return PreparedText(cleaned, original_tokens, count_tokens(cleaned), trimmed)
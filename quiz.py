@@ -0,0 +1,158 @@
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from parsing import parse_items
+
+QUIZ_TYPES = ["Mixed (MCQ + True/False)", "Multiple Choice Only", "True/False Only", "Short Answer Only"]
+
+# Sub-focus hints handed to each shard so parallel generations cover different ground
+SHARD_FOCUS_HINTS = [
+    "core definitions and key terminology",
+    "important processes and how they work",
+    "causes, effects and relationships between ideas",
+    "real-world applications and examples",
+    "common misconceptions and tricky details",
+    "comparisons and contrasts between related concepts",
+    "key facts, figures and dates",
+    "reasoning about scenarios and problem solving",
+]
+
+_MCQ_EXAMPLE = """{
+                    "type": "mcq",
+                    "question": "Question text?",
+                    "options": ["A", "B", "C", "D"],
+                    "correct": "A",
+                    "explanation": "Brief explanation"
+                }"""
+
+_TRUE_FALSE_EXAMPLE = """{
+                    "type": "true_false",
+                    "question": "Statement to evaluate",
+                    "correct": true,
+                    "explanation": "Brief explanation"
+                }"""
+
+_SHORT_ANSWER_EXAMPLE = """{
+                    "type": "short_answer",
+                    "question": "Question text?",
+                    "answer": "Expected answer",
+                    "explanation": "Brief explanation"
+                }"""
+
+
+def build_quiz_prompt(source, num_questions, quiz_type, focus=None):
+    if quiz_type == "Mixed (MCQ + True/False)":
+        intro = f"Create a quiz with {num_questions} questions based on: {source}"
+        instructions = "Format: Mix of multiple choice questions (with 4 options each) and true/false questions."
+        examples = [_MCQ_EXAMPLE, _TRUE_FALSE_EXAMPLE]
+    elif quiz_type == "Multiple Choice Only":
+        intro = f"Create {num_questions} multiple choice questions based on: {source}"
+        instructions = "Each question should have 4 options (A, B, C, D)."
+        examples = [_MCQ_EXAMPLE]
+    elif quiz_type == "True/False Only":
+        intro = f"Create {num_questions} true/false questions based on: {source}"
+        instructions = ""
+        examples = [_TRUE_FALSE_EXAMPLE]
+    else:  # Short Answer Only
+        intro = f"Create {num_questions} short answer questions based on: {source}"
+        instructions = ""
+        examples = [_SHORT_ANSWER_EXAMPLE]
+
+    lines = [intro, ""]
+    if focus:
+        lines.append(f"Focus these questions on {focus}.")
+    if instructions:
+        lines.append(instructions)
+    lines.append("Return in this exact JSON format:")
+    lines.append(
+        "{\n            \"questions\": [\n                "
+        + ",\n                ".join(examples)
+        + "\n            ]\n        }"
+    )
+    return "\n        ".join(lines)
+
+
+def extract_questions(text):
+    """Return the valid questions in a response, skipping malformed ones."""
+    result = parse_items(text, "questions")
+    if not result.items:
+        if result.errors:
+            raise ValueError(f"No valid questions in the response ({result.errors[0]})")
+        raise ValueError("Failed to find JSON in the response")
+    return result.items
+
+
+def plan_shards(num_questions, shard_size=3):
+    """Split num_questions into shards of at most shard_size, each with its own focus hint.
+
+    Once the hints run out they are reused with a set number, so that every
+    shard still has a distinct prompt (and cache key) and asks for new questions.
+    """
+    shards = []
+    remaining = num_questions
+    while remaining > 0:
+        count = min(shard_size, remaining)
+        repeat, index = divmod(len(shards), len(SHARD_FOCUS_HINTS))
+        focus = SHARD_FOCUS_HINTS[index]
+        if repeat:
+            focus = f"{focus} (question set {repeat + 1}; ask different questions than earlier sets)"
+        shards.append((count, focus))
+        remaining -= count
+    return shards
+
+
+def _normalize(question):
+    return set(re.findall(r"[a-z0-9]+", question.lower()))
+
+
+class QuestionDeduper:
+    """Drops questions whose word sets are nearly identical to one already accepted."""
+
+    def __init__(self, threshold=0.8):
+        self.threshold = threshold
+        self._seen = []
+
+    def is_duplicate(self, question):
+        words = _normalize(question.get("question", ""))
+        if not words:
+            return False
+        for seen in self._seen:
+            overlap = len(words & seen) / len(words | seen)
+            if overlap >= self.threshold:
+                return True
+        self._seen.append(words)
+        return False
+
+
+def generate_sharded(llm, source, num_questions, quiz_type, shard_size=3, max_workers=4, generation_config=None,
+                     on_parse_time=None, on_wait=None):
+    """Generate a quiz as several concurrent smaller requests.
+
+    Yields (questions, error) per shard in completion order, with questions
+    already deduplicated against earlier shards. A malformed shard yields its
+    error and does not affect the others. on_parse_time, if given, receives
+    the seconds spent parsing each shard. on_wait is passed to every shard's
+    request and is called from the pool's threads.
+    """
+    deduper = QuestionDeduper()
+    shards = plan_shards(num_questions, shard_size)
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = [
+            pool.submit(
+                llm.generate, "quiz", build_quiz_prompt(source, count, quiz_type, focus=focus), generation_config,
+                on_wait=on_wait,
+            )
+            for count, focus in shards
+        ]
+        for future in as_completed(futures):
+            try:
+                text = future.result()
+                start = time.perf_counter()
+                questions = extract_questions(text)
+                if on_parse_time:
+                    on_parse_time(time.perf_counter() - start)
+            except Exception as e:
+                yield [], e
+                continue
+            yield [q for q in questions if not deduper.is_duplicate(q)], None
@@ -0,0 +1,176 @@
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+from db import connect
+
+# Lower value = served first
+INTERACTIVE = 0
+BATCH = 10
+
+_RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+_RETRYABLE_NAMES = {
+    "ResourceExhausted", "TooManyRequests", "ServiceUnavailable",
+    "InternalServerError", "DeadlineExceeded", "GatewayTimeout",
+}
+
+
+class QueueTimeout(Exception):
+    """Raised when a request waited in the queue longer than allowed."""
+
+
+def is_retryable(error):
+    """Quota, overload and timeout errors from the Gemini API are worth retrying."""
+    code = getattr(error, "code", None)
+    if isinstance(code, int) and code in _RETRYABLE_STATUS:
+        return True
+    return type(error).__name__ in _RETRYABLE_NAMES
+
+
+def backoff_delay(attempt, base_delay=1.0, max_delay=30.0):
+    """Exponential backoff with full jitter."""
+    return random.uniform(0, min(max_delay, base_delay * (2 ** attempt)))
+
+
+def call_with_retry(fn, attempts=4, base_delay=1.0, max_delay=30.0, retryable=is_retryable):
+    for attempt in range(attempts):
+        try:
+            return fn()
+        except Exception as e:
+            if attempt == attempts - 1 or not retryable(e):
+                raise
+            time.sleep(backoff_delay(attempt, base_delay, max_delay))
+
+
+class RateLimiter:
+    """Token-bucket rate limiter with a concurrency cap and a priority queue.
+
+    All state (bucket level, waiting tickets and active leases) is kept in
+    SQLite, so every session and worker process using the same path shares
+    one quota. Waiters are served strictly by priority, then arrival order,
+    and can be told their position in the queue while they wait.
+    """
+
+    def __init__(self, path, rate_per_minute=60, burst=10, max_concurrency=8,
+                 lease_seconds=300, poll_interval=0.1, queue_timeout=120):
+        self.path = path
+        self.rate = rate_per_minute / 60.0
+        self.burst = burst
+        self.max_concurrency = max_concurrency
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.queue_timeout = queue_timeout
+        self._lock = threading.Lock()
+        self._conn = connect(path)
+        with self._lock:
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS bucket (
+                    id INTEGER PRIMARY KEY CHECK (id = 1),
+                    tokens REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS tickets (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    priority INTEGER NOT NULL,
+                    heartbeat REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_tickets_order ON tickets (priority, id);
+                CREATE TABLE IF NOT EXISTS leases (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    expires_at REAL NOT NULL
+                );
+            """)
+            self._conn.execute(
+                "INSERT OR IGNORE INTO bucket (id, tokens, updated_at) VALUES (1, ?, ?)",
+                (float(burst), time.time()),
+            )
+
+    def _transaction(self, fn):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = fn(self._conn)
+                self._conn.execute("COMMIT")
+                return result
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def _try_acquire(self, ticket, priority):
+        def attempt(conn):
+            now = time.time()
+            # Forget waiters and holders from crashed processes
+            conn.execute("DELETE FROM tickets WHERE heartbeat < ?", (now - max(5.0, self.poll_interval * 50),))
+            conn.execute("DELETE FROM leases WHERE expires_at < ?", (now,))
+            conn.execute("UPDATE tickets SET heartbeat = ? WHERE id = ?", (now, ticket))
+            ahead = conn.execute(
+                "SELECT COUNT(*) FROM tickets WHERE priority < ? OR (priority = ? AND id < ?)",
+                (priority, priority, ticket),
+            ).fetchone()[0]
+            if ahead:
+                return None, ahead, None
+            tokens, updated_at = conn.execute("SELECT tokens, updated_at FROM bucket WHERE id = 1").fetchone()
+            tokens = min(float(self.burst), tokens + (now - updated_at) * self.rate)
+            active = conn.execute("SELECT COUNT(*) FROM leases").fetchone()[0]
+            conn.execute("UPDATE bucket SET tokens = ?, updated_at = ? WHERE id = 1", (tokens, now))
+            if active >= self.max_concurrency:
+                return None, 0, None
+            if tokens < 1:
+                return None, 0, (1 - tokens) / self.rate if self.rate else None
+            conn.execute("UPDATE bucket SET tokens = ? WHERE id = 1", (tokens - 1,))
+            conn.execute("DELETE FROM tickets WHERE id = ?", (ticket,))
+            lease = conn.execute(
+                "INSERT INTO leases (expires_at) VALUES (?)", (now + self.lease_seconds,)
+            ).lastrowid
+            return lease, 0, None
+        return self._transaction(attempt)
+
+    def acquire(self, priority=INTERACTIVE, on_wait=None):
+        """Block until a request may be sent; return a lease id for release().
+
+        on_wait(position) is called while waiting, with 1 meaning next in line,
+        and once more with 0 when a caller that had to wait gets through.
+        """
+        ticket = self._transaction(lambda conn: conn.execute(
+            "INSERT INTO tickets (priority, heartbeat) VALUES (?, ?)", (priority, time.time())
+        ).lastrowid)
+        deadline = time.monotonic() + self.queue_timeout if self.queue_timeout else None
+        acquired = False
+        try:
+            last_position = None
+            while True:
+                lease, ahead, token_wait = self._try_acquire(ticket, priority)
+                if lease is not None:
+                    acquired = True
+                    if on_wait and last_position is not None:
+                        on_wait(0)
+                    return lease
+                if on_wait and ahead + 1 != last_position:
+                    last_position = ahead + 1
+                    on_wait(last_position)
+                if deadline is not None and time.monotonic() > deadline:
+                    raise QueueTimeout("The AI service is very busy right now. Please try again in a minute.")
+                time.sleep(min(token_wait, 1.0) if token_wait else self.poll_interval)
+        finally:
+            if not acquired:
+                self._transaction(lambda conn: conn.execute("DELETE FROM tickets WHERE id = ?", (ticket,)))
+
+    def release(self, lease):
+        self._transaction(lambda conn: conn.execute("DELETE FROM leases WHERE id = ?", (lease,)))
+
+    @contextmanager
+    def slot(self, priority=INTERACTIVE, on_wait=None):
+        lease = self.acquire(priority, on_wait)
+        try:
+            yield
+        finally:
+            self.release(lease)
+
+    def stats(self):
+        with self._lock:
+            queued = self._conn.execute("SELECT COUNT(*) FROM tickets").fetchone()[0]
+            active = self._conn.execute(
+                "SELECT COUNT(*) FROM leases WHERE expires_at >= ?", (time.time(),)
+            ).fetchone()[0]
+        return {"queued": queued, "active": active}
@@ -0,0 +1,61 @@
+"""Pre-rendered HTML for quiz questions and flashcards, plus pagination helpers.
+
+Each question or card becomes one HTML string, so the page gets a single
+st.markdown call per item instead of several. Strings are memoized on the
+item's canonical JSON, which means reruns and page flips reuse them. Model
+output is escaped before it is put into the markup.
+"""
+import functools
+import json
+from html import escape
+
+
+def _canonical(item):
+    return json.dumps(item, sort_keys=True, ensure_ascii=False)
+
+
+@functools.lru_cache(maxsize=4096)
+def _question_html(i, payload):
+    q = json.loads(payload)
+    parts = [f'<div class="quiz-question"><p><strong>Question {i}:</strong> {escape(q["question"])}</p>']
+    if q["type"] == "mcq":
+        options = "".join(f"<li>{escape(option)}</li>" for option in q["options"])
+        parts.append(f'<ol type="A">{options}</ol>')
+        answer = q["correct"]
+    elif q["type"] == "true_false":
+        answer = "True" if q["correct"] else "False"
+    else:  # short_answer
+        answer = q["answer"]
+    parts.append(f"<p><strong>Answer:</strong> {escape(str(answer))}</p>")
+    parts.append(f"<p><strong>Explanation:</strong> {escape(q['explanation'])}</p></div>")
+    return "".join(parts)
+
+
+def question_html(i, q):
+    return _question_html(i, _canonical(q))
+
+
+@functools.lru_cache(maxsize=4096)
+def _flashcard_html(front, back, flipped):
+    flip_class = " flipped" if flipped else ""
+    return (
+        f'<div class="flashcard"><div class="flashcard-inner{flip_class}">'
+        f'<div class="flashcard-front"><h3>{escape(front)}</h3></div>'
+        f'<div class="flashcard-back"><h3>{escape(back)}</h3></div>'
+        f"</div></div>"
+    )
+
+
+def flashcard_html(card, flipped=False):
+    return _flashcard_html(card["front"], card["back"], bool(flipped))
+
+
+def page_count(total, page_size):
+    return max(1, -(-total // page_size))
+
+
+def page_slice(items, page, page_size):
+    """Return (offset, items) for a zero-based page, clamped to the last page."""
+    page = min(max(page, 0), page_count(len(items), page_size) - 1)
+    start = page * page_size
+    return start, items[start:start + page_size]
@@ -0,0 +1,245 @@
+"""Local BM25 retrieval over uploaded study material.
+
+Documents are split into passages, and each passage is stored as a sparse
+term-frequency vector (CSR arrays in NumPy). The index lives on disk and is
+updated incrementally: re-adding a document with unchanged content is a
+no-op, and a changed document only re-tokenizes that document. For a topic,
+search() returns the top-k passages, so prompts carry a few relevant
+paragraphs instead of the whole corpus. Documents belong to an owner (the
+student who uploaded them): two students may upload files with the same
+name, and search() only looks at the passages of one owner's documents.
+Several worker processes can share
+one index directory: writers hold an exclusive file lock, and each process
+reloads the index when another one has saved a newer version.
+"""
+import hashlib
+import io
+import json
+import os
+import re
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process locking, single worker only
+    fcntl = None
+
+from summarize import split_into_chunks
+
+_WORD = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset("""
+a an and are as at be but by for from has have in is it its of on or that the this to was were will with
+""".split())
+
+
+def tokenize(text):
+    return [word for word in _WORD.findall(text.lower()) if word not in _STOPWORDS and len(word) > 1]
+
+
+def extract_text(name, data):
+    """Return the text of an uploaded .txt, .md or .pdf file."""
+    if name.lower().endswith(".pdf"):
+        try:
+            from pypdf import PdfReader
+        except ImportError:
+            raise RuntimeError("Reading PDF files requires the pypdf package (pip install pypdf)")
+        reader = PdfReader(io.BytesIO(data))
+        return "\n\n".join(page.extract_text() or "" for page in reader.pages)
+    return data.decode("utf-8", errors="replace")
+
+
+def _doc_id(owner, name):
+    return f"{owner}\n{name}"
+
+
+class RetrievalIndex:
+    def __init__(self, directory, passage_tokens=200, k1=1.5, b=0.75):
+        self.directory = directory
+        self.passage_tokens = passage_tokens
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.Lock()
+        self.vocab = {}
+        self.documents = {}  # document id -> {"owner": ..., "name": ..., "hash": ..., "passages": count}
+        self.passages = []  # passage texts
+        self.passage_docs = []  # document id per passage
+        self.indptr = np.zeros(1, dtype=np.int64)
+        self.indices = np.zeros(0, dtype=np.int32)
+        self.data = np.zeros(0, dtype=np.float32)
+        self._version = None
+        with self._file_lock(exclusive=False):
+            self._load()
+        self._refresh_stats()
+
+    # Persistence
+
+    def _paths(self):
+        return os.path.join(self.directory, "index.json"), os.path.join(self.directory, "vectors.npz")
+
+    @contextmanager
+    def _file_lock(self, exclusive):
+        if fcntl is None:
+            yield
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        with open(os.path.join(self.directory, "index.lock"), "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _stat_version(self):
+        try:
+            stat = os.stat(self._paths()[0])
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _sync(self):
+        # Pick up a version saved by another worker process; call with the file lock held
+        version = self._stat_version()
+        if version is not None and version != self._version:
+            self._load()
+            self._refresh_stats()
+
+    def _load(self):
+        meta_path, vectors_path = self._paths()
+        if not (os.path.exists(meta_path) and os.path.exists(vectors_path)):
+            return
+        self._version = self._stat_version()
+        with open(meta_path, encoding="utf-8") as f:
+            meta = json.load(f)
+        vectors = np.load(vectors_path)
+        self.vocab = meta["vocab"]
+        self.documents = meta["documents"]
+        self.passages = meta["passages"]
+        self.passage_docs = meta["passage_docs"]
+        self.indptr = vectors["indptr"]
+        self.indices = vectors["indices"]
+        self.data = vectors["data"]
+
+    def _save(self):
+        os.makedirs(self.directory, exist_ok=True)
+        meta_path, vectors_path = self._paths()
+        meta = {
+            "vocab": self.vocab,
+            "documents": self.documents,
+            "passages": self.passages,
+            "passage_docs": self.passage_docs,
+        }
+        # Write to temporary files first so a crash never leaves a half-written index
+        with open(meta_path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False)
+        with open(vectors_path + ".tmp", "wb") as f:
+            np.savez(f, indptr=self.indptr, indices=self.indices, data=self.data)
+        os.replace(vectors_path + ".tmp", vectors_path)
+        os.replace(meta_path + ".tmp", meta_path)
+        self._version = self._stat_version()
+
+    def _refresh_stats(self):
+        lengths = np.add.reduceat(self.data, self.indptr[:-1]) if len(self.data) else np.zeros(len(self.passages))
+        # reduceat yields the next row's value for empty rows; zero those out
+        lengths = np.where(np.diff(self.indptr) > 0, lengths, 0)
+        self.lengths = lengths.astype(np.float32)
+        self.avg_length = float(self.lengths.mean()) if len(self.lengths) else 0.0
+        df = np.bincount(self.indices, minlength=len(self.vocab)).astype(np.float32)
+        n = max(1, len(self.passages))
+        self.idf = np.log(1 + (n - df + 0.5) / (df + 0.5)).astype(np.float32)
+        self.rows = np.repeat(np.arange(len(self.passages)), np.diff(self.indptr))
+        self.passage_owners = np.array([self.documents[doc]["owner"] for doc in self.passage_docs], dtype=object)
+
+    # Updates
+
+    def _remove(self, doc_id):
+        keep = np.array([doc != doc_id for doc in self.passage_docs], dtype=bool)
+        if keep.all():
+            return
+        counts = np.diff(self.indptr)
+        entry_keep = np.repeat(keep, counts)
+        self.indices = self.indices[entry_keep]
+        self.data = self.data[entry_keep]
+        self.indptr = np.concatenate([[0], np.cumsum(counts[keep])]).astype(np.int64)
+        self.passages = [p for p, k in zip(self.passages, keep) if k]
+        self.passage_docs = [d for d, k in zip(self.passage_docs, keep) if k]
+
+    def add_document(self, name, text, owner=""):
+        """Index (or re-index) owner's document; returns False if it was already indexed unchanged."""
+        digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        doc_id = _doc_id(owner, name)
+        with self._lock, self._file_lock(exclusive=True):
+            self._sync()
+            if self.documents.get(doc_id, {}).get("hash") == digest:
+                return False
+            self._remove(doc_id)
+            chunks = split_into_chunks(text, self.passage_tokens) if text.strip() else []
+            new_indptr, new_indices, new_data = [], [], []
+            offset = int(self.indptr[-1])
+            for chunk in chunks:
+                counts = {}
+                for word in tokenize(chunk):
+                    term = self.vocab.setdefault(word, len(self.vocab))
+                    counts[term] = counts.get(term, 0) + 1
+                new_indices.extend(counts.keys())
+                new_data.extend(counts.values())
+                offset += len(counts)
+                new_indptr.append(offset)
+                self.passages.append(chunk)
+                self.passage_docs.append(doc_id)
+            self.indptr = np.concatenate([self.indptr, np.array(new_indptr, dtype=np.int64)])
+            self.indices = np.concatenate([self.indices, np.array(new_indices, dtype=np.int32)])
+            self.data = np.concatenate([self.data, np.array(new_data, dtype=np.float32)])
+            self.documents[doc_id] = {"owner": owner, "name": name, "hash": digest, "passages": len(chunks)}
+            self._refresh_stats()
+            self._save()
+            return True
+
+    def remove_document(self, name, owner=""):
+        doc_id = _doc_id(owner, name)
+        with self._lock, self._file_lock(exclusive=True):
+            self._sync()
+            if doc_id not in self.documents:
+                return
+            self._remove(doc_id)
+            del self.documents[doc_id]
+            self._refresh_stats()
+            self._save()
+
+    # Queries
+
+    def refresh(self):
+        """Reload the index if another worker process has saved a newer version."""
+        with self._lock:
+            if self._stat_version() != self._version:
+                with self._file_lock(exclusive=False):
+                    self._sync()
+
+    def documents_for(self, owner=""):
+        """Return {name: info} for owner's documents."""
+        with self._lock:
+            return {info["name"]: info for info in self.documents.values() if info["owner"] == owner}
+
+    def search(self, query, k=5, owner=""):
+        """Return up to k (score, passage, document name) tuples from owner's documents, best first, in BM25 order."""
+        self.refresh()
+        with self._lock:
+            terms = [self.vocab[word] for word in set(tokenize(query)) if word in self.vocab]
+            if not terms or not self.passages:
+                return []
+            mask = np.isin(self.indices, np.array(terms, dtype=np.int32))
+            rows = self.rows[mask]
+            tf = self.data[mask]
+            norm = self.k1 * (1 - self.b + self.b * self.lengths[rows] / max(self.avg_length, 1e-9))
+            contributions = self.idf[self.indices[mask]] * tf * (self.k1 + 1) / (tf + norm)
+            scores = np.zeros(len(self.passages), dtype=np.float32)
+            np.add.at(scores, rows, contributions)
+            scores[self.passage_owners != owner] = 0
+            k = min(k, int((scores > 0).sum()))
+            if k == 0:
+                return []
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            return [(float(scores[i]), self.passages[i], self.documents[self.passage_docs[i]]["name"]) for i in top]
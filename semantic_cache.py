@@ -0,0 +1,263 @@
+"""Semantic response cache: serve a new topic from the answer to a similar earlier one.
+
+Topics are embedded locally with hashed character n-grams, so no embedding
+API is involved. Filler words such as "explain" or "simply" are dropped
+first, which lets "explain photosynthesis" and "Photosynthesis explained
+simply" land on the same vector. Vectors are L2-normalized and kept in a
+NumPy matrix per namespace. Lookups only score the candidates found in
+random-hyperplane LSH buckets. Entries are stored in SQLite, so other
+sessions and worker processes pick them up on their next lookup.
+"""
+import re
+import threading
+import time
+import zlib
+
+import numpy as np
+
+from db import connect
+
+FILLER_WORDS = frozenset("""
+a about an and are basics concept define definition describe does explain explained explaining explanation
+for how in intro introduction is me meaning of on overview please simple simply terms tell the to understand
+what whats with
+""".split())
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def topic_words(text):
+    words = []
+    for word in _WORD.findall(text.lower().replace("'s", "")):
+        if word in FILLER_WORDS:
+            continue
+        # Crude plural folding so "cells" and "cell" match
+        if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+            word = word[:-1]
+        words.append(word)
+    return words
+
+
+def embed(text, dim=512, ngram_sizes=(3, 4)):
+    """Return the L2-normalized hashed character n-gram vector of a topic."""
+    vector = np.zeros(dim, dtype=np.float32)
+    for word in topic_words(text):
+        padded = f" {word} "
+        features = [padded]
+        for n in ngram_sizes:
+            features.extend(padded[i:i + n] for i in range(max(1, len(padded) - n + 1)))
+        for feature in features:
+            h = zlib.crc32(feature.encode("utf-8"))
+            # The top bit picks the sign so that hash collisions tend to cancel out
+            vector[h % dim] += -1.0 if h & 0x80000000 else 1.0
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class _Namespace:
+    def __init__(self, dim):
+        self.ids = []
+        self.created = []
+        self.matrix = np.zeros((16, dim), dtype=np.float32)
+        self.buckets = {}
+
+    def add(self, row_id, vector, signatures, created_at):
+        n = len(self.ids)
+        if n == len(self.matrix):
+            self.matrix = np.vstack([self.matrix, np.zeros_like(self.matrix)])
+        self.matrix[n] = vector
+        self.ids.append(row_id)
+        self.created.append(created_at)
+        for bucket in signatures:
+            self.buckets.setdefault(bucket, []).append(n)
+
+
+class SemanticCache:
+    """Similar-topic cache with the same TTL and size bound as the response cache.
+
+    Hit/miss counters are kept in SQLite next to the entries, so stats() covers
+    every session and worker process. Entries older than ttl_seconds are never
+    served. When entries are deleted (expiry, the max_entries bound or clear())
+    a generation counter is bumped and every process rebuilds its in-memory
+    namespaces from the remaining rows on its next lookup.
+    """
+
+    def __init__(self, path, threshold=0.9, features=("explain", "flashcards"),
+                 dim=512, tables=8, bits=6, seed=0, ttl_seconds=7 * 24 * 3600, max_entries=5000,
+                 max_topic_words=12):
+        self.path = path
+        self.threshold = threshold
+        self.features = frozenset(features)
+        self.dim = dim
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_topic_words = max_topic_words
+        # Hyperplanes are seeded so every process computes the same buckets
+        self.planes = np.random.default_rng(seed).standard_normal((tables, bits, dim)).astype(np.float32)
+        self._powers = 1 << np.arange(bits)
+        self._lock = threading.Lock()
+        self._namespaces = {}
+        self._last_id = 0
+        self._generation = 0
+        self._conn = connect(path)
+        with self._lock:
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS semantic_entries (
+                    id INTEGER PRIMARY KEY,
+                    namespace TEXT NOT NULL,
+                    topic TEXT NOT NULL,
+                    vector BLOB NOT NULL,
+                    value TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_semantic_created ON semantic_entries (created_at);
+                CREATE TABLE IF NOT EXISTS semantic_stats (
+                    name TEXT PRIMARY KEY,
+                    value INTEGER NOT NULL DEFAULT 0
+                );
+            """)
+
+    def accepts(self, topic):
+        """Whether topic is short enough to compare by similarity.
+
+        Two long texts, such as notes that differ in one paragraph, share most
+        of their n-grams and would match each other.
+        """
+        return bool(topic) and len(topic.split()) <= self.max_topic_words
+
+    def _bump(self, name, amount=1):
+        self._conn.execute(
+            "INSERT INTO semantic_stats (name, value) VALUES (?, ?) "
+            "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+            (name, amount),
+        )
+
+    def _counter(self, name):
+        row = self._conn.execute("SELECT value FROM semantic_stats WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else 0
+
+    def _cutoff(self):
+        return time.time() - self.ttl_seconds if self.ttl_seconds else float("-inf")
+
+    def _signatures(self, vector):
+        bits = (self.planes @ vector) > 0
+        return [(table, int(code)) for table, code in enumerate(bits @ self._powers)]
+
+    def _refresh(self):
+        # Entries were deleted here or in another process: start over from the rows that are left
+        generation = self._counter("generation")
+        if generation != self._generation:
+            self._namespaces = {}
+            self._last_id = 0
+            self._generation = generation
+        # Pick up entries written by other sessions or worker processes since the last lookup
+        rows = self._conn.execute(
+            "SELECT id, namespace, vector, created_at FROM semantic_entries WHERE id > ? ORDER BY id",
+            (self._last_id,),
+        ).fetchall()
+        for row_id, namespace, blob, created_at in rows:
+            self._last_id = row_id
+            vector = np.frombuffer(blob, dtype=np.float32)
+            if len(vector) != self.dim:
+                continue
+            self._namespaces.setdefault(namespace, _Namespace(self.dim)).add(
+                row_id, vector, self._signatures(vector), created_at
+            )
+
+    def _miss(self):
+        self._bump("misses")
+        return None
+
+    def lookup(self, namespace, topic):
+        """Return (similarity, earlier_topic, value) for the closest match above the threshold, or None."""
+        vector = embed(topic, self.dim)
+        with self._lock:
+            self._refresh()
+            entries = self._namespaces.get(namespace)
+            candidates = set()
+            if entries is not None and vector.any():
+                for bucket in self._signatures(vector):
+                    candidates.update(entries.buckets.get(bucket, ()))
+            if not candidates:
+                return self._miss()
+            rows = np.fromiter(candidates, dtype=np.int64)
+            scores = entries.matrix[rows] @ vector
+            # Expired entries stay in memory until the next prune, but are never served
+            scores[np.asarray(entries.created)[rows] < self._cutoff()] = -np.inf
+            best = int(np.argmax(scores))
+            if scores[best] < self.threshold:
+                return self._miss()
+            match = self._conn.execute(
+                "SELECT topic, value FROM semantic_entries WHERE id = ? AND created_at >= ?",
+                (entries.ids[rows[best]], self._cutoff()),
+            ).fetchone()
+            if match is None:
+                return self._miss()
+            self._bump("hits")
+            return float(scores[best]), match[0], match[1]
+
+    def get(self, namespace, topic):
+        match = self.lookup(namespace, topic)
+        return None if match is None else match[2]
+
+    def set(self, namespace, topic, value):
+        vector = embed(topic, self.dim)
+        if not vector.any():
+            return
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute(
+                    "INSERT INTO semantic_entries (namespace, topic, vector, value, created_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (namespace, topic, vector.tobytes(), value, time.time()),
+                )
+                pruned = 0
+                if self.ttl_seconds:
+                    pruned += self._conn.execute(
+                        "DELETE FROM semantic_entries WHERE created_at < ?", (self._cutoff(),)
+                    ).rowcount
+                if self.max_entries:
+                    pruned += self._conn.execute(
+                        "DELETE FROM semantic_entries WHERE id IN ("
+                        "SELECT id FROM semantic_entries ORDER BY id DESC LIMIT -1 OFFSET ?)",
+                        (self.max_entries,),
+                    ).rowcount
+                if pruned > 0:
+                    self._bump("evictions", pruned)
+                    self._bump("generation")
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._refresh()
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute("DELETE FROM semantic_entries")
+                self._conn.execute("DELETE FROM semantic_stats WHERE name != 'generation'")
+                self._bump("generation")
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._refresh()
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self._conn.execute("SELECT name, value FROM semantic_stats").fetchall())
+            entries = self._conn.execute(
+                "SELECT COUNT(*) FROM semantic_entries WHERE created_at >= ?", (self._cutoff(),)
+            ).fetchone()[0]
+        hits = counters.get("hits", 0)
+        misses = counters.get("misses", 0)
+        total = hits + misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "evictions": counters.get("evictions", 0),
+            "entries": entries,
+            "hit_rate": hits / total if total else 0.0,
+        }
@@ -0,0 +1,98 @@
+"""Run several Streamlit workers of the app behind a load balancer.
+
+Each worker is an ordinary `streamlit run app.py` process on its own port
+(WORKER_BASE_PORT, WORKER_BASE_PORT + 1, ...). All of them use the same
+STUDY_BUDDY_DATA_DIR. The response cache, saved decks, rate limiter,
+in-flight registry, semantic cache, retrieval index and metrics are all
+kept there in SQLite (WAL mode) or lock-protected files, so the workers
+behave like one app. Per-student state (st.session_state) stays in the
+worker that holds the student's websocket, so the load balancer must use
+sticky sessions. Workers that exit unexpectedly are restarted.
+
+Usage:
+    python serve.py --workers 4 --base-port 8501
+"""
+import argparse
+import os
+import signal
+import subprocess
+import sys
+import time
+
+from config import DATA_DIR, METRICS_PORT, WORKERS, WORKER_BASE_PORT
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+APP_PATH = os.path.join(ROOT, "app.py")
+
+# A worker that keeps crashing right after start is not restarted more often than this
+RESTART_DELAY_SECONDS = 2.0
+
+
+def worker_command(port, address):
+    return [
+        sys.executable, "-m", "streamlit", "run", APP_PATH,
+        "--server.port", str(port),
+        "--server.address", address,
+        "--server.headless", "true",
+    ]
+
+
+def worker_environment(index):
+    env = dict(os.environ, STUDY_BUDDY_DATA_DIR=DATA_DIR)
+    # Metrics are shared through SQLite, so one HTTP endpoint reports for every worker
+    env["METRICS_PORT"] = str(METRICS_PORT) if index == 0 else "0"
+    # The popular-topic warmer fills the shared cache once for all workers; every worker still prefetches
+    if index > 0:
+        env["WARMER_ENABLED"] = "0"
+    return env
+
+
+def start_worker(index, port, address):
+    print(f"worker {index}: http://{address}:{port}", file=sys.stderr)
+    return subprocess.Popen(worker_command(port, address), env=worker_environment(index))
+
+
+def run(workers, base_port, address):
+    ports = [base_port + i for i in range(workers)]
+    processes = [start_worker(i, port, address) for i, port in enumerate(ports)]
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+    try:
+        while not stopping:
+            time.sleep(RESTART_DELAY_SECONDS)
+            for i, process in enumerate(processes):
+                if not stopping and process.poll() is not None:
+                    print(f"worker {i} exited with code {process.returncode}, restarting", file=sys.stderr)
+                    processes[i] = start_worker(i, ports[i], address)
+    finally:
+        for process in processes:
+            if process.poll() is None:
+                process.terminate()
+        for process in processes:
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run several Streamlit workers sharing one data directory.")
+    parser.add_argument("--workers", type=int, default=max(1, WORKERS), help="number of worker processes")
+    parser.add_argument("--base-port", type=int, default=WORKER_BASE_PORT, help="port of the first worker")
+    parser.add_argument("--address", default="127.0.0.1", help="address the workers listen on")
+    args = parser.parse_args(argv)
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+    os.makedirs(DATA_DIR, exist_ok=True)
+    run(args.workers, args.base_port, args.address)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
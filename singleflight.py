@@ -0,0 +1,111 @@
+import threading
+import time
+from concurrent.futures import Future
+
+from db import connect
+
+
+class SingleFlight:
+    """Coalesces concurrent identical requests within a process.
+
+    The first caller for a key becomes the leader and does the work; callers
+    that arrive while it is in flight wait on the same future and reuse its
+    result (or its exception). A caller only joins a leader of the same or a
+    more urgent priority (lower value): an interactive request never waits
+    on a batch leader, which may be queued behind every interactive request
+    in the rate limiter, and leads its own flight instead.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}  # key -> {priority: future}
+
+    def begin(self, key, priority=0):
+        """Return (future, is_leader). The leader must call finish() exactly once."""
+        with self._lock:
+            flights = self._calls.setdefault(key, {})
+            joinable = [p for p in flights if p <= priority]
+            if joinable:
+                return flights[min(joinable)], False
+            future = Future()
+            flights[priority] = future
+            return future, True
+
+    def finish(self, key, result=None, error=None, priority=0):
+        with self._lock:
+            flights = self._calls[key]
+            future = flights.pop(priority)
+            if not flights:
+                del self._calls[key]
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def do(self, key, fn, priority=0):
+        future, leader = self.begin(key, priority)
+        if not leader:
+            return future.result()
+        try:
+            result = fn()
+        except BaseException as e:
+            self.finish(key, error=e, priority=priority)
+            raise
+        self.finish(key, result=result, priority=priority)
+        return result
+
+
+class InflightRegistry:
+    """Cross-process in-flight markers stored as SQLite rows.
+
+    A worker process claims a key before calling the model; other processes
+    that find the key claimed wait for the row to disappear and then read the
+    answer from the shared response cache. Claims expire so a crashed worker
+    cannot block a key forever. Claims record the claimant's priority, so that
+    a more urgent caller can see it should not wait on a background one.
+    """
+
+    def __init__(self, path, claim_seconds=120, poll_interval=0.1):
+        self.claim_seconds = claim_seconds
+        self.poll_interval = poll_interval
+        self._lock = threading.Lock()
+        self._conn = connect(path)
+        with self._lock:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS inflight ("
+                "key TEXT PRIMARY KEY, expires_at REAL NOT NULL, priority INTEGER NOT NULL DEFAULT 0)"
+            )
+
+    def claim(self, key, priority=0):
+        now = time.time()
+        with self._lock:
+            self._conn.execute("DELETE FROM inflight WHERE key = ? AND expires_at < ?", (key, now))
+            inserted = self._conn.execute(
+                "INSERT OR IGNORE INTO inflight (key, expires_at, priority) VALUES (?, ?, ?)",
+                (key, now + self.claim_seconds, priority),
+            ).rowcount
+        return inserted == 1
+
+    def holder_priority(self, key):
+        """Priority of the live claim on key, or None if it is not claimed."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT priority FROM inflight WHERE key = ? AND expires_at >= ?", (key, time.time())
+            ).fetchone()
+        return None if row is None else row[0]
+
+    def release(self, key):
+        with self._lock:
+            self._conn.execute("DELETE FROM inflight WHERE key = ?", (key,))
+
+    def wait(self, key, timeout=None):
+        """Block until no live claim exists for key (or timeout passes)."""
+        deadline = time.monotonic() + (timeout or self.claim_seconds)
+        while time.monotonic() < deadline:
+            with self._lock:
+                row = self._conn.execute(
+                    "SELECT 1 FROM inflight WHERE key = ? AND expires_at >= ?", (key, time.time())
+                ).fetchone()
+            if row is None:
+                return
+            time.sleep(self.poll_interval)
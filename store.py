@@ -0,0 +1,234 @@
+"""Persistent store for saved flashcard decks and quizzes, with SM-2 review scheduling.
+
+Decks, cards and quiz items live in a SQLite database shared by every session
+and worker process. Cards carry their own scheduling state (ease, interval,
+repetitions, due day), and "what's due today" is answered from an index on
+(user, due_day) without touching the rest of the deck. Deck contents are read
+one page at a time.
+"""
+import hashlib
+import json
+import threading
+import time
+from datetime import date
+
+from db import connect
+
+MIN_EASE = 1.3
+DEFAULT_EASE = 2.5
+
+# Review grades offered in the UI, on the SM-2 0-5 quality scale
+GRADES = {"Again": 1, "Hard": 3, "Good": 4, "Easy": 5}
+
+
+def today():
+    return date.today().toordinal()
+
+
+def deck_digest(kind, items):
+    payload = json.dumps([kind, items], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def schedule(quality, ease, interval, repetitions):
+    """Apply one SM-2 review and return the new (ease, interval_days, repetitions)."""
+    if quality < 3:
+        repetitions = 0
+        interval = 1
+    else:
+        repetitions += 1
+        if repetitions == 1:
+            interval = 1
+        elif repetitions == 2:
+            interval = 6
+        else:
+            interval = max(1, round(interval * ease))
+    ease = max(MIN_EASE, ease + 0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02))
+    return ease, interval, repetitions
+
+
+class StudyStore:
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = connect(path)
+        with self._lock:
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS decks (
+                    id INTEGER PRIMARY KEY,
+                    user TEXT NOT NULL,
+                    kind TEXT NOT NULL,
+                    title TEXT NOT NULL,
+                    source TEXT NOT NULL,
+                    digest TEXT NOT NULL,
+                    item_count INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    UNIQUE (user, digest)
+                );
+                CREATE INDEX IF NOT EXISTS idx_decks_user ON decks (user, created_at);
+                CREATE TABLE IF NOT EXISTS cards (
+                    id INTEGER PRIMARY KEY,
+                    deck_id INTEGER NOT NULL,
+                    user TEXT NOT NULL,
+                    position INTEGER NOT NULL,
+                    front TEXT NOT NULL,
+                    back TEXT NOT NULL,
+                    ease REAL NOT NULL DEFAULT 2.5,
+                    interval INTEGER NOT NULL DEFAULT 0,
+                    repetitions INTEGER NOT NULL DEFAULT 0,
+                    due_day INTEGER NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_cards_due ON cards (user, due_day);
+                CREATE INDEX IF NOT EXISTS idx_cards_deck ON cards (deck_id, position);
+                CREATE TABLE IF NOT EXISTS quiz_items (
+                    id INTEGER PRIMARY KEY,
+                    deck_id INTEGER NOT NULL,
+                    position INTEGER NOT NULL,
+                    data TEXT NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_quiz_items_deck ON quiz_items (deck_id, position);
+            """)
+
+    def save_deck(self, user, kind, title, source, items):
+        """Save flashcards or quiz questions as a deck and return its id.
+
+        Saving the same items again for the same user returns the existing deck.
+        """
+        digest = deck_digest(kind, items)
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT id FROM decks WHERE user = ? AND digest = ?", (user, digest)
+                ).fetchone()
+                if row is not None:
+                    self._conn.execute("COMMIT")
+                    return row[0]
+                deck_id = self._conn.execute(
+                    "INSERT INTO decks (user, kind, title, source, digest, item_count, created_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (user, kind, title[:200], source, digest, len(items), time.time()),
+                ).lastrowid
+                if kind == "flashcards":
+                    due = today()
+                    self._conn.executemany(
+                        "INSERT INTO cards (deck_id, user, position, front, back, due_day) VALUES (?, ?, ?, ?, ?, ?)",
+                        ((deck_id, user, i, card["front"], card["back"], due) for i, card in enumerate(items)),
+                    )
+                else:
+                    self._conn.executemany(
+                        "INSERT INTO quiz_items (deck_id, position, data) VALUES (?, ?, ?)",
+                        (
+                            (deck_id, i, json.dumps(item, ensure_ascii=False, separators=(",", ":")))
+                            for i, item in enumerate(items)
+                        ),
+                    )
+                self._conn.execute("COMMIT")
+                return deck_id
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def list_decks(self, user):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, kind, title, item_count, created_at FROM decks WHERE user = ? ORDER BY created_at DESC",
+                (user,),
+            ).fetchall()
+        return [
+            {"id": r[0], "kind": r[1], "title": r[2], "item_count": r[3], "created_at": r[4]}
+            for r in rows
+        ]
+
+    def get_deck(self, deck_id):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, user, kind, title, source, item_count FROM decks WHERE id = ?", (deck_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {"id": row[0], "user": row[1], "kind": row[2], "title": row[3], "source": row[4], "item_count": row[5]}
+
+    def delete_deck(self, user, deck_id):
+        """Delete one of user's decks with its cards or questions; returns False if user has no such deck."""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                owned = self._conn.execute(
+                    "SELECT 1 FROM decks WHERE id = ? AND user = ?", (deck_id, user)
+                ).fetchone() is not None
+                if owned:
+                    self._conn.execute("DELETE FROM cards WHERE deck_id = ?", (deck_id,))
+                    self._conn.execute("DELETE FROM quiz_items WHERE deck_id = ?", (deck_id,))
+                    self._conn.execute("DELETE FROM decks WHERE id = ?", (deck_id,))
+                self._conn.execute("COMMIT")
+                return owned
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def load_page(self, deck_id, kind, page, page_size):
+        """Return one page of a deck's cards or quiz questions, in deck order."""
+        start = page * page_size
+        with self._lock:
+            if kind == "flashcards":
+                rows = self._conn.execute(
+                    "SELECT id, front, back, due_day FROM cards "
+                    "WHERE deck_id = ? AND position >= ? ORDER BY position LIMIT ?",
+                    (deck_id, start, page_size),
+                ).fetchall()
+                return [{"id": r[0], "front": r[1], "back": r[2], "due_day": r[3]} for r in rows]
+            rows = self._conn.execute(
+                "SELECT data FROM quiz_items WHERE deck_id = ? AND position >= ? ORDER BY position LIMIT ?",
+                (deck_id, start, page_size),
+            ).fetchall()
+        return [json.loads(r[0]) for r in rows]
+
+    def iter_items(self, deck_id, kind, page_size=500):
+        """Yield every item of a deck in order, reading one page at a time."""
+        page = 0
+        while True:
+            items = self.load_page(deck_id, kind, page, page_size)
+            yield from items
+            if len(items) < page_size:
+                return
+            page += 1
+
+    def due_count(self, user, day=None):
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM cards WHERE user = ? AND due_day <= ?", (user, day or today())
+            ).fetchone()[0]
+
+    def due_cards(self, user, limit=20, day=None):
+        """Return up to `limit` cards due for review, most overdue first."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, deck_id, front, back FROM cards WHERE user = ? AND due_day <= ? "
+                "ORDER BY due_day LIMIT ?",
+                (user, day or today(), limit),
+            ).fetchall()
+        return [{"id": r[0], "deck_id": r[1], "front": r[2], "back": r[3]} for r in rows]
+
+    def review(self, card_id, quality):
+        """Record a review grade (0-5) for a card and schedule its next review."""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT ease, interval, repetitions FROM cards WHERE id = ?", (card_id,)
+                ).fetchone()
+                if row is None:
+                    self._conn.execute("COMMIT")
+                    return None
+                ease, interval, repetitions = schedule(quality, *row)
+                due = today() + interval
+                self._conn.execute(
+                    "UPDATE cards SET ease = ?, interval = ?, repetitions = ?, due_day = ? WHERE id = ?",
+                    (ease, interval, repetitions, due, card_id),
+                )
+                self._conn.execute("COMMIT")
+                return due
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
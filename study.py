@@ -0,0 +1,232 @@
+"""Prompt builders and generation helpers shared by the Streamlit app and the batch CLI.
+
+Nothing in this module imports Streamlit, so it can be used headless. Both
+entry points build identical prompts and cache keys, which means work done
+by one is served from the response cache to the other.
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import partial
+
+from backends import create_model
+from cache import ResponseCache
+from config import (
+    CACHE_ENABLED, CACHE_PATH, CACHE_TTL_SECONDS, CACHE_MAX_ENTRIES,
+    STREAMING_ENABLED, SUMMARY_CHUNK_TOKENS, SUMMARY_MAX_WORKERS,
+    QUIZ_SHARD_SIZE, QUIZ_MAX_WORKERS, JSON_RESPONSE_MIME,
+    RATE_LIMIT_ENABLED, RATE_LIMIT_PATH, RATE_LIMIT_PER_MINUTE, RATE_LIMIT_BURST,
+    MAX_CONCURRENT_REQUESTS, QUEUE_TIMEOUT_SECONDS,
+    RETRY_ATTEMPTS, RETRY_BASE_DELAY, RETRY_MAX_DELAY,
+    SINGLE_FLIGHT_ENABLED, CROSS_PROCESS_SINGLE_FLIGHT, INFLIGHT_PATH,
+    METRICS_ENABLED, METRICS_WINDOW_SECONDS, METRICS_PATH, METRICS_SHARED, METRICS_DB_PATH,
+    GEMINI_INPUT_PRICE_PER_MTOK, GEMINI_OUTPUT_PRICE_PER_MTOK,
+    RETRIEVAL_ENABLED, RETRIEVAL_PATH, RETRIEVAL_TOP_K, RETRIEVAL_PASSAGE_TOKENS,
+    STORE_ENABLED, STORE_PATH,
+    SEMANTIC_CACHE_ENABLED, SEMANTIC_CACHE_PATH, SEMANTIC_CACHE_THRESHOLD, SEMANTIC_CACHE_FEATURES,
+    SEMANTIC_CACHE_MAX_TOPIC_WORDS,
+)
+from llm import LLMClient
+from metrics import Metrics
+from parsing import JSON_RESPONSE_CONFIG, parse_items
+from preprocess import prepare
+from ratelimit import INTERACTIVE, RateLimiter
+from retrieval import RetrievalIndex
+from semantic_cache import SemanticCache
+from singleflight import InflightRegistry, SingleFlight
+from store import StudyStore
+from quiz import QUIZ_TYPES, build_quiz_prompt, extract_questions, generate_sharded
+from summarize import build_summary_prompt
+
+FEATURES = ["explain", "summary", "quiz", "flashcards"]
+
+SUMMARY_LENGTHS = {
+    "Brief (2-3 sentences)": "in 2-3 sentences",
+    "Medium (1 paragraph)": "in one paragraph",
+    "Detailed (2-3 paragraphs)": "in 2-3 paragraphs",
+}
+
+DEFAULT_SUMMARY_LENGTH = "Brief (2-3 sentences)"
+DEFAULT_NUM_QUESTIONS = 5
+DEFAULT_QUIZ_TYPE = QUIZ_TYPES[0]
+DEFAULT_NUM_CARDS = 8
+
+# Generation config for quiz and flashcard requests
+JSON_GENERATION_CONFIG = JSON_RESPONSE_CONFIG if JSON_RESPONSE_MIME else None
+
+
+def create_response_cache():
+    if not CACHE_ENABLED:
+        return None
+    return ResponseCache(CACHE_PATH, ttl_seconds=CACHE_TTL_SECONDS, max_entries=CACHE_MAX_ENTRIES)
+
+
+def create_rate_limiter():
+    if not RATE_LIMIT_ENABLED:
+        return None
+    return RateLimiter(
+        RATE_LIMIT_PATH,
+        rate_per_minute=RATE_LIMIT_PER_MINUTE,
+        burst=RATE_LIMIT_BURST,
+        max_concurrency=MAX_CONCURRENT_REQUESTS,
+        queue_timeout=QUEUE_TIMEOUT_SECONDS,
+    )
+
+
+def create_metrics():
+    if not METRICS_ENABLED:
+        return None
+    return Metrics(
+        window_seconds=METRICS_WINDOW_SECONDS,
+        input_price_per_mtok=GEMINI_INPUT_PRICE_PER_MTOK,
+        output_price_per_mtok=GEMINI_OUTPUT_PRICE_PER_MTOK,
+        export_path=METRICS_PATH,
+        db_path=METRICS_DB_PATH if METRICS_SHARED else None,
+    )
+
+
+def create_retrieval_index():
+    if not RETRIEVAL_ENABLED:
+        return None
+    return RetrievalIndex(RETRIEVAL_PATH, passage_tokens=RETRIEVAL_PASSAGE_TOKENS)
+
+
+def create_study_store():
+    if not STORE_ENABLED:
+        return None
+    return StudyStore(STORE_PATH)
+
+
+def create_semantic_cache():
+    if not SEMANTIC_CACHE_ENABLED:
+        return None
+    return SemanticCache(
+        SEMANTIC_CACHE_PATH, threshold=SEMANTIC_CACHE_THRESHOLD, features=SEMANTIC_CACHE_FEATURES,
+        ttl_seconds=CACHE_TTL_SECONDS, max_entries=CACHE_MAX_ENTRIES, max_topic_words=SEMANTIC_CACHE_MAX_TOPIC_WORDS,
+    )
+
+
+def create_llm(cache=None, limiter=None, priority=INTERACTIVE, metrics=None, semantic=None):
+    """Build the configured model backend and return an LLMClient around it."""
+    model, model_name = create_model()
+    return LLMClient(
+        model, model_name, cache=cache, streaming=STREAMING_ENABLED,
+        limiter=limiter, priority=priority,
+        retry_attempts=RETRY_ATTEMPTS, retry_base_delay=RETRY_BASE_DELAY, retry_max_delay=RETRY_MAX_DELAY,
+        singleflight=SingleFlight() if SINGLE_FLIGHT_ENABLED else None,
+        inflight=InflightRegistry(INFLIGHT_PATH) if SINGLE_FLIGHT_ENABLED and CROSS_PROCESS_SINGLE_FLIGHT else None,
+        metrics=metrics, semantic=semantic,
+    )
+
+
+def build_explain_prompt(topic):
+    return f"Explain '{topic}' in simple, easy-to-understand terms. Use analogies and examples where helpful. Keep it concise but comprehensive."
+
+
+def build_flashcards_prompt(source, num_cards):
+    return f"""Create {num_cards} flashcards based on: {source}
+        
+        Format: Each flashcard should have a clear front (question/keyword) and back (answer/definition).
+        Return in this exact JSON format:
+        {{
+            "flashcards": [
+                {{
+                    "front": "Question or keyword",
+                    "back": "Answer or definition"
+                }}
+            ]
+        }}"""
+
+
+def build_grounded_source(index, topic, k=RETRIEVAL_TOP_K, owner=""):
+    """Return the topic followed by the k most relevant passages of owner's indexed documents.
+
+    Falls back to the topic alone when there is no index or nothing matches.
+    """
+    if index is None:
+        return topic
+    passages = index.search(topic, k, owner=owner)
+    if not passages:
+        return topic
+    material = "\n\n".join(f"[{document}]\n{passage}" for _, passage, document in passages)
+    return f"{topic}\n\nUse the following course material:\n{material}"
+
+
+def explain(llm, topic, on_wait=None):
+    return llm.generate("explain", build_explain_prompt(topic), on_wait=on_wait, topic=topic)
+
+
+def summarize_notes(llm, notes, summary_length=DEFAULT_SUMMARY_LENGTH, on_progress=None, on_wait=None):
+    prompt = build_summary_prompt(
+        llm, prepare(notes, "summary").text, SUMMARY_LENGTHS[summary_length],
+        chunk_tokens=SUMMARY_CHUNK_TOKENS,
+        max_workers=SUMMARY_MAX_WORKERS,
+        on_progress=on_progress,
+        on_wait=on_wait,
+    )
+    return llm.generate("summary", prompt, on_wait=on_wait)
+
+
+def generate_quiz(
+    llm, source, num_questions=DEFAULT_NUM_QUESTIONS, quiz_type=DEFAULT_QUIZ_TYPE, parallel=True, on_wait=None,
+):
+    """Return the list of questions, generating large quizzes as parallel shards."""
+    source = prepare(source, "quiz").text
+    if parallel and num_questions > QUIZ_SHARD_SIZE:
+        questions = []
+        for shard_questions, error in generate_sharded(
+            llm, source, num_questions, quiz_type,
+            shard_size=QUIZ_SHARD_SIZE, max_workers=QUIZ_MAX_WORKERS,
+            generation_config=JSON_GENERATION_CONFIG,
+            on_wait=on_wait,
+        ):
+            questions.extend(shard_questions)
+        if not questions:
+            raise ValueError("No valid questions were generated")
+        return questions
+    prompt = build_quiz_prompt(source, num_questions, quiz_type)
+    return extract_questions(llm.generate("quiz", prompt, JSON_GENERATION_CONFIG, on_wait=on_wait))
+
+
+def generate_flashcards(llm, source, num_cards=DEFAULT_NUM_CARDS, on_wait=None):
+    """Return a ParseResult with the valid flashcards and the errors for skipped ones."""
+    source = prepare(source, "flashcards").text
+    response_text = llm.generate(
+        "flashcards", build_flashcards_prompt(source, num_cards), JSON_GENERATION_CONFIG, on_wait=on_wait, topic=source
+    )
+    return parse_items(response_text, "flashcards")
+
+
+def _timed(job, *args):
+    start = time.perf_counter()
+    result = job(*args)
+    return result, time.perf_counter() - start
+
+
+def generate_study_pack(
+    llm, topic, source=None,
+    summary_length=DEFAULT_SUMMARY_LENGTH, num_questions=DEFAULT_NUM_QUESTIONS,
+    quiz_type=DEFAULT_QUIZ_TYPE, num_cards=DEFAULT_NUM_CARDS, on_wait=None,
+):
+    """Run explain, summary, quiz and flashcards concurrently for one topic.
+
+    `source` is the shared material (for example the topic grounded in
+    retrieved passages) and defaults to the topic itself. Yields
+    (feature, result, error, seconds) in completion order, so the wall time is
+    about that of the slowest generation rather than the sum. on_wait is
+    passed to every request and is called from the pool's threads.
+    """
+    source = source or topic
+    jobs = {
+        "explain": (partial(explain, on_wait=on_wait), llm, topic),
+        "summary": (partial(summarize_notes, on_wait=on_wait), llm, source, summary_length),
+        "quiz": (partial(generate_quiz, on_wait=on_wait), llm, source, num_questions, quiz_type),
+        "flashcards": (partial(generate_flashcards, on_wait=on_wait), llm, source, num_cards),
+    }
+    with ThreadPoolExecutor(max_workers=len(jobs)) as pool:
+        futures = {pool.submit(_timed, *job): feature for feature, job in jobs.items()}
+        for future in as_completed(futures):
+            try:
+                result, elapsed = future.result()
+                yield futures[future], result, None, elapsed
+            except Exception as e:
+                yield futures[future], None, e, None
@@ -0,0 +1,111 @@
+import re
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+_PARAGRAPH_SPLIT = re.compile(r"\n\s*\n")
+_SENTENCE_SPLIT = re.compile(r"(?<=[.!?])\s+")
+
+
+def estimate_tokens(text):
+    # Roughly four characters per token for English prose
+    return max(1, len(text) // 4)
+
+
+def _split_oversized(text, max_tokens):
+    """Split a single paragraph that is over budget on sentence boundaries, then by length."""
+    pieces = []
+    for sentence in _SENTENCE_SPLIT.split(text):
+        if estimate_tokens(sentence) <= max_tokens:
+            pieces.append(sentence)
+            continue
+        width = max_tokens * 4
+        pieces.extend(sentence[i:i + width] for i in range(0, len(sentence), width))
+    return pieces
+
+
+def split_into_chunks(text, max_tokens):
+    """Pack paragraphs (or sentences of long paragraphs) into chunks of at most max_tokens."""
+    units = []
+    for paragraph in _PARAGRAPH_SPLIT.split(text.strip()):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        if estimate_tokens(paragraph) > max_tokens:
+            units.extend(_split_oversized(paragraph, max_tokens))
+        else:
+            units.append(paragraph)
+
+    chunks, current, current_tokens = [], [], 0
+    for unit in units:
+        unit_tokens = estimate_tokens(unit)
+        if current and current_tokens + unit_tokens > max_tokens:
+            chunks.append("\n\n".join(current))
+            current, current_tokens = [], 0
+        current.append(unit)
+        current_tokens += unit_tokens
+    if current:
+        chunks.append("\n\n".join(current))
+    return chunks
+
+
+def build_direct_prompt(notes, length_instruction):
+    return f"Summarize the following text {length_instruction}. Focus on the key points and main ideas:\n\n{notes}"
+
+
+def build_chunk_prompt(chunk):
+    return (
+        "Summarize the following section of a longer document as concise bullet points. "
+        f"Keep every key point, definition and fact:\n\n{chunk}"
+    )
+
+
+def build_reduce_prompt(partials, length_instruction):
+    sections = "\n\n".join(f"Section {i}:\n{partial}" for i, partial in enumerate(partials, 1))
+    return (
+        f"The following are summaries of consecutive sections of one document. "
+        f"Combine them into a single summary {length_instruction}. "
+        f"Focus on the key points and main ideas:\n\n{sections}"
+    )
+
+
+def summarize_chunks(llm, chunks, max_workers=4, on_progress=None, on_wait=None):
+    """Map step: summarize every chunk concurrently, preserving document order.
+
+    Each chunk is a separate cached call, so editing one paragraph of the notes
+    only re-summarizes the chunk that contains it. on_wait is passed to every
+    chunk's request and is called from the pool's threads.
+    """
+    partials = [None] * len(chunks)
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {
+            pool.submit(llm.generate, "summary_chunk", build_chunk_prompt(chunk), on_wait=on_wait): index
+            for index, chunk in enumerate(chunks)
+        }
+        for done, future in enumerate(as_completed(futures), 1):
+            partials[futures[future]] = future.result()
+            if on_progress:
+                on_progress(done, len(chunks))
+    return partials
+
+
+def build_summary_prompt(
+    llm, notes, length_instruction, chunk_tokens=3000, max_workers=4, on_progress=None, on_wait=None,
+):
+    """Return the prompt for the final summary call.
+
+    Notes that fit in one chunk are summarized directly. Larger notes are
+    summarized chunk by chunk and the final prompt reduces the partial
+    summaries; if those are still over budget they are reduced again.
+    """
+    chunks = split_into_chunks(notes, chunk_tokens)
+    if len(chunks) <= 1:
+        return build_direct_prompt(notes, length_instruction)
+    while True:
+        partials = summarize_chunks(llm, chunks, max_workers=max_workers, on_progress=on_progress, on_wait=on_wait)
+        combined = "\n\n".join(partials)
+        if estimate_tokens(combined) <= chunk_tokens:
+            return build_reduce_prompt(partials, length_instruction)
+        next_chunks = split_into_chunks(combined, chunk_tokens)
+        if len(next_chunks) >= len(chunks):
+            # Partial summaries are not shrinking any further; reduce what we have
+            return build_reduce_prompt(partials, length_instruction)
+        chunks = next_chunks
@@ -0,0 +1,50 @@
+import json
+
+from backends import FakeModel
+from batch import job_id, load_completed, run_batch
+from llm import LLMClient
+
+
+class CountingModel(FakeModel):
+    def __init__(self):
+        super().__init__(latency=0, tokens_per_second=1e6)
+        self.calls = 0
+
+    def generate_content(self, prompt, **kwargs):
+        self.calls += 1
+        return super().generate_content(prompt, **kwargs)
+
+
+def write_records(path, records, tail=""):
+    path.write_text("".join(json.dumps(record) + "\n" for record in records) + tail, encoding="utf-8")
+
+
+def test_missing_output_has_nothing_completed(tmp_path):
+    assert load_completed(str(tmp_path / "results.jsonl")) == set()
+
+
+def test_failed_jobs_are_not_completed(tmp_path):
+    path = tmp_path / "results.jsonl"
+    write_records(path, [{"id": "a", "result": "ok"}, {"id": "b", "error": "quota"}], tail="\n")
+    assert load_completed(str(path)) == {"a"}
+
+
+def test_half_written_last_line_is_dropped_from_the_file(tmp_path):
+    path = tmp_path / "results.jsonl"
+    write_records(path, [{"id": "a", "result": "ok"}], tail='{"id": "b", "resu')
+    assert load_completed(str(path)) == {"a"}
+    assert path.read_text(encoding="utf-8") == json.dumps({"id": "a", "result": "ok"}) + "\n"
+
+
+def test_rerun_only_generates_what_is_missing(tmp_path):
+    path = tmp_path / "results.jsonl"
+    rows = [{"topic": "Photosynthesis"}, {"topic": "Mitosis"}]
+    done_row = {"id": job_id("explain", rows[0]), "topic": "Photosynthesis", "feature": "explain", "result": "x"}
+    write_records(path, [done_row], tail='{"id": "cut off mid-wr')
+    model = CountingModel()
+    llm = LLMClient(model, "fake", streaming=False)
+    assert run_batch(llm, rows, ["explain"], str(path), workers=2) == (1, 0, 1)
+    assert model.calls == 1
+    records = [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+    assert [record["topic"] for record in records] == ["Photosynthesis", "Mitosis"]
+    assert run_batch(llm, rows, ["explain"], str(path), workers=2) == (0, 0, 2)
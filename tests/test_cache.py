@@ -0,0 +1,53 @@
+import time
+
+from cache import ResponseCache, make_key
+
+
+def test_prompts_differing_only_in_whitespace_share_a_key():
+    assert make_key("m", "explain", "Explain  photosynthesis\n") == make_key("m", "explain", "Explain photosynthesis")
+    assert make_key("m", "explain", "photosynthesis") != make_key("m", "quiz", "photosynthesis")
+
+
+def test_expired_entries_are_not_served(tmp_path):
+    cache = ResponseCache(str(tmp_path / "cache.sqlite3"), ttl_seconds=60)
+    cache.set("k", "old answer")
+    assert cache.get("k") == "old answer"
+    cache._conn.execute("UPDATE entries SET created_at = ?", (time.time() - 120,))
+    assert cache.peek("k") is None
+    assert cache.get("k") is None
+    stats = cache.stats()
+    assert (stats["expired"], stats["entries"]) == (1, 0)
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = ResponseCache(str(tmp_path / "cache.sqlite3"), max_entries=2)
+    cache.set("a", "A")
+    cache.set("b", "B")
+    cache._conn.execute("UPDATE entries SET accessed_at = accessed_at - 10")
+    # Reading "a" makes "b" the least recently used entry
+    assert cache.get("a") == "A"
+    cache.set("c", "C")
+    assert (cache.peek("a"), cache.peek("b"), cache.peek("c")) == ("A", None, "C")
+    assert cache.stats()["evictions"] == 1
+
+
+def test_peek_does_not_change_lru_order_or_counters(tmp_path):
+    cache = ResponseCache(str(tmp_path / "cache.sqlite3"), max_entries=2)
+    cache.set("a", "A")
+    cache.set("b", "B")
+    cache._conn.execute("UPDATE entries SET accessed_at = accessed_at - 10 WHERE key = 'a'")
+    assert cache.peek("a") == "A"
+    cache.set("c", "C")
+    assert cache.peek("a") is None
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"]) == (0, 0)
+
+
+def test_entries_and_stats_are_shared_between_processes(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    cache, other = ResponseCache(path), ResponseCache(path)
+    cache.set("k", "answer", feature="explain")
+    assert other.get("k") == "answer"
+    assert cache.get("missing") is None
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["hit_rate"]) == (1, 1, 0.5)
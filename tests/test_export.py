@@ -0,0 +1,54 @@
+import csv
+import io
+import json
+import zipfile
+
+import pytest
+from streamlit.runtime.download_data_util import convert_data_to_bytes_and_infer_mime
+
+from export import EXPORT_FORMATS, export_deck, export_decks_zip, export_file
+from store import StudyStore
+
+QUESTIONS = [
+    {"type": "mcq", "question": "Where does photosynthesis happen?", "options": ["Chloroplast", "Nucleus", "Ribosome", "Wall"],
+     "correct": "A", "explanation": "Chloroplasts hold chlorophyll."},
+    {"type": "true_false", "question": "Plants release oxygen.", "correct": True, "explanation": "It is a by-product."},
+    {"type": "short_answer", "question": "Name the green pigment.", "answer": "Chlorophyll",
+     "explanation": "It absorbs light."},
+]
+CARDS = [
+    {"front": "Mitosis", "back": "Division into two identical nuclei,\nwith a comma"},
+    {"front": "Meiosis\ttab", "back": "Division producing gametes"},
+]
+
+
+def download_bytes(data):
+    """Run export data through the same conversion st.download_button applies to a callable's result."""
+    payload, _ = convert_data_to_bytes_and_infer_mime(data, RuntimeError("Callable returned unsupported type"))
+    return payload
+
+
+@pytest.mark.parametrize("fmt", list(EXPORT_FORMATS))
+@pytest.mark.parametrize("kind, items", [("quiz", QUESTIONS), ("flashcards", CARDS)])
+def test_export_file_is_accepted_by_download_button(kind, items, fmt):
+    text = download_bytes(export_file(kind, items, fmt, source="Biology")).decode("utf-8")
+    assert text
+    if fmt == "jsonl":
+        assert [json.loads(line) for line in text.splitlines()][0]["question" if kind == "quiz" else "front"]
+    if fmt == "csv":
+        rows = list(csv.reader(io.StringIO(text)))
+        assert len(rows) == len(items) + 1
+
+
+def test_saved_deck_and_zip_exports_are_accepted_by_download_button(tmp_path):
+    store = StudyStore(str(tmp_path / "study.sqlite3"))
+    store.save_deck("ana", "flashcards", "Cells", "Cells", CARDS)
+    store.save_deck("ana", "quiz", "Photosynthesis", "Photosynthesis", QUESTIONS)
+    for deck in store.list_decks("ana"):
+        assert download_bytes(export_deck(store, deck, "anki"))
+
+    archive = zipfile.ZipFile(io.BytesIO(download_bytes(export_decks_zip(store, "ana"))))
+    names = archive.namelist()
+    assert len(names) == 2
+    for name in names:
+        assert archive.read(name).decode("utf-8").count("\n") in (len(CARDS), len(QUESTIONS))
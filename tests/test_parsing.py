@@ -0,0 +1,65 @@
+import json
+
+import pytest
+
+from parsing import ItemScanner, iter_items, parse_items, validate_question
+
+MCQ = {"type": "mcq", "question": "Where does photosynthesis happen?",
+       "options": ["Chloroplast", "Nucleus"], "correct": "Chloroplast", "explanation": "Light is captured there."}
+TRUE_FALSE = {"type": "true_false", "question": "Mitochondria make ATP.", "correct": True}
+
+
+def test_scanner_returns_each_item_as_soon_as_it_closes():
+    scanner = ItemScanner()
+    first, second = json.dumps(MCQ), json.dumps(TRUE_FALSE)
+    assert scanner.feed("[" + first[:-1]) == []
+    assert scanner.feed("}, " + second[:10]) == [first]
+    assert scanner.feed(second[10:] + "]") == [second]
+
+
+def test_items_split_across_chunks_at_every_position():
+    text = json.dumps({"questions": [MCQ, {"question": 'A "quoted" {brace} \\ item', "answer": "x"}]})
+    for cut in range(1, len(text)):
+        items = [item for item, error in iter_items([text[:cut], text[cut:]], "questions")]
+        assert [item["question"] for item in items] == [MCQ["question"], 'A "quoted" {brace} \\ item']
+
+
+def test_prose_and_code_fences_around_the_json_are_skipped():
+    text = f"Sure! Here is your quiz (with {{braces}}):\n```json\n[{json.dumps(MCQ)}]\n```\nGood luck!"
+    result = parse_items(text, "questions")
+    assert [item["question"] for item in result.items] == [MCQ["question"]]
+    assert result.errors == []
+
+
+def test_good_items_after_a_bad_one_are_salvaged():
+    bad = {"type": "mcq", "question": "Only one option?", "options": ["A"], "correct": "A"}
+    text = f"[{json.dumps(MCQ)}, {json.dumps(bad)}, {json.dumps(TRUE_FALSE)}]"
+    result = parse_items(text, "questions")
+    assert [item["type"] for item in result.items] == ["mcq", "true_false"]
+    assert len(result.errors) == 1
+
+
+def test_truncated_response_keeps_the_complete_items():
+    text = f"[{json.dumps(MCQ)}, {json.dumps(TRUE_FALSE)[:20]}"
+    assert parse_items(text, "questions").items == [validate_question(MCQ)]
+
+
+@pytest.mark.parametrize("item, expected", [
+    ({"question": "2 + 2?", "answer": 4}, {"type": "short_answer", "answer": "4"}),
+    ({"question": "Water boils at 100 C.", "correct": "TRUE"}, {"type": "true_false", "correct": True}),
+    ({"question": "Pick one", "options": [1, 2], "correct": "1"}, {"type": "mcq", "options": ["1", "2"]}),
+])
+def test_question_type_is_inferred_and_values_normalized(item, expected):
+    question = validate_question(item)
+    assert {key: question[key] for key in expected} == expected
+
+
+@pytest.mark.parametrize("item", [
+    "not an object",
+    {"type": "mcq", "question": "", "options": ["A", "B"], "correct": "A"},
+    {"type": "true_false", "question": "Is it?", "correct": "maybe"},
+    {"question": "No answer fields"},
+])
+def test_invalid_questions_are_rejected(item):
+    with pytest.raises(ValueError):
+        validate_question(item)
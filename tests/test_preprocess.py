@@ -0,0 +1,66 @@
+import pytest
+
+from preprocess import collapse_lines, count_tokens, fit_budget, prepare, strip_markup
+
+
+@pytest.mark.parametrize("text", [
+    "If a<b and c>d then a<d.",
+    "A List<String> maps to Map<K, V>.",
+    "x<y, p>q and <x> is a variable",
+])
+def test_comparisons_and_generics_are_kept(text):
+    assert strip_markup(text) == text
+
+
+def test_html_tags_are_stripped():
+    text = strip_markup('<p class="intro">Cells <b>divide</b> by <a href=\'/m\'>mitosis</a>.<br/></p>')
+    assert " ".join(text.split()) == "Cells divide by mitosis ."
+
+
+def test_years_are_kept_but_page_numbers_dropped():
+    notes = "Key dates\n1939\nWar begins\n1945\nWar ends\n\n1\nIntro\n2\nCauses\n3\nOutcome\n4"
+    lines = collapse_lines(notes).split("\n")
+    assert "1939" in lines and "1945" in lines
+    assert not {"1", "2", "3", "4"} & set(lines)
+
+
+@pytest.mark.parametrize("line", [
+    "(c) Metamorphic rock forms under heat and pressure.",
+    "Copyright protects original works of authorship.",
+    "© is the copyright symbol.",
+])
+def test_lines_starting_like_a_copyright_notice_are_kept(line):
+    notes = f"Rock types\n(a) Igneous rock forms from magma.\n(b) Sedimentary rock forms in layers.\n{line}"
+    assert prepare(notes, "quiz").text.split("\n")[-1] == line
+
+
+@pytest.mark.parametrize("footer", [
+    "© 2024 Springfield High School", "(c) 2023-2024 Acme Learning Ltd.", "Copyright © 2024 Acme",
+    "Copyright 2022, all rights reserved", "© Acme Learning. All rights reserved.", "All rights reserved.",
+])
+def test_copyright_footers_are_dropped(footer):
+    assert collapse_lines(f"Mitosis\n{footer}\nMeiosis") == "Mitosis\nMeiosis"
+
+
+def test_slide_furniture_is_dropped():
+    notes = "Slide 1\nMitosis\nPage 2 of 10\nMeiosis\n© 2024 School\n1 / 3\nA\n2 / 3\nB\n3 / 3"
+    assert collapse_lines(notes) == "Mitosis\nMeiosis\nA\nB"
+
+
+@pytest.mark.parametrize("notes", [
+    "4\nIntro\n1\n2\n3\n5\n6\nEnd",
+    "If a<b and c>d\n1945\n<p>text</p>\n" + "Repeated footer line for slides\n" * 4,
+])
+def test_prepare_is_idempotent(notes):
+    once = prepare(notes, "quiz").text
+    assert prepare(once, "quiz").text == once
+
+
+def test_sample_spreads_over_text_pasted_with_single_newlines():
+    lines = [f"Line {i} covers fact number {i} about cell biology." for i in range(5000)]
+    text, trimmed = fit_budget("\n".join(lines), 3000, "sample")
+    kept = text.split("\n")
+    assert trimmed and count_tokens(text) <= 3000
+    assert set(kept) <= set(lines)
+    assert int(kept[-1].split()[1]) > 4900
+    assert fit_budget(text, 3000, "sample") == (text, False)
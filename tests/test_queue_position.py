@@ -0,0 +1,54 @@
+import threading
+
+from backends import FakeModel
+from llm import LLMClient
+from quiz import QUIZ_TYPES, generate_sharded
+from ratelimit import RateLimiter
+from study import generate_study_pack
+from summarize import build_summary_prompt
+
+
+def queued_client(tmp_path):
+    """A client whose limiter lets one request through at a time, so concurrent requests queue."""
+    limiter = RateLimiter(str(tmp_path / "limiter.sqlite3"), rate_per_minute=60000, burst=100, max_concurrency=1,
+                          poll_interval=0.01)
+    return LLMClient(FakeModel(latency=0.05, tokens_per_second=1e6), "fake", streaming=False, limiter=limiter)
+
+
+class Recorder:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = []
+
+    def __call__(self, position):
+        with self.lock:
+            self.calls.append((threading.current_thread().name, position))
+
+    def waited(self):
+        """Threads that were told a queue position, checking each was told when it got through."""
+        threads = {name for name, position in self.calls if position}
+        for name in threads:
+            assert [p for n, p in self.calls if n == name][-1] == 0
+        return threads
+
+
+def test_sharded_quiz_reports_queue_position(tmp_path):
+    on_wait = Recorder()
+    shards = list(generate_sharded(queued_client(tmp_path), "Photosynthesis", 9, QUIZ_TYPES[1], on_wait=on_wait))
+    assert len(shards) == 3 and all(error is None for _, error in shards)
+    assert on_wait.waited() and threading.current_thread().name not in on_wait.waited()
+
+
+def test_summary_map_step_reports_queue_position(tmp_path):
+    on_wait = Recorder()
+    notes = "\n\n".join(f"Section {i} on cell division. " * 30 for i in range(6))
+    build_summary_prompt(queued_client(tmp_path), notes, "in one paragraph", chunk_tokens=200, on_wait=on_wait)
+    assert on_wait.waited()
+
+
+def test_study_pack_reports_queue_position(tmp_path):
+    on_wait = Recorder()
+    results = list(generate_study_pack(queued_client(tmp_path), "Photosynthesis", on_wait=on_wait))
+    assert sorted(feature for feature, *_ in results) == ["explain", "flashcards", "quiz", "summary"]
+    assert all(error is None for _, _, error, _ in results)
+    assert on_wait.waited()
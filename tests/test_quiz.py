@@ -0,0 +1,24 @@
+import pytest
+
+import study
+from backends import FakeModel
+from cache import ResponseCache
+from config import QUIZ_MAX_QUESTIONS_PARALLEL, QUIZ_SHARD_SIZE
+from llm import LLMClient
+from quiz import QUIZ_TYPES, SHARD_FOCUS_HINTS, build_quiz_prompt, plan_shards
+
+
+def test_every_shard_has_its_own_prompt():
+    shards = plan_shards(QUIZ_MAX_QUESTIONS_PARALLEL, QUIZ_SHARD_SIZE)
+    prompts = {build_quiz_prompt("Photosynthesis", count, QUIZ_TYPES[1], focus=focus) for count, focus in shards}
+    assert len(shards) > len(SHARD_FOCUS_HINTS) and len(prompts) == len(shards)
+    assert sum(count for count, _ in shards) == QUIZ_MAX_QUESTIONS_PARALLEL
+
+
+@pytest.mark.parametrize("num_questions", [len(SHARD_FOCUS_HINTS) * QUIZ_SHARD_SIZE + 6, QUIZ_MAX_QUESTIONS_PARALLEL])
+def test_large_quiz_returns_every_question(tmp_path, num_questions):
+    llm = LLMClient(
+        FakeModel(latency=0, tokens_per_second=1e6), "fake", cache=ResponseCache(str(tmp_path / "cache.sqlite3")),
+        streaming=False,
+    )
+    assert len(study.generate_quiz(llm, "Photosynthesis", num_questions, QUIZ_TYPES[1])) == num_questions
@@ -0,0 +1,29 @@
+from retrieval import RetrievalIndex
+from study import build_grounded_source
+
+ALICE_NOTES = "Photosynthesis turns light into chemical energy in the chloroplast."
+BOB_NOTES = "Photosynthesis was covered in week three; mitochondria make ATP."
+
+
+def test_same_file_name_from_two_students(tmp_path):
+    index = RetrievalIndex(str(tmp_path))
+    index.add_document("notes.pdf", ALICE_NOTES, owner="alice")
+    index.add_document("notes.pdf", BOB_NOTES, owner="bob")
+    assert index.documents_for("alice")["notes.pdf"]["passages"] == 1
+    assert index.documents_for("bob")["notes.pdf"]["passages"] == 1
+    # Another process loading the saved index sees both documents too
+    reloaded = RetrievalIndex(str(tmp_path))
+    assert [p for _, p, _ in reloaded.search("photosynthesis", owner="alice")] == [ALICE_NOTES]
+    assert [p for _, p, _ in reloaded.search("photosynthesis", owner="bob")] == [BOB_NOTES]
+
+
+def test_search_is_scoped_to_the_owner(tmp_path):
+    index = RetrievalIndex(str(tmp_path))
+    index.add_document("notes.pdf", ALICE_NOTES, owner="alice")
+    assert index.search("chloroplast", owner="bob") == []
+    assert index.documents_for("bob") == {}
+    assert build_grounded_source(index, "chloroplast", owner="bob") == "chloroplast"
+    assert ALICE_NOTES in build_grounded_source(index, "chloroplast", owner="alice")
+    index.remove_document("notes.pdf", owner="bob")
+    assert index.search("chloroplast", owner="alice")[0][2] == "notes.pdf"
+
@@ -0,0 +1,84 @@
+import time
+
+from backends import FakeModel
+from llm import LLMClient
+from semantic_cache import SemanticCache
+from study import generate_flashcards
+
+
+def test_expired_entries_are_not_served(tmp_path):
+    cache = SemanticCache(str(tmp_path / "semantic.sqlite3"), ttl_seconds=60)
+    cache.set("explain", "photosynthesis", "old answer")
+    assert cache.get("explain", "explain photosynthesis") == "old answer"
+    cache._conn.execute("UPDATE semantic_entries SET created_at = ?", (time.time() - 120,))
+    assert cache.get("explain", "explain photosynthesis") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_entries_are_bounded_and_namespaces_rebuilt(tmp_path):
+    path = str(tmp_path / "semantic.sqlite3")
+    cache = SemanticCache(path, max_entries=3)
+    other = SemanticCache(path, max_entries=3)
+    topics = ["photosynthesis", "mitosis", "plate tectonics", "black holes", "supply and demand"]
+    for topic in topics:
+        cache.set("explain", topic, topic.upper())
+    assert other.get("explain", "explain mitosis") is None
+    assert other.get("explain", "supply and demand explained") == "SUPPLY AND DEMAND"
+    for process in (cache, other):
+        assert sum(len(ns.ids) for ns in process._namespaces.values()) == 3
+    assert cache.stats()["evictions"] == 2
+
+
+def test_stats_are_shared_between_processes(tmp_path):
+    path = str(tmp_path / "semantic.sqlite3")
+    cache, other = SemanticCache(path), SemanticCache(path)
+    cache.set("explain", "photosynthesis", "answer")
+    assert other.get("explain", "photosynthesis explained simply") == "answer"
+    assert cache.get("explain", "black holes") is None
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 1, 1)
+
+
+def test_clear_lets_other_processes_start_over(tmp_path):
+    path = str(tmp_path / "semantic.sqlite3")
+    cache, other = SemanticCache(path), SemanticCache(path)
+    cache.set("explain", "photosynthesis", "first")
+    assert other.get("explain", "photosynthesis") == "first"
+    cache.clear()
+    cache.set("explain", "photosynthesis", "second")
+    assert other.get("explain", "photosynthesis") == "second"
+
+
+class CountingModel(FakeModel):
+    def __init__(self):
+        super().__init__(latency=0, tokens_per_second=1e6)
+        self.calls = 0
+
+    def generate_content(self, prompt, **kwargs):
+        self.calls += 1
+        return super().generate_content(prompt, **kwargs)
+
+
+def semantic_client(tmp_path):
+    model = CountingModel()
+    semantic = SemanticCache(str(tmp_path / "semantic.sqlite3"))
+    return LLMClient(model, "fake", streaming=False, semantic=semantic), model
+
+
+def test_edited_notes_are_not_served_the_old_deck(tmp_path):
+    llm, model = semantic_client(tmp_path)
+    shared = "\n\n".join(
+        f"Paragraph {i}: photosynthesis converts light energy into chemical energy stored in glucose molecules."
+        for i in range(6)
+    )
+    generate_flashcards(llm, shared + "\n\nChloroplasts contain chlorophyll, which absorbs red and blue light.")
+    generate_flashcards(llm, shared + "\n\nThe cytoskeleton gives the cell its shape and moves organelles.")
+    assert model.calls == 2
+    assert llm.semantic.stats()["hits"] == 0
+
+
+def test_short_topics_are_still_matched(tmp_path):
+    llm, model = semantic_client(tmp_path)
+    generate_flashcards(llm, "explain photosynthesis")
+    generate_flashcards(llm, "Photosynthesis explained simply")
+    assert model.calls == 1
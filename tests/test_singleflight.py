@@ -0,0 +1,55 @@
+import threading
+import time
+from types import SimpleNamespace
+
+from cache import ResponseCache
+from llm import LLMClient
+from ratelimit import BATCH, INTERACTIVE
+from singleflight import InflightRegistry, SingleFlight
+
+
+def test_interactive_caller_does_not_join_batch_leader():
+    flights = SingleFlight()
+    batch_future, batch_leader = flights.begin("k", BATCH)
+    future, leader = flights.begin("k", INTERACTIVE)
+    assert batch_leader and leader and future is not batch_future
+    # A later batch caller joins the more urgent flight
+    joined, leader = flights.begin("k", BATCH)
+    assert not leader and joined is future
+    flights.finish("k", result="interactive", priority=INTERACTIVE)
+    flights.finish("k", result="batch", priority=BATCH)
+    assert joined.result() == "interactive" and batch_future.result() == "batch"
+
+
+class BlockingModel:
+    """Blocks calls made on the prefetch thread until released; answers others immediately."""
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.calls = 0
+
+    def generate_content(self, prompt, **kwargs):
+        self.calls += 1
+        if threading.current_thread().name == "prefetch":
+            self.release.wait(10)
+        return SimpleNamespace(text=f"answer to {prompt}", usage_metadata=None)
+
+
+def test_interactive_request_is_not_held_up_by_prefetch(tmp_path):
+    model = BlockingModel()
+    llm = LLMClient(
+        model, "fake", cache=ResponseCache(str(tmp_path / "cache.sqlite3")), streaming=False,
+        singleflight=SingleFlight(), inflight=InflightRegistry(str(tmp_path / "inflight.sqlite3")),
+    )
+    prefetch = threading.Thread(
+        target=llm.with_priority(BATCH).generate, args=("quiz", "photosynthesis"), name="prefetch"
+    )
+    prefetch.start()
+    while model.calls == 0:
+        time.sleep(0.01)
+
+    start = time.monotonic()
+    assert llm.generate("quiz", "photosynthesis") == "answer to photosynthesis"
+    assert time.monotonic() - start < 2
+    model.release.set()
+    prefetch.join()
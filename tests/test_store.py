@@ -0,0 +1,58 @@
+import sqlite3
+
+import pytest
+
+from store import DEFAULT_EASE, GRADES, MIN_EASE, StudyStore, schedule, today
+
+CARDS = [{"front": "Mitosis", "back": "Two identical nuclei"}, {"front": "Meiosis", "back": "Gametes"}]
+
+
+def test_only_the_owner_can_delete_a_deck(tmp_path):
+    store = StudyStore(str(tmp_path / "study.sqlite3"))
+    deck_id = store.save_deck("ada", "flashcards", "Cells", "Cells", CARDS)
+    assert not store.delete_deck("grace", deck_id)
+    assert [d["id"] for d in store.list_decks("ada")] == [deck_id]
+    assert store.delete_deck("ada", deck_id)
+    assert store.list_decks("ada") == [] and store.due_count("ada") == 0
+
+
+def test_failed_delete_is_rolled_back(tmp_path):
+    store = StudyStore(str(tmp_path / "study.sqlite3"))
+    deck_id = store.save_deck("ada", "flashcards", "Cells", "Cells", CARDS)
+    store._conn.execute(
+        "CREATE TRIGGER fail_deck_delete BEFORE DELETE ON decks BEGIN SELECT RAISE(ABORT, 'disk full'); END"
+    )
+    with pytest.raises(sqlite3.IntegrityError):
+        store.delete_deck("ada", deck_id)
+    assert store.due_count("ada") == 2
+    # The connection is usable again rather than stuck inside the failed transaction
+    store._conn.execute("DROP TRIGGER fail_deck_delete")
+    assert store.delete_deck("ada", deck_id)
+
+
+def test_good_reviews_follow_the_sm2_intervals():
+    ease, interval, repetitions = DEFAULT_EASE, 0, 0
+    intervals = []
+    for _ in range(4):
+        ease, interval, repetitions = schedule(GRADES["Good"], ease, interval, repetitions)
+        intervals.append(interval)
+    assert intervals == [1, 6, 15, 38]
+    assert ease == pytest.approx(DEFAULT_EASE)
+
+
+@pytest.mark.parametrize("grade, ease", [("Again", 1.96), ("Hard", 2.36), ("Good", 2.5), ("Easy", 2.6)])
+def test_grades_adjust_the_ease(grade, ease):
+    assert schedule(GRADES[grade], DEFAULT_EASE, 6, 2)[0] == pytest.approx(ease)
+
+
+def test_a_lapse_restarts_the_card_without_going_below_min_ease():
+    assert schedule(GRADES["Again"], MIN_EASE, 40, 5) == (MIN_EASE, 1, 0)
+
+
+def test_review_moves_the_card_out_of_the_due_list(tmp_path):
+    store = StudyStore(str(tmp_path / "study.sqlite3"))
+    store.save_deck("ada", "flashcards", "Cells", "Cells", CARDS)
+    card, other = store.due_cards("ada")
+    assert store.review(card["id"], GRADES["Good"]) == today() + 1
+    assert [c["id"] for c in store.due_cards("ada")] == [other["id"]]
+    assert store.due_count("ada", day=today() + 1) == 2
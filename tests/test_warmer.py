@@ -0,0 +1,31 @@
+import os
+import subprocess
+import sys
+import textwrap
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+def test_queued_warm_jobs_do_not_delay_interpreter_exit(tmp_path):
+    script = textwrap.dedent(f"""
+        import time
+        from types import SimpleNamespace
+        from cache import ResponseCache
+        from llm import LLMClient
+        from warmer import Warmer
+
+        class SlowModel:
+            def generate_content(self, prompt, **kwargs):
+                time.sleep(0.25)
+                return SimpleNamespace(text="{{}}", usage_metadata=None)
+
+        llm = LLMClient(SlowModel(), "fake", cache=ResponseCache({str(tmp_path / "cache.sqlite3")!r}), streaming=False)
+        Warmer(llm, max_workers=2).warm([f"topic {{i}}" for i in range(20)], features=("explain",))
+        time.sleep(0.2)
+    """)
+    start = time.monotonic()
+    subprocess.run([sys.executable, "-c", script], cwd=ROOT, check=True, timeout=60,
+                   env=dict(os.environ, STUDY_BUDDY_DATA_DIR=str(tmp_path)))
+    assert time.monotonic() - start < 2.5
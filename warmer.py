@@ -0,0 +1,227 @@
+"""Background cache warmer for popular topics, plus prefetching of follow-up material.
+
+The warmer generates explanations, quizzes and flashcards for a list of
+curriculum topics at BATCH priority, so students' interactive requests go
+first in the shared rate limiter queue. It uses the same default settings
+and prompts as the pages (5 questions of the first quiz type, 8 flashcards),
+so the results land on the cache keys that a first click on the topic looks
+up. Popular topics are warmed as asked by a student without uploads, since
+the pages only ground a topic in the student's own uploaded material. Topics that are already
+cached are skipped without touching the cache's hit/miss counters.
+
+After a student has had a topic explained, prefetch() queues its quiz and
+flashcards in the same way, grounded in that student's uploads, so those are
+ready by the time the student opens them.
+
+Usage (once, or every --interval seconds, e.g. from cron or a sidecar):
+    python warmer.py topics.txt --features explain,quiz,flashcards
+"""
+import argparse
+import queue
+import sys
+import threading
+import time
+from concurrent.futures import Future, wait
+
+import study
+from batch import read_topics
+from config import (
+    QUIZ_SHARD_SIZE,
+    WARMER_ENABLED, WARM_TOPICS, WARM_TOPICS_PATH, WARM_FEATURES, WARM_INTERVAL_SECONDS, WARM_MAX_WORKERS,
+    PREFETCH_ENABLED, PREFETCH_FEATURES,
+)
+from preprocess import prepare
+from quiz import build_quiz_prompt, plan_shards
+from ratelimit import BATCH
+
+WARM_FEATURES_SUPPORTED = ["explain", "quiz", "flashcards"]
+
+
+def load_topics(path=None, topics=()):
+    """Return the configured topics: the given list plus one topic per line (or CSV/JSONL row) of path."""
+    result = [t.strip() for t in topics if t.strip()]
+    if path:
+        if path.lower().endswith((".csv", ".jsonl")):
+            result.extend(row["topic"] for row in read_topics(path))
+        else:
+            with open(path, encoding="utf-8") as f:
+                result.extend(line.strip() for line in f if line.strip() and not line.startswith("#"))
+    return list(dict.fromkeys(result))
+
+
+def grounded_source(index, topic, owner=None):
+    # Pages ground the topic in the owner's uploaded material, when they have any; without an owner it is not grounded
+    return topic if owner is None else study.build_grounded_source(index, topic, owner=owner)
+
+
+def cache_keys(llm, feature, topic, index=None, owner=None):
+    """Cache keys the page looks up for topic with its default settings."""
+    if feature == "explain":
+        return [llm.cache_key("explain", study.build_explain_prompt(topic))]
+    # Quiz and flashcard pages ground and preprocess the topic
+    source = prepare(grounded_source(index, topic, owner), feature).text
+    if feature == "flashcards":
+        prompt = study.build_flashcards_prompt(source, study.DEFAULT_NUM_CARDS)
+        return [llm.cache_key("flashcards", prompt, study.JSON_GENERATION_CONFIG)]
+    if study.DEFAULT_NUM_QUESTIONS > QUIZ_SHARD_SIZE:
+        prompts = [
+            build_quiz_prompt(source, count, study.DEFAULT_QUIZ_TYPE, focus=focus)
+            for count, focus in plan_shards(study.DEFAULT_NUM_QUESTIONS, QUIZ_SHARD_SIZE)
+        ]
+    else:
+        prompts = [build_quiz_prompt(source, study.DEFAULT_NUM_QUESTIONS, study.DEFAULT_QUIZ_TYPE)]
+    return [llm.cache_key("quiz", prompt, study.JSON_GENERATION_CONFIG) for prompt in prompts]
+
+
+def generate(llm, feature, topic, index=None, owner=None):
+    if feature == "explain":
+        return study.explain(llm, topic)
+    source = grounded_source(index, topic, owner)
+    if feature == "quiz":
+        return study.generate_quiz(llm, source)
+    return study.generate_flashcards(llm, source)
+
+
+class Warmer:
+    def __init__(self, llm, index=None, max_workers=2):
+        # Warming yields to interactive requests in the shared rate limiter queue
+        self.llm = llm.with_priority(BATCH)
+        self.index = index
+        self._lock = threading.Lock()
+        self._pending = set()
+        self._jobs = queue.Queue()
+        self.warmed = self.skipped = self.failed = 0
+        # Daemon threads, unlike a ThreadPoolExecutor's, do not hold up interpreter exit
+        # (Ctrl-C, redeploys) until every queued warm job has run
+        for i in range(max_workers):
+            threading.Thread(target=self._work, name=f"warmer-{i}", daemon=True).start()
+
+    def _work(self):
+        while True:
+            future, feature, topic, owner = self._jobs.get()
+            if future.set_running_or_notify_cancel():
+                self._warm(feature, topic, owner)
+                future.set_result(None)
+
+    def is_cached(self, feature, topic, owner=None):
+        cache = self.llm.cache
+        keys = cache_keys(self.llm, feature, topic, self.index, owner)
+        return all(cache.peek(key) is not None for key in keys)
+
+    def _count(self, name, feature):
+        if self.llm.metrics is not None:
+            self.llm.metrics.increment(name, feature)
+
+    def _warm(self, feature, topic, owner=None):
+        try:
+            if self.is_cached(feature, topic, owner):
+                with self._lock:
+                    self.skipped += 1
+                return
+            generate(self.llm, feature, topic, self.index, owner)
+            with self._lock:
+                self.warmed += 1
+            self._count("warmed", feature)
+        except Exception as e:
+            with self._lock:
+                self.failed += 1
+            self._count("warm_errors", feature)
+            print(f"warmer: {feature} for {topic!r} failed: {e}", file=sys.stderr)
+        finally:
+            with self._lock:
+                self._pending.discard((feature, topic, owner))
+
+    def submit(self, topic, features, owner=None):
+        """Queue generation of features for topic (grounded in owner's uploads) in the background.
+
+        Returns the futures.
+        """
+        futures = []
+        for feature in features:
+            with self._lock:
+                if (feature, topic, owner) in self._pending:
+                    continue
+                self._pending.add((feature, topic, owner))
+            future = Future()
+            self._jobs.put((future, feature, topic, owner))
+            futures.append(future)
+        return futures
+
+    def prefetch(self, topic, features=tuple(PREFETCH_FEATURES), owner=""):
+        """Queue the follow-up material for a topic the student `owner` has just opened."""
+        return self.submit(topic.strip(), features, owner) if topic.strip() else []
+
+    def warm(self, topics, features=tuple(WARM_FEATURES)):
+        """Queue every feature of every topic and return the futures."""
+        return [future for topic in topics for future in self.submit(topic, features)]
+
+    def start(self, topics, features=tuple(WARM_FEATURES), interval=0):
+        """Warm topics on a daemon thread now and, with an interval, again every interval seconds."""
+        def loop():
+            while True:
+                wait(self.warm(topics, features))
+                if not interval:
+                    return
+                time.sleep(interval)
+
+        thread = threading.Thread(target=loop, name="warmer-schedule", daemon=True)
+        thread.start()
+        return thread
+
+    def stats(self):
+        with self._lock:
+            pending = len(self._pending)
+        return {"warmed": self.warmed, "skipped": self.skipped, "failed": self.failed, "pending": pending}
+
+
+def create_warmer(llm, index=None):
+    """Return a Warmer for the app, already warming the configured topics if that is enabled.
+
+    Without a response cache there is nowhere to keep the results, so no warmer is created.
+    """
+    if llm.cache is None or not (WARMER_ENABLED or PREFETCH_ENABLED):
+        return None
+    warmer = Warmer(llm, index, max_workers=WARM_MAX_WORKERS)
+    if WARMER_ENABLED:
+        topics = load_topics(WARM_TOPICS_PATH, WARM_TOPICS)
+        if topics:
+            warmer.start(topics, interval=WARM_INTERVAL_SECONDS)
+    return warmer
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Warm the response cache for a list of popular topics.")
+    parser.add_argument("topics", nargs="?", default=WARM_TOPICS_PATH or None,
+                        help="text file with one topic per line, or a CSV/JSONL file as for batch.py")
+    parser.add_argument("--features", default=",".join(WARM_FEATURES),
+                        help=f"comma-separated subset of: {', '.join(WARM_FEATURES_SUPPORTED)}")
+    parser.add_argument("--workers", type=int, default=WARM_MAX_WORKERS, help="number of concurrent generations")
+    parser.add_argument("--interval", type=float, default=0, help="repeat every this many seconds (0: run once)")
+    args = parser.parse_args(argv)
+
+    features = [f.strip() for f in args.features.split(",") if f.strip()]
+    unknown = [f for f in features if f not in WARM_FEATURES_SUPPORTED]
+    if unknown:
+        parser.error(f"unknown feature(s): {', '.join(unknown)}")
+    topics = load_topics(args.topics, WARM_TOPICS)
+    if not topics:
+        parser.error("no topics given (pass a file or set WARM_TOPICS / WARM_TOPICS_PATH)")
+
+    llm = study.create_llm(
+        cache=study.create_response_cache(), limiter=study.create_rate_limiter(), metrics=study.create_metrics(),
+    )
+    if llm.cache is None:
+        parser.error("the response cache is disabled (CACHE_ENABLED=0), so there is nothing to warm")
+    warmer = Warmer(llm, max_workers=args.workers)
+    while True:
+        wait(warmer.warm(topics, features))
+        stats = warmer.stats()
+        print(f"Warmed {stats['warmed']}, already cached {stats['skipped']}, failed {stats['failed']}.",
+              file=sys.stderr)
+        if not args.interval:
+            return 1 if stats["failed"] else 0
+        time.sleep(args.interval)
+
+
+if __name__ == "__main__":
+    sys.exit(main())